@@ -1,13 +1,10 @@
-import csv
 import datetime
 import time
 
-import asciichartpy as acp
 import matplotlib.pyplot as plt
 import numpy as np
 from rich.console import Console, Group
 from rich.live import Live
-from rich.panel import Panel
 from rich.progress import (
     BarColumn,
     Progress,
@@ -20,8 +17,11 @@ from rich.progress import (
 )
 
 from mpbc_vyfa_sf import LaserState, MPBAmplifier
+from mpbc_vyfa_sf.dashboard import LiveDashboard
+from mpbc_vyfa_sf.recorder import ScanRecorder, amplifier_metadata, load_scan
+from mpbc_vyfa_sf.timing import DeadlineScheduler
 
-com_port = "COM30"
+com_port = "COM30"  # "SIM" runs the scan against a simulated amplifier
 scan_range = 10  # scan range in celcius to scan around the current setpoint
 dt = 2
 points = 201
@@ -35,10 +35,6 @@ start_time = (
 )
 
 
-def get_panel(data, title, height=15, format="{:>2.2f}"):
-    return Panel(acp.plot(data, {"height": height, "format": format}), title=title)
-
-
 class TaskSpeed(ProgressColumn):
     def render(self, task):
         if task.speed is None:
@@ -60,13 +56,16 @@ progress = Progress(
     TimeElapsedColumn(),
     TimeRemainingColumn(),
 )
-panel = Panel("")
-group = Group(panel, progress)
+# output power, SHG temperature and setpoint and booster current, downsampled to the
+# terminal width
+dashboard = LiveDashboard()
+group = Group(dashboard, progress)
 
 
 console = Console()
 
-amp = MPBAmplifier(com_port)
+# cache reads for 0.1 s, the setpoints are only read from the amplifier once
+amp = MPBAmplifier(com_port, cache_ttl=0.1)
 
 current_temperature_setpoint = amp.shg_temperature_setpoint
 
@@ -79,75 +78,76 @@ if power_stabilization:
 amp.enter_test_environment()
 
 console.print("Enabling the laser", end="\r")
-amp.enable_laser()
 
 with console.status("Starting laser") as status:
-    while True:
-        time.sleep(0.2)
+
+    def show_progress(sample):
         status.update(
-            f"Starting laser: {amp.laser_state.name}, booster current ="
-            f" {amp.booster_current:.1f}, setpoint = {amp.booster_current_setpoint:.1f}"
+            f"Starting laser: {sample.laser_state.name}, booster current ="
+            f" {sample.booster_current:.1f}, setpoint ="
+            f" {sample.booster_current_setpoint:.1f}"
         )
-        if (amp.laser_state == LaserState(52)) & (
-            abs(amp.booster_current - amp.booster_current_setpoint) <= 10
-        ):
-            tstart = time.time()
-            while (time.time() - tstart) < 2:
-                status.update(
-                    f"Starting laser: {amp.laser_state.name}, booster current ="
-                    f" {amp.booster_current:.1f}, setpoint ="
-                    f" {amp.booster_current_setpoint:.1f}"
-                )
-                time.sleep(0.1)
-            console.print(
-                f"{amp.laser_state.name}: booster current = {amp.booster_current:.1f}, "
-                f"setpoint = {amp.booster_current_setpoint:.1f}",
-            )
-            break
+
+    sample = amp.power_up(
+        LaserState.BOOSTER_ON, current_tolerance=10, hold=2, progress=show_progress
+    )
+    console.print(
+        f"{sample.laser_state.name}: booster current = {sample.booster_current:.1f}, "
+        f"setpoint = {sample.booster_current_setpoint:.1f}",
+    )
 
 # give the amplifier some time to finish starting up and going to the first temperature
-with console.status("Setting the first temperature point and waiting 10s to stabilize"):
+with console.status("Setting the first temperature point and waiting to stabilize"):
     amp.shg_temperature_setpoint = current_temperature_setpoint - scan_range / 2
-    time.sleep(10)
-
-data = []
-with Live(group, refresh_per_second=10) as live:
+    settle = amp.wait_until_settled(timeout=30)
+console.print(f"SHG temperature settled in {settle.duration:.1f} s")
+
+columns = [
+    "timestamp",
+    "SHG temperature setpoint [C]",
+    "SHG temperature [C]",
+    "output power [mW]",
+]
+fname = f"shg_temperature_scan_{start_time}"
+
+# samples are written to disk as they are acquired, a crash only loses the samples
+# since the last flush
+with Live(group, refresh_per_second=10) as live, ScanRecorder(
+    fname, columns, metadata=amplifier_metadata(amp)
+) as recorder:
     task = progress.add_task("[red] Scanning SHG temperature", total=points, value=None)
+    # step the setpoint on deadlines every dt, the time spent communicating and
+    # drawing is taken out of the wait so the scan does not drift
+    schedule = DeadlineScheduler(dt)
+    schedule.start()
     for T in np.linspace(
         current_temperature_setpoint - scan_range / 2,
         current_temperature_setpoint + scan_range / 2,
         points,
     ):
         amp.shg_temperature_setpoint = T
-        time.sleep(dt)
-        data.append((T, amp.shg_temperature, amp.output_power))
+        schedule.wait()
+        timestamp = time.time()
+        sample = amp.snapshot("shg_temperature", "output_power", "booster_current")
+        recorder.append((timestamp, T, sample.shg_temperature, sample.output_power))
+        dashboard.update({**sample._asdict(), "shg_temperature_setpoint": T}, x=T)
         progress.update(task, advance=1, value=f"{T:>2.2f}")
-        s, x, y = zip(*data)
-        group.renderables[0] = get_panel(y, title="SHG power")
+
+timing = schedule.stats
+console.print(
+    f"Scan took {timing.duration:.1f} s of {timing.planned_duration:.1f} s planned, "
+    f"jitter {timing.jitter_mean * 1e3:.1f} ± {timing.jitter_std * 1e3:.1f} ms "
+    f"(max {timing.jitter_max * 1e3:.1f} ms), {timing.overruns} overruns"
+)
 
 amp.disable_laser()
 
 amp.shg_temperature_setpoint = current_temperature_setpoint
 amp.power_stabilization = power_stabilization
 
-xsetpoint, x, y = zip(*data)
+scan = load_scan(fname)
+x, y = scan["SHG temperature [C]"], scan["output power [mW]"]
 
-# write data to csv
-with open(f"shg_temperature_scan_{start_time}.csv", "w", newline="") as csv_file:
-    writer = csv.writer(csv_file, delimiter=",")
-    writer.writerow(
-        ["SHG temperature setpoint [C]", "SHG temperature [C]", "output power [mW]"]
-    )
-    for d in data:
-        writer.writerow(d)
-
-fig, ax = plt.subplots(figsize=(8, 5))
-ax.plot(x, y, ".-", lw=2, ms=12)
-ax.set_xlabel("temperature [C]")
-ax.set_ylabel("power [mW]")
-ax.grid(True)
-
-plt.show()
 fig, ax = plt.subplots(figsize=(8, 5))
 ax.plot(x, y, ".-", lw=2, ms=12)
 ax.set_xlabel("temperature [C]")
@@ -0,0 +1,73 @@
+"""
+Run the driver benchmarks against a SimulatedAmplifier and emit the results as JSON.
+
+usage: python -m benchmarks --latency 0.005 --baud-rate 9600 --output results.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+from importlib.metadata import PackageNotFoundError, version
+
+from .suite import compare_scans, run
+
+
+def package_version() -> str:
+    try:
+        return version("mpbc-vyfa-sf")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="round trip latency in s"
+    )
+    parser.add_argument("--baud-rate", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--scan-points", type=int, default=51)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.latency, args.baud_rate, args.repeat, args.scan_points)
+    scans = compare_scans()
+
+    report = {
+        "metadata": {
+            "version": package_version(),
+            "python": platform.python_version(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "latency": args.latency,
+            "baud_rate": args.baud_rate,
+            "repeat": args.repeat,
+        },
+        "results": {result.name: result.to_dict() for result in results},
+        "scans": scans,
+    }
+
+    print(f"{'benchmark':<32} {'mean [us]':>12} {'link [us]':>12} {'python [us]':>12}")
+    for result in results:
+        r = result.to_dict()
+        print(
+            f"{result.name:<32} {r['mean_us']:>12.1f} {r['link_us']:>12.1f}"
+            f" {r['overhead_us']:>12.1f}"
+        )
+
+    print(f"\n{'scan':<32} {'points':>12} {'duration [s]':>12} {'error [C]':>12}")
+    for name, scan in scans.items():
+        print(
+            f"{name:<32} {scan['points']:>12} {scan['duration']:>12.2f}"
+            f" {scan['error']:>12.3f}"
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
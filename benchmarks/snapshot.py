@@ -0,0 +1,76 @@
+"""
+Compare reading the telemetry properties one by one with a single batched snapshot.
+
+usage: python -m benchmarks.snapshot COM30 --repeat 20
+"""
+
+import argparse
+import time
+from typing import List
+
+from mpbc_vyfa_sf import MPBAmplifier
+from mpbc_vyfa_sf.amplifier import TELEMETRY
+
+
+class RoundTripCounter:
+    """Wraps the instrument and counts the number of commands sent to it"""
+
+    def __init__(self, instr):
+        self.instr = instr
+        self.round_trips = 0
+
+    def write(self, message: str) -> None:
+        self.round_trips += 1
+        self.instr.write(message)
+
+    def write_raw(self, data: bytes) -> None:
+        self.round_trips += 1
+        self.instr.write_raw(data)
+
+    def read_frame(self) -> List[str]:
+        return self.instr.read_frame()
+
+    def flush_input(self) -> bytes:
+        return self.instr.flush_input()
+
+    def close(self) -> None:
+        self.instr.close()
+
+
+def benchmark(amp: MPBAmplifier, counter: RoundTripCounter, func, repeat: int):
+    counter.round_trips = 0
+    tstart = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - tstart
+    return counter.round_trips / repeat, elapsed / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("resource_name")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    amp = MPBAmplifier(args.resource_name)
+    counter = RoundTripCounter(amp.instr)
+    amp.instr = counter
+
+    def sequential():
+        return [getattr(amp, name) for name in TELEMETRY]
+
+    results = {
+        "sequential": benchmark(amp, counter, sequential, args.repeat),
+        "snapshot": benchmark(amp, counter, amp.snapshot, args.repeat),
+    }
+
+    print(f"telemetry sample of {len(TELEMETRY)} properties: {', '.join(TELEMETRY)}")
+    for name, (round_trips, elapsed) in results.items():
+        print(
+            f"{name:<12}: {round_trips:>4.1f} round trips, {elapsed * 1e3:>8.2f} ms"
+            " per sample"
+        )
+
+
+if __name__ == "__main__":
+    main()
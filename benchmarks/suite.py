@@ -0,0 +1,200 @@
+"""
+Benchmarks of the hot paths of the driver against a SimulatedAmplifier.
+
+The simulator sleeps to model the serial link, the time spent sleeping is reported as
+link time and the remainder of the wall time as Python-side overhead.
+"""
+
+import time
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier
+from mpbc_vyfa_sf.amplifier import TELEMETRY
+from mpbc_vyfa_sf.instrumentation import LatencyAggregator
+
+READ_PROPERTIES = (
+    "laser_state",
+    "booster_current",
+    "booster_current_setpoint",
+    "shg_temperature",
+    "shg_temperature_setpoint",
+    "output_power",
+    "alarms",
+)
+
+
+@dataclass
+class Result:
+    name: str
+    calls: int
+    total: float
+    link: float
+
+    @property
+    def overhead(self) -> float:
+        return self.total - self.link
+
+    def to_dict(self) -> Dict[str, float]:
+        result = asdict(self)
+        result.update(
+            overhead=self.overhead,
+            mean_us=1e6 * self.total / self.calls,
+            link_us=1e6 * self.link / self.calls,
+            overhead_us=1e6 * self.overhead / self.calls,
+        )
+        return result
+
+
+class LinkClock:
+    """Sleep function for the simulator that keeps track of the time spent sleeping"""
+
+    def __init__(self):
+        self.slept = 0.0
+
+    def sleep(self, duration: float) -> None:
+        tstart = time.perf_counter()
+        time.sleep(duration)
+        self.slept += time.perf_counter() - tstart
+
+
+class NullInstrument:
+    """Instrument that replies instantly with a fixed reply, isolates Python overhead"""
+
+    def __init__(self, reply: str):
+        self.lines = [reply]
+
+    def write_raw(self, data: bytes) -> None:
+        pass
+
+    def read_frame(self) -> List[str]:
+        return self.lines
+
+    def flush_input(self) -> bytes:
+        return b""
+
+    def close(self) -> None:
+        pass
+
+
+def simulated_amplifier(
+    link: LinkClock, latency: float, baud_rate: Optional[int]
+) -> MPBAmplifier:
+    sim = SimulatedAmplifier(
+        latency=latency, baud_rate=baud_rate, time_scale=1000, sleep=link.sleep
+    )
+    amp = MPBAmplifier("SIM", instrument=sim)
+    amp.enter_test_environment()
+    amp.enable_laser()
+    return amp
+
+
+def measure(name: str, func: Callable[[], object], link: LinkClock, calls: int):
+    slept = link.slept
+    tstart = time.perf_counter()
+    for _ in range(calls):
+        func()
+    total = time.perf_counter() - tstart
+    return Result(name, calls, total, link.slept - slept)
+
+
+def shg_scan(amp: MPBAmplifier, points: int = 51, scan_range: float = 10) -> None:
+    center = amp.shg_temperature_setpoint
+    step = scan_range / (points - 1)
+    for idx in range(points):
+        amp.shg_temperature_setpoint = center - scan_range / 2 + idx * step
+        amp.snapshot("shg_temperature", "output_power")
+    amp.shg_temperature_setpoint = center
+
+
+def run(
+    latency: float = 0.0,
+    baud_rate: Optional[int] = None,
+    repeat: int = 100,
+    scan_points: int = 51,
+) -> List[Result]:
+    link = LinkClock()
+    amp = simulated_amplifier(link, latency, baud_rate)
+
+    results = []
+    for name in READ_PROPERTIES:
+        results.append(
+            measure(f"read.{name}", lambda: getattr(amp, name), link, repeat)
+        )
+
+    def write_setpoint():
+        amp.booster_current_setpoint = 1500
+
+    results.append(
+        measure("write.booster_current_setpoint", write_setpoint, link, repeat)
+    )
+
+    replies = {
+        "output_power": "12.34",
+        "laser_state": "52",
+        "power_stabilization": "1",
+        "alarms": "0 0 1 0 1",
+    }
+    for name, reply in replies.items():
+        prop = MPBAmplifier.properties[name]
+        results.append(
+            measure(f"parse.{name}", partial(prop.parse, reply), link, 100 * repeat)
+        )
+        # full read path of the descriptor without any link time
+        null = MPBAmplifier("SIM", instrument=NullInstrument(reply))
+        results.append(
+            measure(f"overhead.{name}", partial(getattr, null, name), link, 10 * repeat)
+        )
+
+    results.append(measure("snapshot.telemetry", amp.snapshot, link, repeat))
+    results.append(
+        measure(
+            "sequential.telemetry",
+            lambda: [getattr(amp, name) for name in TELEMETRY],
+            link,
+            repeat,
+        )
+    )
+    results.append(
+        measure("scan.shg_temperature", lambda: shg_scan(amp, scan_points), link, 1)
+    )
+
+    aggregator = LatencyAggregator()
+    amp.add_observer(aggregator)
+    results.append(
+        measure("observed.output_power", lambda: amp.output_power, link, repeat)
+    )
+    amp.remove_observer(aggregator)
+    return results
+
+
+def compare_scans(
+    dwell: float = 0.01, scan_range: float = 10, points: int = 201
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare the number of points, duration and peak accuracy of a linear and an
+    adaptive SHG temperature scan, with the simulated time running 1000 times faster.
+    """
+    from mpbc_vyfa_sf.scan import adaptive_scan, linear_scan
+
+    def linear(amp: MPBAmplifier, center: float):
+        return linear_scan(amp, center, scan_range, points, dwell=dwell)
+
+    def adaptive(amp: MPBAmplifier, center: float):
+        return adaptive_scan(amp, center, scan_range, dwell=dwell)
+
+    results = {}
+    for name, scan in (("linear", linear), ("adaptive", adaptive)):
+        sim = SimulatedAmplifier(time_scale=1000)
+        amp = MPBAmplifier("SIM", instrument=sim)
+        amp.enter_test_environment()
+        amp.enable_laser()
+        result = scan(amp, sim.shg_temperature_setpoint)
+        results[name] = {
+            "points": len(result.samples),
+            "duration": result.duration,
+            "optimum": result.optimum,
+            "error": abs(result.optimum - sim.shg_peak_temperature),
+        }
+    return results
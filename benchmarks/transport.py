@@ -0,0 +1,92 @@
+"""
+Compare the pyserial and pyvisa transports: the time to import each backend (and to
+create the pyvisa ResourceManager) in a fresh interpreter, and the time per query.
+
+The query overhead of the pyserial transport is measured on a loop:// port that echoes
+the command, without a device. Pass a serial port and/or VISA resource name to measure
+queries on the amplifier.
+
+usage: python -m benchmarks.transport --serial COM30 --visa ASRL30::INSTR --repeat 200
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import Dict, Optional
+
+from mpbc_vyfa_sf import MPBAmplifier
+from mpbc_vyfa_sf.transport import SerialTransport
+
+IMPORTS = {
+    "mpbc_vyfa_sf": "import mpbc_vyfa_sf",
+    "pyserial": "import serial",
+    "pyvisa": "import pyvisa",
+    "pyvisa + ResourceManager": "import pyvisa; pyvisa.ResourceManager()",
+}
+
+
+def import_time(statement: str, repeat: int = 5) -> Optional[float]:
+    """Best wall time of a fresh interpreter running statement, minus a bare start"""
+
+    def best(code: str) -> float:
+        times = []
+        for _ in range(repeat):
+            tstart = time.perf_counter()
+            process = subprocess.run([sys.executable, "-c", code], capture_output=True)
+            times.append(time.perf_counter() - tstart)
+            if process.returncode != 0:
+                raise RuntimeError(process.stderr.decode())
+        return min(times)
+
+    try:
+        return best(statement) - best("pass")
+    except RuntimeError:
+        return None
+
+
+def query_time(transport, command: str, repeat: int) -> float:
+    transport.query(command)
+    tstart = time.perf_counter()
+    for _ in range(repeat):
+        transport.query(command)
+    return (time.perf_counter() - tstart) / repeat
+
+
+def read_time(amp: MPBAmplifier, repeat: int) -> float:
+    amp.output_power
+    tstart = time.perf_counter()
+    for _ in range(repeat):
+        amp.output_power
+    return (time.perf_counter() - tstart) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--serial", help="serial port of the amplifier, e.g. COM30")
+    parser.add_argument("--visa", help="VISA resource name, e.g. ASRL30::INSTR")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'import':<32} {'time [ms]':>12}")
+    for name, statement in IMPORTS.items():
+        duration = import_time(statement)
+        value = f"{duration * 1e3:>12.1f}" if duration is not None else " unavailable"
+        print(f"{name:<32} {value}")
+
+    results: Dict[str, float] = {}
+    loop = SerialTransport("loop://")
+    results["pyserial loop:// query"] = query_time(loop, "GETPOWER", args.repeat)
+    loop.close()
+    for name, resource_name in (("pyserial", args.serial), ("pyvisa", args.visa)):
+        if resource_name is not None:
+            with MPBAmplifier(resource_name) as amp:
+                results[f"{name} output_power"] = read_time(amp, args.repeat)
+
+    print(f"\n{'query':<32} {'time [us]':>12}")
+    for name, duration in results.items():
+        print(f"{name:<32} {duration * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
-import csv
 import datetime
 import time
 from dataclasses import dataclass
 from pathlib import Path
 
 import numpy as np
-import pyvisa
 from rich.status import Status
 from textual import on, work
 from textual.app import App, ComposeResult
@@ -25,15 +23,12 @@ from textual.widgets import (
 from textual_plotext import PlotextPlot
 
 from mpbc_vyfa_sf import LaserState, MPBAmplifier
+from mpbc_vyfa_sf.downsample import minmax
+from mpbc_vyfa_sf.recorder import ScanRecorder, amplifier_metadata
+from mpbc_vyfa_sf.transport import list_resources
 
-
-def save_scan_to_csv(
-    fname: Path, column_names: list[str], data: list[tuple[float, ...]]
-) -> None:
-    with open(fname, "w", newline="") as file:
-        writer = csv.writer(file, delimiter=",")
-        writer.writerow(column_names)
-        writer.writerows(data)
+# maximum redraws per second of the scan plot and table
+REDRAW_RATE = 10
 
 
 class StatusWidget(Static):
@@ -62,6 +57,12 @@ class StatusWidget(Static):
 class MPBCAmpSHGApp(App[None]):
     CSS_PATH = "MPBCAmpSHGApp.tcss"
 
+    # samples of the current scan, rows of setpoint, temperature and power filled in
+    # by the UI thread as they arrive
+    scan_data = np.empty((0, 3))
+    scan_count = 0
+    scan_dirty = False
+
     def compose(self) -> ComposeResult:
         yield Header()
         yield Horizontal(
@@ -130,13 +131,12 @@ class MPBCAmpSHGApp(App[None]):
     def on_mount(self) -> None:
         self.title = "MPB Communications VYFA-SF"
         com = self.query_one("#COM", Select)
-        rm = pyvisa.ResourceManager()
-        resources = rm.list_resources()
+        resources = list_resources()
         com.set_options([(resource, idr) for idr, resource in enumerate(resources)])
         self.resources = resources
 
         table = self.query_one(DataTable)
-        table.add_columns(
+        self.table_columns = table.add_columns(
             *[
                 "output power [mW]",
                 "seed power [mW]",
@@ -146,6 +146,8 @@ class MPBCAmpSHGApp(App[None]):
                 "SHG temperature setpoint [C]",
             ]
         )
+        # a single row with the latest sample, updated in place
+        self.table_row = table.add_row(*["" for _ in self.table_columns])
 
         self.query_one(StatusWidget).stop()
 
@@ -153,6 +155,9 @@ class MPBCAmpSHGApp(App[None]):
         plt.xlabel("temperature [C]")
         plt.ylabel("power [mW]")
 
+        # redraw at a limited rate instead of on every sample
+        self.set_interval(1 / REDRAW_RATE, self.redraw_scan)
+
     @on(Button.Pressed, "#connect")
     def connect_amplifier(self) -> None:
         com_idx = self.query_one("#COM", Select).value
@@ -161,7 +166,11 @@ class MPBCAmpSHGApp(App[None]):
             return
         self.notify(str(self.resources[com_idx]))
 
+        if getattr(self, "mpb", None) is not None:
+            self.mpb.close()
         self.mpb = MPBAmplifier(self.resources[com_idx])
+        # the scan and power up workers and the UI handlers share the amplifier
+        self.mpb.start_scheduler()
 
         # enable = self.query_one("#enable", Switch)
         # enable.value = self.mpb.enabled
@@ -175,35 +184,32 @@ class MPBCAmpSHGApp(App[None]):
         status = self.query_one(StatusWidget)
 
         if switch.value:
-            status.update(
-                f"Starting amplifier: {self.mpb.laser_state.name}, booster current ="
-                f" {self.mpb.booster_current:.1f}, setpoint = {self.mpb.booster_current_setpoint:.1f}"
-            )
+            status.update_message("Starting amplifier")
             status.start()
-
             self.notify("amplifier enabled", title="Enable")
-            self.mpb.enable_laser()
-            while True:
-                if (self.mpb.laser_state == LaserState(52)) & (
-                    abs(self.mpb.booster_current - self.mpb.booster_current_setpoint)
-                    <= 10
-                ):
-                    tstart = time.time()
-                    while (time.time() - tstart) < 2:
-                        status.update(
-                            f"Starting amplifier: {self.mpb.laser_state.name}, booster current ="
-                            f" {self.mpb.booster_current:.1f}, setpoint ="
-                            f" {self.mpb.booster_current_setpoint:.1f}"
-                        )
-                        time.sleep(0.1)
-                    break
-            status.update("Started amplifier")
-            status.stop()
-
+            self.power_up()
         else:
             self.notify("amplifier disabled", title="Enable")
             # self.mpb.disable_laser()
 
+    @work(exclusive=True, thread=True, group="power_up")
+    def power_up(self) -> None:
+        status = self.query_one(StatusWidget)
+
+        def show_progress(sample) -> None:
+            self.call_from_thread(
+                status.update_message,
+                f"Starting amplifier: {sample.laser_state.name}, booster current ="
+                f" {sample.booster_current:.1f}, setpoint ="
+                f" {sample.booster_current_setpoint:.1f}",
+            )
+
+        self.mpb.power_up(
+            LaserState.BOOSTER_ON, current_tolerance=10, hold=2, progress=show_progress
+        )
+        self.call_from_thread(status.update_message, "Started amplifier")
+        self.call_from_thread(status.stop)
+
     @on(Switch.Changed, "#power_stabilization")
     def power_stabilization(self) -> None:
         switch = self.query_one("#power_stabilization", Switch)
@@ -251,10 +257,18 @@ class MPBCAmpSHGApp(App[None]):
         return
 
     @dataclass
-    class ScanData(Message):
-        temperature_setpoint: list[float]
-        temperature: list[float]
-        power: list[float]
+    class ScanStarted(Message):
+        points: int
+
+    @dataclass
+    class ScanProgress(Message):
+        setpoint: float
+        temperature: float
+        power: float
+
+    @dataclass
+    class StatusMessage(Message):
+        message: str
 
     @work(exclusive=True, thread=True)
     def run_scan(
@@ -263,39 +277,16 @@ class MPBCAmpSHGApp(App[None]):
         status = self.query_one(StatusWidget)
         self.call_from_thread(status.update_message, "Scanning SHG temperature")
         self.call_from_thread(status.start)
-        data = []
-        for setpoint in np.linspace(
-            shg_temperature - scan_range / 2,
-            shg_temperature + scan_range / 2,
-            scan_steps,
-        ):
-            # self.mpb.temperature_setpoint = setpoint
-            time.sleep(dt)
-            data.append(
-                [
-                    setpoint,
-                    np.random.random(),
-                    np.random.random(),
-                    np.random.random(),
-                    np.random.random(),
-                ]
-            )
-            self.call_from_thread(
-                status.update_message, f"Scanning SHG temperature : {setpoint:<5.2f} C"
-            )
-
-            x, y, _, _, _ = list(zip(*data))
-            self.post_message(self.ScanData(x, x, y))
-
         fname = (
             datetime.datetime.now()
             .isoformat(timespec="seconds")
             .replace("-", "_")
             .replace(":", "_")
         )
-        fname += "_shg_scan.csv"
+        fname += "_shg_scan"
 
-        save_scan_to_csv(
+        # samples are written to disk as they are acquired
+        recorder = ScanRecorder(
             Path(__file__).parent / fname,
             [
                 "shg temperature setpoint [C]",
@@ -304,33 +295,81 @@ class MPBCAmpSHGApp(App[None]):
                 "booster curent [mW]",
                 "input power [mW]",
             ],
-            data,
+            metadata=amplifier_metadata(self.mpb) if hasattr(self, "mpb") else None,
         )
+        # only new samples are posted to the UI; post_message does not wait for the UI
+        # to handle them, so rendering never holds up the scan
+        self.post_message(self.ScanStarted(scan_steps))
+        with recorder:
+            for setpoint in np.linspace(
+                shg_temperature - scan_range / 2,
+                shg_temperature + scan_range / 2,
+                scan_steps,
+            ):
+                # self.mpb.temperature_setpoint = setpoint
+                time.sleep(dt)
+                sample = [
+                    setpoint,
+                    np.random.random(),
+                    np.random.random(),
+                    np.random.random(),
+                    np.random.random(),
+                ]
+                recorder.append(sample)
+                self.post_message(self.ScanProgress(setpoint, setpoint, sample[1]))
+                self.post_message(
+                    self.StatusMessage(f"Scanning SHG temperature : {setpoint:<5.2f} C")
+                )
 
         self.call_from_thread(status.update_message, "SHG temperature scan done")
         self.call_from_thread(status.stop)
 
-    @on(ScanData)
-    def populate_plots(self, event: ScanData) -> None:
-        plt = self.query_one(PlotextPlot).plt
+    @on(StatusMessage)
+    def update_status(self, event: StatusMessage) -> None:
+        self.query_one(StatusWidget).update_message(event.message)
+
+    @on(ScanStarted)
+    def start_plots(self, event: ScanStarted) -> None:
+        self.scan_data = np.full((event.points, 3), np.nan)
+        self.scan_count = 0
+        self.scan_dirty = True
+
+    @on(ScanProgress)
+    def append_sample(self, event: ScanProgress) -> None:
+        if self.scan_count == len(self.scan_data):
+            # more samples than announced, grow the buffer geometrically
+            grown = np.full((max(2 * len(self.scan_data), 1), 3), np.nan)
+            grown[: self.scan_count] = self.scan_data
+            self.scan_data = grown
+        self.scan_data[self.scan_count] = (
+            event.setpoint,
+            event.temperature,
+            event.power,
+        )
+        self.scan_count += 1
+        self.scan_dirty = True
 
-        plt.clear_data()
-        plt.scatter(event.temperature, event.power)
-        self.query_one(PlotextPlot).refresh()
+    def redraw_scan(self) -> None:
+        if not self.scan_dirty:
+            return
+        self.scan_dirty = False
+        data = self.scan_data[: self.scan_count]
 
-        datatable = self.query_one(DataTable)
-        datatable.clear()
-        datatable.add_row(
-            *[
-                event.power[-1],
-                0,
-                0,
-                0,
-                event.temperature[-1],
-                event.temperature_setpoint[-1],
-            ]
-        )
-        datatable.refresh()
+        plot = self.query_one(PlotextPlot)
+        plt = plot.plt
+        plt.clear_data()
+        if len(data) > 0:
+            # a terminal cell can show at most a couple of points per column
+            temperature, power = minmax(data[:, 1], data[:, 2], max(plot.size.width, 1))
+            plt.scatter(temperature, power)
+        plot.refresh()
+
+        if len(data) > 0:
+            setpoint, temperature, power = data[-1]
+            table = self.query_one(DataTable)
+            values = (power, 0, 0, 0, temperature, setpoint)
+            for column, value in zip(self.table_columns, values):
+                table.update_cell(self.table_row, column, value)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,24 @@
-from typing import List
+from typing import TYPE_CHECKING, Any, List
 
 from .amplifier import MPBAmplifier
 from .enums import LaserState
+from .simulator import SimulatedAmplifier
 
-__all__: List[str] = ["MPBAmplifier", "LaserState"]
+if TYPE_CHECKING:
+    from .async_amplifier import AsyncMPBAmplifier
+
+__all__: List[str] = [
+    "MPBAmplifier",
+    "AsyncMPBAmplifier",
+    "LaserState",
+    "SimulatedAmplifier",
+]
+
+
+def __getattr__(name: str) -> Any:
+    # the asyncio driver is imported on first use, to keep importing the package fast
+    if name == "AsyncMPBAmplifier":
+        from .async_amplifier import AsyncMPBAmplifier
+
+        return AsyncMPBAmplifier
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,24 @@
+import functools
 import logging
-from typing import List, Optional
-
-import pyvisa
+import math
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from dataclasses import dataclass
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from .attributes import (
     BoolProperty,
@@ -11,17 +28,100 @@ from .attributes import (
     LaserStateProperty,
     Property,
 )
-from .enums import Alarm, Fault
-from .exceptions import MPBCommandError, MPBKeyError
+from .cache import MISSING, ReadCache
+from .enums import Alarm, AlarmFlag, Fault, FaultFlag, LaserState
+from .exceptions import MPBCommandError, MPBKeyError, MPBPendingCommandError
+from .instrumentation import CommandEvent, CountingInstrument
+from .power import PowerUpMonitor
+from .protocol import Response, encode_command, parse_response
+from .replay import RecordingTransport, ReplayTransport, TranscriptWriter
+from .scheduler import CommandScheduler, Priority
+from .settle import SettleResult, slope
+from .shadow import ShadowState
+from .simulator import SimulatedAmplifier
+from .transport import BufferedTransport, open_transport, resource_manager
+
+TELEMETRY: Tuple[str, ...] = (
+    "laser_state",
+    "booster_current",
+    "booster_current_setpoint",
+    "shg_temperature",
+    "output_power",
+)
+
+
+def _is_connection_error(error: Exception) -> bool:
+    # a timeout means the amplifier did not reply, not that the connection dropped
+    if isinstance(error, TimeoutError):
+        return False
+    elif isinstance(error, OSError):
+        return True
+    pyvisa = sys.modules.get("pyvisa")
+    if pyvisa is not None and isinstance(error, pyvisa.errors.VisaIOError):
+        return error.error_code in (
+            pyvisa.constants.StatusCode.error_connection_lost,
+            pyvisa.constants.StatusCode.error_io,
+            pyvisa.constants.StatusCode.error_invalid_object,
+        )
+    return False
+
+
+def _reconnecting(func):
+    # reopen the connection and retry once if the connection dropped
+    @functools.wraps(func)
+    def wrapper(self, *args):
+        try:
+            return func(self, *args)
+        except Exception as error:
+            if not _is_connection_error(error):
+                raise
+            logging.warning(f"Connection to {self.resource_name} lost, reconnecting")
+            self._reconnect()
+            return func(self, *args)
+
+    return wrapper
+
+
+@lru_cache(maxsize=None)
+def _snapshot_type(names: Tuple[str, ...]):
+    return namedtuple("Snapshot", names)
+
+
+def _observed(operation: str):
+    # only instrument the exchange if observers are attached, nested exchanges are part
+    # of the outer event
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args):
+            if not self._observers or getattr(self._local, "observing", False):
+                return func(self, *args)
+            return self._observe(operation, func, *args)
+
+        return wrapper
+
+    return decorator
+
+
+# maximum time in s to wait for the exchanges queued on the scheduler ahead of an
+# exchange, such that a deep queue does not block a caller indefinitely
+MAX_QUEUE_WAIT = 10.0
+
+
+@dataclass
+class _QueuedWrite:
+    # write queued on the scheduler, shared by the submit_write calls coalesced into it
+    future: "Future[List[Response]]"
+    value: Any
+    results: List["Future[None]"]
 
 
 class MPBAmplifier:
-    model = Property("Model", "MODEL")
-    serial = Property("Serial", "SN")
+    model = Property("Model", "MODEL", cache_ttl=math.inf)
+    serial = Property("Serial", "SN", cache_ttl=math.inf)
     enabled = BoolProperty("Laser emission status", "LDenable")
     state = BoolProperty("State", "STATE")
     laser_state = LaserStateProperty("Laser state", "LASERSTATE")
-    mode = IntProperty("Mode", "MODE", read_only=False)
+    mode = IntProperty("Mode", "MODE", read_only=False, cache_ttl=math.inf)
     seed_current = FloatProperty("Seed current", "LDCURRENT 1", read_prefix="")
     preamp_current = FloatProperty("Preamp current", "LDCURRENT 2", read_prefix="")
     preamp_current_setpoint = FloatProperty("Preamp current setpoint", "LDCur 2")
@@ -31,6 +131,8 @@ class MPBAmplifier:
         "LDCur 3",
         write_prefix="",
         read_only=False,
+        cache_ttl=math.inf,
+        tolerance=0.05,
     )
 
     shg_temperature = FloatProperty("SHG Temperature", "TECTEMP 4", read_prefix="")
@@ -38,12 +140,18 @@ class MPBAmplifier:
         "SHG Temperature setpoint",
         "TECSETPT 4",
         read_only=False,
+        cache_ttl=math.inf,
+        tolerance=0.005,
     )
 
     seed_power = FloatProperty("Seed Power", "POWER 3", read_prefix="")
     output_power = FloatProperty("Output Power", "POWER 0", read_prefix="")
     output_power_setpoint = FloatProperty(
-        "Output power setpoint", "POWER 0", read_only=False
+        "Output power setpoint",
+        "POWER 0",
+        read_only=False,
+        cache_ttl=math.inf,
+        tolerance=0.005,
     )
 
     power_stabilization = BoolProperty(
@@ -52,75 +160,619 @@ class MPBAmplifier:
         read_prefix="GET",
         write_prefix="",
         read_only=False,
+        cache_ttl=math.inf,
     )
 
-    alarms = FlagProperty("Alarms", "ALR")
-    faults = FlagProperty("Faults", "FLT")
+    alarms = FlagProperty("Alarms", "ALR", flag_type=AlarmFlag)
+    faults = FlagProperty("Faults", "FLT", flag_type=FaultFlag)
 
-    def __init__(self, resource_name: str, baud_rate: int = 9600):
-        self.rm = pyvisa.ResourceManager()
+    def __init__(
+        self,
+        resource_name: str,
+        baud_rate: int = 9600,
+        cache_ttl: Optional[float] = None,
+        instrument: Optional[Any] = None,
+        shadow: bool = False,
+        record: Optional[str] = None,
+    ):
+        """
+        Args:
+            resource_name (str): serial port (e.g. COM30, opened with pyserial), VISA
+                resource name (e.g. ASRL30::INSTR, opened with pyvisa), "SIM" for a
+                SimulatedAmplifier or "REPLAY:<transcript file>" to replay a recorded
+                session as fast as possible
+            baud_rate (int): baud rate of the serial connection
+            cache_ttl (Optional[float]): enables caching of property reads if not None;
+                time-to-live in seconds of cached measurements. Immutable properties
+                and setpoints are cached until written.
+            instrument (Optional[Any]): already opened instrument to use instead of
+                resource_name, e.g. a SimulatedAmplifier with link latency
+            shadow (bool): keep the last confirmed value of writable properties and
+                skip writes of values within the tolerance of the property, see
+                ShadowState
+            record (Optional[str]): record all traffic with the amplifier to this
+                transcript file until close(), see TranscriptWriter
 
-        # translate com port to visa port
-        if "COM" in resource_name:
-            resource_name = f"ASRL{resource_name.strip('COM')}::INSTR"
+        The connection is opened on the first exchange with the amplifier, VISA
+        resources with a pyvisa ResourceManager shared by all amplifiers. After close()
+        the next exchange opens the connection again, and a connection that dropped is
+        reopened automatically. The cache and observers are kept when reconnecting.
+        """
+        self.resource_name = resource_name
+        self.baud_rate = baud_rate
+        self._cache = ReadCache(cache_ttl) if cache_ttl is not None else None
+        self._observers: List[Callable[[CommandEvent], None]] = []
+        self._local = threading.local()
+        self._instr: Optional[Any] = None
+        # replies not read yet, of an exchange that timed out
+        self._pending = 0
+        self._scheduler: Optional[CommandScheduler] = None
+        self._queued_writes: Dict[str, _QueuedWrite] = {}
+        self._write_lock = threading.Lock()
+        self._shadow: Optional[ShadowState] = None
+        if shadow:
+            self._shadow = ShadowState(
+                {
+                    name: prop.tolerance
+                    for name, prop in self.properties.items()
+                    if prop.tolerance is not None
+                }
+            )
 
-        self.instr = self.rm.open_resource(
-            resource_name,
-            baud_rate=baud_rate,
-            read_termination="\r",
-            write_termination="\r",
-        )
+        self._transcript: Optional[TranscriptWriter] = None
+        if record is not None:
+            self._transcript = TranscriptWriter(
+                record, {"resource_name": resource_name, "baud_rate": baud_rate}
+            )
+
+        if instrument is None and resource_name.upper().startswith("SIM"):
+            instrument = SimulatedAmplifier()
+        elif instrument is None and resource_name.upper().startswith("REPLAY:"):
+            instrument = ReplayTransport(resource_name[len("REPLAY:") :])
+        self._instrument = instrument
+
+    def __enter__(self) -> "MPBAmplifier":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def rm(self):
+        return resource_manager()
+
+    @property
+    def instr(self) -> Any:
+        if self._instr is None:
+            instrument = self._open()
+            if self._observers:
+                instrument = CountingInstrument(instrument)
+            self._instr = instrument
+        return self._instr
+
+    @instr.setter
+    def instr(self, instrument: Any) -> None:
+        self._instr = instrument
+
+    @property
+    def connected(self) -> bool:
+        return self._instr is not None
+
+    def _open(self) -> Any:
+        if self._instrument is not None:
+            instrument = self._instrument
+        else:
+            instrument = open_transport(self.resource_name, self.baud_rate)
+        if self._transcript is not None:
+            instrument = RecordingTransport(instrument, self._transcript)
+        return instrument
+
+    def open(self) -> None:
+        """Open the connection, otherwise opened on the first exchange"""
+        self.instr
+
+    @property
+    def scheduler(self) -> Optional[CommandScheduler]:
+        return self._scheduler
+
+    def start_scheduler(self, coalesce: bool = True, max_batch: int = 8) -> None:
+        """
+        Send all exchanges from a single I/O thread in order of priority, which makes
+        the amplifier safe to use from multiple threads, see CommandScheduler.
+
+        Args:
+            coalesce (bool): identical reads that are queued share a single exchange
+            max_batch (int): maximum number of queued exchanges sent in a single write
+        """
+        if self._scheduler is None:
+            self._scheduler = CommandScheduler(
+                self._send,
+                coalesce=coalesce,
+                max_batch=max_batch,
+                name=f"CommandScheduler-{self.resource_name}",
+            )
+
+    def stop_scheduler(self) -> None:
+        """Send the queued exchanges and return to exchanging from the calling thread"""
+        scheduler, self._scheduler = self._scheduler, None
+        if scheduler is not None:
+            scheduler.stop()
+
+    def close(self) -> None:
+        self.stop_scheduler()
+        if self._instr is not None:
+            self._instr.close()
+            self._instr = None
+        self._pending = 0
+        if self._transcript is not None:
+            self._transcript.close()
+            self._transcript = None
 
-    def __exit__(self):
-        self.instr.close()
-        self.rm.close()
+    def _reconnect(self) -> None:
+        # the amplifier may have been power cycled
+        if self._shadow is not None:
+            self._shadow.invalidate()
+        self._pending = 0
+        instr = self._instr
+        if instr is not None:
+            try:
+                instr.close()
+            except Exception:
+                pass
+        # keep the byte counters of the observers when reconnecting
+        if isinstance(instr, CountingInstrument):
+            instr.instrument = self._open()
+        else:
+            self._instr = None
+            self.instr
 
-    def _query(self, command: str) -> str:
-        msg = self.instr.query(command).strip("D >").strip("F >")
-        msg = self._message_error_handling(msg)
-        return msg
+    @property
+    def cache(self) -> Optional[ReadCache]:
+        return self._cache
 
+    @property
+    def shadow(self) -> Optional[ShadowState]:
+        return self._shadow
+
+    def add_observer(self, observer: Callable[[CommandEvent], None]) -> None:
+        """
+        Call observer with a CommandEvent for every exchange with the amplifier, see
+        instrumentation.LatencyAggregator for a built-in observer.
+        """
+        if self._instr is not None and not isinstance(self._instr, CountingInstrument):
+            self._instr = CountingInstrument(self._instr)
+        self._observers = self._observers + [observer]
+
+    def remove_observer(self, observer: Callable[[CommandEvent], None]) -> None:
+        self._observers = [obs for obs in self._observers if obs != observer]
+        if not self._observers and isinstance(self._instr, CountingInstrument):
+            self._instr = self._instr.instrument
+
+    def _observe(self, operation: str, func, *args):
+        if len(args) == 0:
+            command = None
+        elif isinstance(args[0], str):
+            command = args[0]
+        else:
+            command = "; ".join(args[0])
+        bytes_written, bytes_read = self.instr.bytes_written, self.instr.bytes_read
+        error = None
+        self._local.observing = True
+        start = time.perf_counter()
+        try:
+            return func(self, *args)
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            end = time.perf_counter()
+            self._local.observing = False
+            event = CommandEvent(
+                operation,
+                command,
+                self.instr.bytes_written - bytes_written,
+                self.instr.bytes_read - bytes_read,
+                start,
+                end,
+                error,
+            )
+            for observer in self._observers:
+                observer(event)
+
+    def _exchange(
+        self, commands: Sequence[str], data: Optional[bytes] = None, read: bool = False
+    ) -> List[Response]:
+        scheduler = self._scheduler
+        if scheduler is None or scheduler.in_io_thread:
+            return self._send(commands, data)
+        future = scheduler.submit(commands, data, read)
+        # every reply of the queued commands and this exchange may take up to the
+        # timeout of the connection, and a dropped connection is retried once; the wait
+        # for the queue is capped, commands of a higher priority skip it anyway
+        timeout = getattr(self._instr, "timeout", BufferedTransport.timeout)
+        if timeout is not None:
+            own = 2 * timeout * len(commands)
+            timeout = min(2 * timeout * scheduler.backlog, max(MAX_QUEUE_WAIT, own))
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            pass
+        # reads may be shared by coalesced callers and are left queued, writes are
+        # removed from the queue unless they are being sent already
+        if not read and not future.cancel():
+            raise MPBPendingCommandError(
+                f"No reply to {list(commands)} within {timeout} s, the commands were "
+                "sent and may still be applied"
+            )
+        raise TimeoutError(f"No reply to {list(commands)} within {timeout} s")
+
+    @_reconnecting
+    def _send(
+        self, commands: Sequence[str], data: Optional[bytes] = None
+    ) -> List[Response]:
+        if self._pending > 0:
+            self._discard_pending()
+        # discard stray input first, such that every reply lines up with its command
+        stray = self.instr.flush_input()
+        if stray:
+            logging.warning(f"Discarded unexpected input {stray!r}")
+        # send all commands in a single write, the amplifier handles them sequentially
+        # and ends every reply with a prompt
+        if data is None:
+            data = b"".join(encode_command(command) for command in commands)
+        self.instr.write_raw(data)
+        self._pending = len(commands)
+        responses = []
+        for command in commands:
+            responses.append(parse_response(command, self.instr.read_frame()))
+            self._pending -= 1
+        return responses
+
+    def _discard_pending(self) -> None:
+        # replies of an exchange that timed out may still arrive, read and discard them
+        # such that they are not taken for the replies to the next commands
+        try:
+            while self._pending > 0:
+                lines = self.instr.read_frame()
+                self._pending -= 1
+                logging.warning(f"Discarded late reply {lines}")
+        except TimeoutError:
+            logging.warning(f"{self._pending} replies did not arrive")
+        self._pending = 0
+
+    @_observed("request")
+    def request(self, command: str) -> Response:
+        """
+        Send a raw command and return the reply, without raising for error codes
+
+        Args:
+            command (str): command, e.g. "GETPOWER 0"
+
+        Returns:
+            Response: reply lines, status and error code
+        """
+        return self._exchange([command])[0]
+
+    @_observed("query")
+    def _query(self, command: str, data: Optional[bytes] = None) -> str:
+        response = self._exchange([command], data, read=True)[0]
+        return response.raise_for_error().payload
+
+    @_observed("query_many")
+    def _query_many(
+        self, commands: Sequence[str], data: Optional[bytes] = None
+    ) -> List[str]:
+        # all replies are read before raising, to not leave replies in the buffer
+        responses = self._exchange(commands, data, read=True)
+        return [response.raise_for_error().payload for response in responses]
+
+    @_observed("write")
     def _write(self, command: str) -> None:
-        self.instr.write(command)
-        msg = self._read()
-        self._message_error_handling(msg)
-
-    def _read(self) -> Optional[str]:
-        return self.instr.read()
-
-    def _message_error_handling(self, message: str) -> str:
-        if "MISSING_ARGUMENT" in message:
-            raise MPBCommandError("Missing argument(s)")
-        elif "CAN_ONLY_BE_USED_FOR_TESTS" in message:
-            raise MPBCommandError("Requires test environment")
-        elif "DATA_CANNOT_BE_SET" in message:
-            raise MPBCommandError("Cannot execute commanda")
-        return message
+        self._exchange([command])[0].raise_for_error()
+
+    @classmethod
+    def _get_property(cls, name: str) -> Property:
+        prop = cls.properties.get(name)
+        if prop is None:
+            raise ValueError(f"{name} is not a property of {cls.__name__}")
+        return prop
+
+    def read_many(self, *names: str, use_cache: bool = True) -> List[Any]:
+        """
+        Read multiple properties with the commands sent back-to-back. use_cache=False
+        always reads from the amplifier, bypassing the cache if enabled.
+        """
+        properties = [self._get_property(name) for name in names]
+        cache = self._cache if use_cache else None
+        if cache is None:
+            values = [MISSING] * len(properties)
+        else:
+            values = [
+                cache.get(prop.read_command, prop._cache_ttl) for prop in properties
+            ]
+        missing = [idx for idx, value in enumerate(values) if value is MISSING]
+        if len(missing) > 0:
+            messages = self._query_many(
+                [properties[idx].read_command for idx in missing],
+                b"".join(properties[idx].read_bytes for idx in missing),
+            )
+            for idx, msg in zip(missing, messages):
+                prop = properties[idx]
+                values[idx] = prop.parse(msg)
+                if self._cache is not None:
+                    self._cache.set(prop.read_command, values[idx])
+                if self._shadow is not None and not prop.read_only:
+                    self._shadow.confirm(prop.attribute, values[idx])
+        return values
+
+    def snapshot(self, *names: str) -> NamedTuple:
+        """
+        Read multiple properties with the commands sent back-to-back, returned as a
+        named tuple with the property names as fields. Defaults to the properties in
+        TELEMETRY.
+        """
+        if len(names) == 0:
+            names = TELEMETRY
+        return _snapshot_type(names)(*self.read_many(*names))
+
+    def submit_write(self, name: str, value: Any) -> "Future[None]":
+        """
+        Queue a write of property name on the scheduler without waiting for it. A write
+        to the same property that is still queued is replaced, so of a burst of writes
+        only the latest value is sent; the futures of replaced writes resolve when the
+        latest value is written. Requires start_scheduler.
+
+        Args:
+            name (str): property name
+            value (Any): value to write
+
+        Returns:
+            Future[None]: resolves once the write is acknowledged
+        """
+        if self._scheduler is None:
+            raise RuntimeError("submit_write requires start_scheduler")
+        prop = self._get_property(name)
+        message = prop.write_message(value)
+        result: "Future[None]" = Future()
+        shadow = self._shadow
+        with self._write_lock:
+            if shadow is not None and not shadow.begin(name, value):
+                result.set_result(None)
+                return result
+            try:
+                future = self._scheduler.submit(
+                    [message], priority=Priority.CONTROL, key=("write", name)
+                )
+            except Exception:
+                if shadow is not None:
+                    shadow.end(name)
+                raise
+            queued = self._queued_writes.get(name)
+            if queued is not None and queued.future is future:
+                # replaced the queued write, which now sends this value
+                queued.value = value
+                queued.results.append(result)
+                return result
+            queued = _QueuedWrite(future, value, [result])
+            self._queued_writes[name] = queued
+        future.add_done_callback(functools.partial(self._write_done, name, queued))
+        return result
+
+    def _write_done(
+        self, name: str, queued: _QueuedWrite, future: "Future[List[Response]]"
+    ) -> None:
+        # called once per exchange, for all submit_write calls coalesced into it
+        with self._write_lock:
+            if self._queued_writes.get(name) is queued:
+                del self._queued_writes[name]
+            value, results = queued.value, list(queued.results)
+        shadow = self._shadow
+        try:
+            future.result()[0].raise_for_error()
+        except Exception as error:
+            if shadow is not None:
+                shadow.end(name, writes=len(results))
+            for result in results:
+                result.set_exception(error)
+            return
+        if shadow is not None:
+            shadow.end(name, value, writes=len(results))
+        if self._cache is not None:
+            self._cache.invalidate(self._get_property(name).read_command)
+        for result in results:
+            result.set_result(None)
+
+    def verify_shadow(self, *names: str) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Read back properties with a confirmed value in the shadow state (all if no
+        names are given) and replace the confirmed values with the values read.
+        Properties with a queued write are skipped, their value is confirmed once the
+        write is done.
+
+        Returns:
+            Dict[str, Tuple[Any, Any]]: confirmed and read value of each property that
+                does not match within its tolerance
+        """
+        if self._shadow is None:
+            raise RuntimeError("verify_shadow requires shadow=True")
+        shadow = self._shadow
+        if len(names) == 0:
+            names = tuple(
+                name for name in self.properties if shadow.get(name) is not MISSING
+            )
+        names = tuple(name for name in names if not shadow.pending(name))
+        if len(names) == 0:
+            return {}
+        expected = [shadow.get(name) for name in names]
+        # reading the properties confirms the values read
+        values = self.read_many(*names, use_cache=False)
+        mismatches = {}
+        for name, confirmed, value in zip(names, expected, values):
+            if confirmed is not MISSING and not shadow.matches(name, confirmed):
+                mismatches[name] = (confirmed, value)
+        if mismatches:
+            logging.warning(f"Shadow state does not match the amplifier: {mismatches}")
+        return mismatches
+
+    def wait_until_settled(
+        self,
+        target: Optional[float] = None,
+        tolerance: float = 0.05,
+        max_slope: float = 0.01,
+        dwell: float = 1.0,
+        timeout: float = 60.0,
+        interval: float = 0.2,
+        window: int = 5,
+        max_power_slope: Optional[float] = None,
+    ) -> SettleResult:
+        """
+        Wait until the SHG temperature settled at the setpoint. The temperature is
+        settled once it is within tolerance of the target and the slope fitted to the
+        last window samples is below max_slope, continuously for at least dwell
+        seconds.
+
+        Args:
+            target (Optional[float]): temperature in C, defaults to the setpoint
+            tolerance (float): maximum deviation from target in C
+            max_slope (float): maximum temperature slope in C/s
+            dwell (float): time in s the criteria have to hold
+            timeout (float): maximum time to wait in s
+            interval (float): polling interval in s
+            window (int): number of samples used to estimate the slope
+            max_power_slope (Optional[float]): if not None, also require the slope of
+                the output power to be below max_power_slope in mW/s
+
+        Returns:
+            SettleResult: whether the temperature settled and the measured settle time
+        """
+        if target is None:
+            target = self.shg_temperature_setpoint
+        names = ["shg_temperature"]
+        if max_power_slope is not None:
+            names.append("output_power")
+
+        times: deque = deque(maxlen=window)
+        temperatures: deque = deque(maxlen=window)
+        powers: deque = deque(maxlen=window)
+        tstart = time.monotonic()
+        settled_since: Optional[float] = None
+        samples = 0
+        while True:
+            values = self.read_many(*names, use_cache=False)
+            now = time.monotonic()
+            samples += 1
+            times.append(now)
+            temperatures.append(values[0])
+            if max_power_slope is not None:
+                powers.append(values[1])
+
+            temperature_slope = slope(times, temperatures)
+            power_slope = slope(times, powers) if max_power_slope is not None else None
+            within = (
+                abs(values[0] - target) <= tolerance
+                and len(times) == window
+                and abs(temperature_slope) <= max_slope
+                and (power_slope is None or abs(power_slope) <= max_power_slope)
+            )
+            if not within:
+                settled_since = None
+            elif settled_since is None:
+                settled_since = now
+
+            settled = settled_since is not None and (now - settled_since) >= dwell
+            if settled or (now - tstart) >= timeout:
+                if not settled:
+                    logging.warning(
+                        f"SHG temperature did not settle at {target:.2f} C within"
+                        f" {timeout:.1f} s"
+                    )
+                return SettleResult(
+                    settled,
+                    (settled_since if settled else now) - tstart,
+                    target,
+                    values[0],
+                    temperature_slope,
+                    values[1] if max_power_slope is not None else None,
+                    power_slope,
+                    samples,
+                )
+            time.sleep(interval)
+
+    def power_up(
+        self,
+        target: LaserState = LaserState.BOOSTER_ON,
+        current_tolerance: float = 10.0,
+        hold: float = 2.0,
+        timeout: float = 60.0,
+        progress: Optional[Callable[[NamedTuple], None]] = None,
+    ) -> NamedTuple:
+        """
+        Enable the laser and wait until the laser state reaches target with the booster
+        current within current_tolerance of the setpoint for hold seconds. Polls the
+        laser state and booster current in a single exchange with a bounded backoff.
+
+        Args:
+            target (LaserState): laser state to reach
+            current_tolerance (float): maximum deviation of the booster current from
+                the setpoint in mA
+            hold (float): time in s the target has to be held
+            timeout (float): maximum time to wait in s
+            progress (Optional[Callable[[NamedTuple], None]]): called with every
+                sample of laser_state, booster_current and booster_current_setpoint
+
+        Raises:
+            MPBKeyError: key not in the enable position or the keylock is triggered
+            MPBStateError: amplifier is in the FAULT or INTERLOCK state
+            TimeoutError: target not reached within timeout
+
+        Returns:
+            NamedTuple: the last sample
+        """
+        monitor = PowerUpMonitor(target, current_tolerance, hold, timeout)
+        sample_type = _snapshot_type(TELEMETRY[:3])
+        setpoint = self.booster_current_setpoint
+        self.enable_laser()
+        while True:
+            state, current = self.read_many(
+                "laser_state", "booster_current", use_cache=False
+            )
+            sample = sample_type(state, current, setpoint)
+            if progress is not None:
+                progress(sample)
+            if monitor.update(sample, time.monotonic()):
+                return sample
+            time.sleep(monitor.interval)
+
+    def _invalidate_cache(self) -> None:
+        if self._cache is not None:
+            self._cache.invalidate()
 
     def enable_laser(self) -> None:
+        self._invalidate_cache()
         try:
             self._write("setLDenable 1")
         except MPBCommandError:
             raise MPBKeyError()
 
     def disable_laser(self) -> None:
+        self._invalidate_cache()
         self._write("setLDenable 0")
 
     def get_faults(self) -> List[Fault]:
         faults = self.faults
-        return [Fault(idx) for idx, flag in enumerate(faults) if flag]
+        return [fault for fault in Fault if faults & (1 << fault)]
 
     def get_alarms(self) -> List[Alarm]:
         alarms = self.alarms
-        return [Alarm(idx) for idx, flag in enumerate(alarms) if flag]
+        return [alarm for alarm in Alarm if alarms & (1 << alarm)]
 
     def enter_test_environment(self) -> None:
         logging.info("Entering the test environment")
-        logging.info(self._query("testeoa"))
-        logging.info(self._read())
-        logging.info(self._read())
-        return
+        response = self.request("testeoa").raise_for_error()
+        for line in filter(None, response.lines):
+            logging.info(line)
 
     def save_all(self) -> None:
         """Save settings to non-volatile memory"""
+        self._invalidate_cache()
         self._write("SAVEALL")
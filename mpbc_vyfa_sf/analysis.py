@@ -0,0 +1,159 @@
+import csv
+import datetime
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from .fitting import Sinc2FitBatch, fit_sinc2_batch
+
+COLUMNS = ("timestamp", "setpoint", "temperature", "power")
+
+# date in the scan file names, e.g. shg_temperature_scan_2023_04_05T15_20_52.csv
+DATE_PATTERN = re.compile(r"(\d{4})_(\d{2})_(\d{2})T(\d{2})_(\d{2})_(\d{2})")
+
+
+def normalize_column(name: str) -> Optional[str]:
+    """
+    Map the header variants of scan files onto COLUMNS, e.g. "SHG temperature setpoint
+    [C]" and "setpoint" onto setpoint and "output power [mW]" and "power [mW]" onto
+    power. Returns None for unknown columns.
+    """
+    name = name.lower()
+    if "timestamp" in name:
+        return "timestamp"
+    elif "setpoint" in name:
+        return "setpoint" if "temperature" in name or name == "setpoint" else None
+    elif "temperature" in name:
+        return "temperature"
+    elif "power" in name and "input" not in name and "seed" not in name:
+        return "power"
+    return None
+
+
+def _parse(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def _scan_date(path: Path) -> np.datetime64:
+    match = DATE_PATTERN.search(path.name)
+    if match is not None:
+        date = datetime.datetime(*(int(group) for group in match.groups()))
+    else:
+        date = datetime.datetime.fromtimestamp(path.stat().st_mtime)
+    return np.datetime64(date, "s")
+
+
+@dataclass
+class ScanCollection:
+    """
+    Scans padded to a common length, arrays have shape (scans, points) with NaN for
+    missing values and padding.
+    """
+
+    paths: List[Path]
+    dates: npt.NDArray[np.datetime64]
+    lengths: npt.NDArray[np.int64]
+    data: npt.NDArray[np.float64]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def column(self, name: str) -> npt.NDArray[np.float64]:
+        return self.data[:, :, COLUMNS.index(name)]
+
+    @property
+    def setpoint(self) -> npt.NDArray[np.float64]:
+        return self.column("setpoint")
+
+    @property
+    def temperature(self) -> npt.NDArray[np.float64]:
+        return self.column("temperature")
+
+    @property
+    def power(self) -> npt.NDArray[np.float64]:
+        return self.column("power")
+
+    @property
+    def x(self) -> npt.NDArray[np.float64]:
+        """Measured SHG temperature, or the setpoint where it was not recorded"""
+        temperature = self.temperature
+        return np.where(np.isnan(temperature), self.setpoint, temperature)
+
+
+def load_scans(
+    paths: Union[str, Path, Iterable[Union[str, Path]]], pattern: str = "*.csv"
+) -> ScanCollection:
+    """
+    Load scan CSV files into a single padded array, sorted by date. Header variants
+    are normalized with normalize_column. Rows with two values under a wider header,
+    written by scans that did not record the SHG temperature, are read as setpoint and
+    power; other rows with fewer values than the header are padded with NaN.
+
+    Args:
+        paths (Union[str, Path, Iterable[Union[str, Path]]]): directory with scan files
+            or the paths of the scan files
+        pattern (str): glob pattern of the scan files in a directory
+
+    Returns:
+        ScanCollection: padded scans
+    """
+    if isinstance(paths, (str, Path)) and Path(paths).is_dir():
+        files = sorted(Path(paths).glob(pattern))
+    elif isinstance(paths, (str, Path)):
+        files = [Path(paths)]
+    else:
+        files = [Path(path) for path in paths]
+
+    scans = []
+    for path in files:
+        with open(path, newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            indices = [normalize_column(name) for name in header]
+            rows = [[_parse(value) for value in row] for row in reader if row]
+        # header of a scan with a temperature readback, with rows that miss it
+        short = len(indices) > 2 and {"setpoint", "power"} <= set(indices)
+        scan = np.full((len(rows), len(COLUMNS)), np.nan)
+        for idx, row in enumerate(rows):
+            if short and len(row) == 2:
+                scan[idx, [COLUMNS.index("setpoint"), COLUMNS.index("power")]] = row
+                continue
+            for column, value in zip(indices, row):
+                if column is not None:
+                    scan[idx, COLUMNS.index(column)] = value
+        scans.append(scan)
+
+    dates = np.array([_scan_date(path) for path in files], dtype="datetime64[s]")
+    order = np.argsort(dates, kind="stable")
+    lengths = np.array([len(scan) for scan in scans], dtype=np.int64)
+    data = np.full(
+        (len(scans), lengths.max(initial=0), len(COLUMNS)), np.nan, dtype=np.float64
+    )
+    for idx, scan in enumerate(scans):
+        data[idx, : len(scan)] = scan
+
+    return ScanCollection(
+        [files[idx] for idx in order], dates[order], lengths[order], data[order]
+    )
+
+
+def fit_scans(scans: ScanCollection) -> Sinc2FitBatch:
+    """Fit the sinc² phase-matching peak of all scans at once"""
+    return fit_sinc2_batch(scans.x, scans.power)
+
+
+def optimum_drift(
+    scans: ScanCollection, fits: Optional[Sinc2FitBatch] = None
+) -> Tuple[npt.NDArray[np.datetime64], npt.NDArray[np.float64]]:
+    """Dates and phase-matching temperatures of the scans with a converged fit"""
+    if fits is None:
+        fits = fit_scans(scans)
+    converged = fits.converged
+    return scans.dates[converged], fits.center[converged]
@@ -0,0 +1,402 @@
+import datetime
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .amplifier import MPBAmplifier
+from .recorder import ScanRecorder, column_path, load_scan
+from .timing import DeadlineScheduler, TimingStatistics
+
+# measurement properties logged by default, with the alarms and faults as bitmasks
+LOG_CHANNELS = (
+    "enabled",
+    "state",
+    "laser_state",
+    "seed_current",
+    "preamp_current",
+    "preamp_current_setpoint",
+    "booster_current",
+    "booster_current_setpoint",
+    "shg_temperature",
+    "shg_temperature_setpoint",
+    "seed_power",
+    "output_power",
+    "output_power_setpoint",
+    "power_stabilization",
+    "alarms",
+    "faults",
+)
+
+PARTITION_FORMAT = "%Y-%m-%d"
+PARTITION_DURATION = 86_400
+
+
+def _partition(timestamp: float) -> str:
+    date = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return date.strftime(PARTITION_FORMAT)
+
+
+def _partition_start(name: str) -> float:
+    date = datetime.datetime.strptime(name, PARTITION_FORMAT)
+    return date.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """
+    Chunk of an archive. Sealed chunks are compressed .npz files with one array per
+    column, named after their first and last timestamp in ms; an active chunk is written
+    uncompressed by a ScanRecorder and named after its first timestamp, its path is the
+    .json file of the recorder.
+    """
+
+    path: Path
+    start: float
+    end: Optional[float]
+
+    @property
+    def sealed(self) -> bool:
+        return self.end is not None
+
+    @classmethod
+    def from_path(cls, path: Path) -> "Chunk":
+        if path.suffix == ".npz":
+            start, end = path.stem.split("_")
+            return cls(path, int(start) / 1e3, int(end) / 1e3)
+        return cls(path, int(path.stem) / 1e3, None)
+
+    def overlaps(self, start: float, end: float) -> bool:
+        return self.start <= end and (self.end is None or self.end >= start)
+
+
+def list_chunks(
+    root: Union[str, Path], start: float = -np.inf, end: float = np.inf
+) -> List[Chunk]:
+    """
+    Chunks of the archive in root that overlap the time range from start to end, in
+    order of time. Only the names of the partitions and chunks are read, and partitions
+    entirely outside of the range are skipped.
+    """
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    chunks = []
+    for partition in root.iterdir():
+        try:
+            partition_start = _partition_start(partition.name)
+        except ValueError:
+            continue
+        if partition_start > end or partition_start + PARTITION_DURATION < start:
+            continue
+        for path in partition.iterdir():
+            if path.suffix in (".json", ".npz"):
+                chunk = Chunk.from_path(path)
+                if chunk.overlaps(start, end):
+                    chunks.append(chunk)
+    return sorted(chunks, key=lambda chunk: chunk.start)
+
+
+def seal_chunk(path: Union[str, Path]) -> Optional[Path]:
+    """
+    Compress an active chunk into a sealed chunk and remove the uncompressed files.
+
+    Args:
+        path (Union[str, Path]): path of the .json file of the active chunk
+
+    Returns:
+        Optional[Path]: path of the sealed chunk, None if the chunk held no samples
+    """
+    path = Path(path)
+    scan = load_scan(path)
+    sealed = None
+    if len(scan) > 0:
+        timestamps = scan["timestamp"]
+        # round outwards, such that the name covers all timestamps of the chunk
+        first = math.floor(timestamps[0] * 1e3)
+        last = math.ceil(timestamps[-1] * 1e3)
+        name = f"{first}_{last}.npz"
+        sealed = path.with_name(name)
+        # write to a temporary file first, so a sealed chunk is always complete
+        temporary = path.with_name(name + ".tmp")
+        with open(temporary, "wb") as file:
+            np.savez_compressed(file, **scan.columns)
+        temporary.replace(sealed)
+    columns = len(scan.columns)
+    # release the memory maps before removing the files
+    del scan
+    for index in range(columns):
+        column_path(path, index).unlink(missing_ok=True)
+    path.with_suffix(".json").unlink(missing_ok=True)
+    return sealed
+
+
+def _select(
+    data: Any,
+    names: Sequence[str],
+    start: float,
+    end: float,
+    columns: Optional[Sequence[str]],
+) -> np.ndarray:
+    # rows of a chunk from start to end, the timestamps of a chunk are sorted
+    timestamps = data["timestamp"]
+    first = np.searchsorted(timestamps, start, side="left")
+    last = np.searchsorted(timestamps, end, side="right")
+    if columns is not None:
+        names = ["timestamp"] + [c for c in columns if c != "timestamp"]
+    part = np.empty(last - first, dtype=[(name, np.float64) for name in names])
+    for name in names:
+        column = timestamps if name == "timestamp" else data[name]
+        part[name] = column[first:last]
+    return part
+
+
+def query(
+    root: Union[str, Path],
+    start: float = -np.inf,
+    end: float = np.inf,
+    columns: Optional[Sequence[str]] = None,
+) -> np.ndarray:
+    """
+    Samples of the archive in root with a timestamp from start to end, as a structured
+    array. Only the chunks overlapping the range are opened; the active chunk is memory
+    mapped and only the requested columns of sealed chunks are decompressed, so the
+    time of a query scales with the size of the range, not of the archive.
+
+    Args:
+        root (Union[str, Path]): directory of the archive
+        start (float): start of the range, as a time.time timestamp
+        end (float): end of the range, as a time.time timestamp
+        columns (Optional[Sequence[str]]): columns to return, all if None; the
+            timestamp is always included
+
+    Returns:
+        np.ndarray: structured array with a field per column
+    """
+    parts = []
+    for chunk in list_chunks(root, start, end):
+        if chunk.sealed:
+            # a lazily loaded zip archive, only the accessed columns are decompressed
+            with np.load(chunk.path) as data:
+                parts.append(_select(data, data.files, start, end, columns))
+        else:
+            scan = load_scan(chunk.path)
+            parts.append(_select(scan, list(scan.columns), start, end, columns))
+    if not parts:
+        names = ["timestamp"] + [c for c in columns or () if c != "timestamp"]
+        return np.empty(0, dtype=[(name, np.float64) for name in names])
+    return np.concatenate(parts)
+
+
+class ChunkWriter:
+    """
+    Append samples to an archive of chunks in a directory with a subdirectory per UTC
+    day. Samples are written to an active, uncompressed chunk by a ScanRecorder, which
+    is sealed into a compressed chunk with one array per column once it holds max_bytes
+    of samples, spans max_duration seconds or the day ends. The size and number of
+    chunks are thus bounded, and with max_age chunks older than max_age seconds are
+    removed, which bounds the disk usage of the archive.
+
+    Active chunks left behind by an interrupted writer are sealed when a new writer is
+    created.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        columns: Sequence[str],
+        max_bytes: int = 64 * 2**20,
+        max_duration: float = 3600.0,
+        max_age: Optional[float] = None,
+        flush_interval: float = 5.0,
+    ):
+        """
+        Args:
+            root (Union[str, Path]): directory of the archive
+            columns (Sequence[str]): columns, the first column is the timestamp
+            max_bytes (int): maximum uncompressed size of a chunk in bytes
+            max_duration (float): maximum time span of a chunk in s
+            max_age (Optional[float]): remove chunks that ended more than max_age s
+                ago, keep all chunks if None
+            flush_interval (float): maximum time in s between writes to disk
+        """
+        self.root = Path(root)
+        self.columns = tuple(columns)
+        if self.columns[0] != "timestamp":
+            raise ValueError("the first column has to be the timestamp")
+        self.max_rows = max(max_bytes // (8 * len(self.columns)), 1)
+        self.max_duration = max_duration
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+
+        self._recorder: Optional[ScanRecorder] = None
+        self._rows = 0
+        self._start = 0.0
+        self._partition = ""
+        self.root.mkdir(parents=True, exist_ok=True)
+        for chunk in list_chunks(self.root):
+            if not chunk.sealed:
+                logging.info(f"Sealing interrupted chunk {chunk.path}")
+                seal_chunk(chunk.path)
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def append(self, sample: Sequence[float]) -> None:
+        """Append a sample with one value per column, starting with the timestamp"""
+        timestamp = sample[0]
+        if self._recorder is not None and (
+            self._rows >= self.max_rows
+            or timestamp - self._start >= self.max_duration
+            or _partition(timestamp) != self._partition
+        ):
+            self.rotate()
+        if self._recorder is None:
+            self._open(timestamp)
+        self._recorder.append(sample)
+        self._rows += 1
+
+    def _open(self, timestamp: float) -> None:
+        self._start = timestamp
+        self._rows = 0
+        self._partition = _partition(timestamp)
+        partition = self.root / self._partition
+        partition.mkdir(exist_ok=True)
+        self._recorder = ScanRecorder(
+            partition / f"{round(timestamp * 1e3)}.json",
+            self.columns,
+            buffer_size=256,
+            flush_interval=self.flush_interval,
+            write_csv=False,
+        )
+
+    def rotate(self) -> None:
+        """Seal the active chunk, the next sample starts a new chunk"""
+        if self._recorder is None:
+            return
+        self._recorder.close()
+        seal_chunk(self._recorder.metadata_path)
+        self._recorder = None
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove chunks older than max_age and the partitions left empty"""
+        if self.max_age is None:
+            return
+        cutoff = time.time() - self.max_age
+        for chunk in list_chunks(self.root, end=cutoff):
+            if chunk.sealed and chunk.end < cutoff:
+                chunk.path.unlink()
+        for partition in self.root.iterdir():
+            if partition.is_dir() and not any(partition.iterdir()):
+                partition.rmdir()
+
+    def flush(self) -> None:
+        if self._recorder is not None:
+            self._recorder.flush()
+
+    def close(self) -> None:
+        self.rotate()
+
+
+class TelemetryLogger:
+    """
+    Log measurement properties of an amplifier at a fixed rate to a ChunkWriter, on a
+    background thread paced by a DeadlineScheduler. Failed reads are logged and
+    skipped, the amplifier reconnects by itself if the connection dropped.
+    """
+
+    def __init__(
+        self,
+        amplifier: MPBAmplifier,
+        writer: ChunkWriter,
+        channels: Sequence[str] = LOG_CHANNELS,
+        rate: float = 1.0,
+    ):
+        """
+        Args:
+            amplifier (MPBAmplifier): amplifier to log
+            writer (ChunkWriter): archive with the columns timestamp and channels
+            channels (Sequence[str]): properties to log
+            rate (float): sample rate in Hz
+        """
+        if tuple(writer.columns) != ("timestamp",) + tuple(channels):
+            raise ValueError("the columns of the writer do not match the channels")
+        self.amplifier = amplifier
+        self.writer = writer
+        self.channels = tuple(channels)
+        self.rate = rate
+        self.count = 0
+        self.errors = 0
+        self.timing = TimingStatistics(1 / rate)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "TelemetryLogger":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="TelemetryLogger", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop logging and seal the active chunk once the logging thread exited
+
+        Args:
+            timeout (Optional[float]): maximum time in s to wait for the thread
+
+        Raises:
+            RuntimeError: thread still running after timeout, e.g. in a read that
+                hangs, the active chunk is not sealed and stop may be called again
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                raise RuntimeError(f"TelemetryLogger did not stop within {timeout} s")
+            self._thread = None
+        self.writer.close()
+
+    def sample(self) -> None:
+        """Read the channels once and append them to the writer"""
+        timestamp = time.time()
+        values = self.amplifier.read_many(*self.channels, use_cache=False)
+        self.writer.append((timestamp,) + tuple(float(value) for value in values))
+        self.count += 1
+
+    def _run(self) -> None:
+        # skip missed samples instead of trying to catch up
+        schedule = DeadlineScheduler(
+            1 / self.rate, skip_missed=True, sleep=self._stop.wait
+        )
+        schedule.start()
+        self.timing = schedule.stats
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                self.errors += 1
+                logging.exception("TelemetryLogger failed to read the amplifier")
+            schedule.wait()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from .amplifier import TELEMETRY, MPBAmplifier, _snapshot_type
+from .enums import Alarm, Fault, LaserState
+from .exceptions import MPBCommandError, MPBKeyError
+from .power import PowerUpMonitor
+from .protocol import Response, parse_response, split_frame
+
+
+def _serial_port(resource_name: str) -> str:
+    # translate visa port to com port, e.g. ASRL30::INSTR, or to the device path, e.g.
+    # ASRL/dev/ttyUSB0::INSTR
+    if resource_name.startswith("ASRL") and resource_name.endswith("::INSTR"):
+        port = resource_name[4:-7]
+        return f"COM{port}" if port.isdigit() else port
+    return resource_name
+
+
+class AsyncMPBAmplifier:
+    """
+    asyncio driver for the MPB amplifier, with the same properties and commands as
+    MPBAmplifier exposed as coroutines. Properties are read and written by name with
+    get and set, e.g. `await amp.get("output_power")`.
+
+    Exchanges with the amplifier are serialized with a lock per device, so multiple
+    amplifiers and a UI can share a single event loop without threads.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        timeout: float = 2.0,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self._lock = asyncio.Lock()
+        self._buffer = bytearray()
+        # replies not read yet, of an exchange that timed out or was cancelled
+        self._pending = 0
+
+    @classmethod
+    async def open(
+        cls, resource_name: str, baud_rate: int = 9600, timeout: float = 2.0
+    ) -> "AsyncMPBAmplifier":
+        """Open the serial port of the amplifier, requires pyserial-asyncio"""
+        try:
+            import serial_asyncio
+        except ImportError as error:
+            raise ImportError(
+                "AsyncMPBAmplifier requires pyserial-asyncio, install with "
+                "`pip install mpbc-vyfa-sf[async]`"
+            ) from error
+
+        reader, writer = await serial_asyncio.open_serial_connection(
+            url=_serial_port(resource_name), baudrate=baud_rate
+        )
+        return cls(reader, writer, timeout=timeout)
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def __aenter__(self) -> "AsyncMPBAmplifier":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def _send(self, command: str) -> None:
+        self.writer.write(f"{command}\r".encode())
+        await self.writer.drain()
+
+    async def _read_frame(self) -> List[str]:
+        while True:
+            frame = split_frame(self._buffer)
+            if frame is not None:
+                lines, length = frame
+                del self._buffer[:length]
+                return lines
+            chunk = await asyncio.wait_for(self.reader.read(4096), self.timeout)
+            if not chunk:
+                raise ConnectionError("Connection closed by the amplifier")
+            self._buffer += chunk
+
+    async def _discard_pending(self) -> None:
+        # replies of an exchange that timed out may still arrive, read and discard them
+        # such that they are not taken for the replies to the next commands
+        try:
+            while self._pending > 0:
+                lines = await self._read_frame()
+                self._pending -= 1
+                logging.warning(f"Discarded late reply {lines}")
+        except asyncio.TimeoutError:
+            logging.warning(f"{self._pending} replies did not arrive")
+        self._pending = 0
+
+    async def _exchange(self, commands: Sequence[str]) -> List[Response]:
+        async with self._lock:
+            if self._pending > 0:
+                await self._discard_pending()
+            if self._buffer:
+                logging.warning(f"Discarded unexpected input {bytes(self._buffer)!r}")
+                self._buffer.clear()
+            self._pending = len(commands)
+            await self._send("\r".join(commands))
+            responses = []
+            for command in commands:
+                responses.append(parse_response(command, await self._read_frame()))
+                self._pending -= 1
+            return responses
+
+    async def request(self, command: str) -> Response:
+        """Send a raw command and return the reply, without raising for error codes"""
+        return (await self._exchange([command]))[0]
+
+    async def _query(self, command: str) -> str:
+        return (await self._query_many([command]))[0]
+
+    async def _query_many(self, commands: Sequence[str]) -> List[str]:
+        responses = await self._exchange(commands)
+        return [response.raise_for_error().payload for response in responses]
+
+    async def _write(self, command: str) -> None:
+        (await self._exchange([command]))[0].raise_for_error()
+
+    async def get(self, name: str) -> Any:
+        prop = MPBAmplifier._get_property(name)
+        return prop.parse(await self._query(prop.read_command))
+
+    async def set(self, name: str, value: Any) -> None:
+        prop = MPBAmplifier._get_property(name)
+        await self._write(prop.write_message(value))
+
+    async def read_many(self, *names: str) -> List[Any]:
+        """Read multiple properties with the commands sent back-to-back"""
+        properties = [MPBAmplifier._get_property(name) for name in names]
+        messages = await self._query_many([prop.read_command for prop in properties])
+        return [prop.parse(msg) for prop, msg in zip(properties, messages)]
+
+    async def snapshot(self, *names: str) -> NamedTuple:
+        if len(names) == 0:
+            names = TELEMETRY
+        return _snapshot_type(names)(*(await self.read_many(*names)))
+
+    async def enable_laser(self) -> None:
+        try:
+            await self._write("setLDenable 1")
+        except MPBCommandError:
+            raise MPBKeyError()
+
+    async def disable_laser(self) -> None:
+        await self._write("setLDenable 0")
+
+    async def power_up(
+        self,
+        target: LaserState = LaserState.BOOSTER_ON,
+        current_tolerance: float = 10.0,
+        hold: float = 2.0,
+        timeout: float = 60.0,
+        progress: Optional[Callable[[NamedTuple], None]] = None,
+    ) -> NamedTuple:
+        """Enable the laser and wait until powered up, see MPBAmplifier.power_up"""
+        monitor = PowerUpMonitor(target, current_tolerance, hold, timeout)
+        sample_type = _snapshot_type(TELEMETRY[:3])
+        setpoint = await self.get("booster_current_setpoint")
+        await self.enable_laser()
+        while True:
+            state, current = await self.read_many("laser_state", "booster_current")
+            sample = sample_type(state, current, setpoint)
+            if progress is not None:
+                progress(sample)
+            if monitor.update(sample, time.monotonic()):
+                return sample
+            await asyncio.sleep(monitor.interval)
+
+    async def get_faults(self) -> List[Fault]:
+        faults = await self.get("faults")
+        return [fault for fault in Fault if faults & (1 << fault)]
+
+    async def get_alarms(self) -> List[Alarm]:
+        alarms = await self.get("alarms")
+        return [alarm for alarm in Alarm if alarms & (1 << alarm)]
+
+    async def enter_test_environment(self) -> None:
+        logging.info("Entering the test environment")
+        response = (await self.request("testeoa")).raise_for_error()
+        for line in filter(None, response.lines):
+            logging.info(line)
+
+    async def save_all(self) -> None:
+        """Save settings to non-volatile memory"""
+        await self._write("SAVEALL")
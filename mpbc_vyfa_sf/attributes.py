@@ -1,9 +1,18 @@
-from typing import List, Optional
+from enum import IntFlag
+from typing import Any, Optional, Type
 
+from .cache import MISSING
 from .enums import LaserState
+from .protocol import encode_command
 
 
 class Property:
+    """
+    Descriptor for a property of the amplifier. The read command and the prefix of the
+    write command are encoded once when the owning class is created, and every
+    property is registered in the properties dict of the owning class.
+    """
+
     def __init__(
         self,
         name: str,
@@ -12,6 +21,8 @@ class Property:
         write_prefix: str = "SET",
         write_command: Optional[str] = None,
         read_only: bool = True,
+        cache_ttl: Optional[float] = None,
+        tolerance: Optional[float] = None,
     ):
         self._name = name
         self._command = command
@@ -19,70 +30,110 @@ class Property:
         self._read_prefix = read_prefix
         self._write_prefix = write_prefix
         self._write_command = write_command
+        # time-to-live of cached reads in seconds, None uses the default of the cache
+        self._cache_ttl = cache_ttl
+        # maximum difference to the confirmed value for which a write is skipped
+        self.tolerance = tolerance
+
+        self.attribute: Optional[str] = None
+        self.read_command = f"{read_prefix}{command}"
+        self.read_bytes = encode_command(self.read_command)
+        self._write_template = (
+            f"{write_prefix}{command if write_command is None else write_command} "
+        )
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.attribute = name
+        # every class gets its own registry, extending the one of its base class
+        if "properties" not in owner.__dict__:
+            owner.properties = dict(getattr(owner, "properties", {}))
+        owner.properties[name] = self
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def read_only(self) -> bool:
+        return self._read_only
+
+    def parse(self, message: str) -> Any:
+        """Convert a reply of the amplifier into the python value of the property"""
+        return message
 
     def __get__(self, instance, owner):
-        msg = instance._query(f"{self._read_prefix}{self._command}")
-        return msg
-
-    def __set__(self, instance, value) -> None:
+        if instance is None:
+            return self
+        cache = instance._cache
+        if cache is not None:
+            value = cache.get(self.read_command, self._cache_ttl)
+            if value is not MISSING:
+                return value
+        value = self.parse(instance._query(self.read_command, self.read_bytes))
+        if cache is not None:
+            cache.set(self.read_command, value)
+        if instance._shadow is not None and not self._read_only:
+            instance._shadow.confirm(self.attribute, value)
+        return value
+
+    def format(self, value: Any) -> str:
+        """Value as sent to the amplifier"""
+        return str(value)
+
+    def write_message(self, value) -> str:
+        """Command that sets the property to value"""
         if self._read_only:
             raise ValueError(f"{self._name} is a read-only attribute")
+        return self._write_template + self.format(value)
+
+    def __set__(self, instance, value) -> None:
+        message = self.write_message(value)
+        shadow = instance._shadow
+        if shadow is None:
+            instance._write(message)
+        elif not shadow.begin(self.attribute, value):
+            return
         else:
-            if self._write_command is None:
-                instance._write(f"{self._write_prefix}{self._command} {value}")
-            else:
-                instance._write(f"{self._write_prefix}{self._write_command} {value}")
+            try:
+                instance._write(message)
+            except Exception:
+                shadow.end(self.attribute)
+                raise
+            shadow.end(self.attribute, value)
+        if instance._cache is not None:
+            instance._cache.invalidate(self.read_command)
 
 
 class FloatProperty(Property):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def __get__(self, *args, **kwargs) -> Optional[float]:
-        val = super().__get__(*args, **kwargs)
-        return float(val)
+    parse = staticmethod(float)
 
 
 class IntProperty(Property):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def __get__(self, *args, **kwargs) -> Optional[int]:
-        val = super().__get__(*args, **kwargs)
-        return int(val)
+    parse = staticmethod(int)
 
 
 class BoolProperty(Property):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def parse(self, message: str) -> bool:
+        return bool(int(message))
 
-    def __get__(self, *args, **kwargs) -> Optional[bool]:
-        val = super().__get__(*args, **kwargs)
-        return bool(int(val))
-
-    def __set__(self, *args, **kwargs):
-        if "value" in kwargs:
-            kwargs["value"] = int(kwargs["value"])
-        else:
-            args = list(args)
-            args[1] = int(args[1])
-        super().__set__(*args, **kwargs)
+    def format(self, value: Any) -> str:
+        return str(int(value))
 
 
 class FlagProperty(Property):
-    def __init__(self, *args, **kwargs):
+    """
+    Flags reported as space separated zeros and ones, parsed into flag_type with the
+    first value as the least significant bit
+    """
+
+    def __init__(self, *args, flag_type: Type[IntFlag], **kwargs):
         super().__init__(*args, **kwargs)
+        self.flag_type = flag_type
 
-    def __get__(self, *args, **kwargs) -> List[bool]:
-        ret = super().__get__(*args, **kwargs)
-        flags = [bool(int(f)) for f in ret.split(" ")]
-        return flags
+    def parse(self, message: str) -> IntFlag:
+        return self.flag_type(int(message.replace(" ", "")[::-1], 2))
 
 
 class LaserStateProperty(IntProperty):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-    def __get__(self, *args, **kwargs) -> LaserState:
-        return LaserState(super().__get__(*args, **kwargs))
-        return LaserState(super().__get__(*args, **kwargs))
+    def parse(self, message: str) -> LaserState:
+        return LaserState(int(message))
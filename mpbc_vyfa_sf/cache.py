@@ -0,0 +1,62 @@
+import math
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+MISSING = object()
+
+
+class ReadCache:
+    """
+    Cache for property reads, keyed by the read command.
+
+    Entries expire after a time-to-live, which is set per property. Properties without
+    an explicit time-to-live (measurements) use the default `ttl` of the cache.
+    """
+
+    def __init__(self, ttl: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Any:
+        """Return the cached value for key, or MISSING if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            timestamp, value = entry
+            if ttl is None:
+                ttl = self.ttl
+            if math.isinf(ttl) or (self._clock() - timestamp) <= ttl:
+                self.hits[key] += 1
+                return value
+        self.misses[key] += 1
+        return MISSING
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (self._clock(), value)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Remove the entry for key, or all entries if no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def reset_counters(self) -> None:
+        self.hits.clear()
+        self.misses.clear()
+
+    @property
+    def hit_count(self) -> int:
+        return sum(self.hits.values())
+
+    @property
+    def miss_count(self) -> int:
+        return sum(self.misses.values())
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hit_count + self.miss_count
+        return self.hit_count / total if total > 0 else 0.0
@@ -0,0 +1,168 @@
+"""
+Command line interface of mpbc-vyfa-sf.
+
+usage:
+    mpbc-vyfa-sf log COM30 --output telemetry --rate 1
+    mpbc-vyfa-sf query telemetry --start 2024-05-01T00:00 --end 2024-05-02T00:00
+"""
+
+import argparse
+import csv
+import datetime
+import logging
+import signal
+import sys
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+def _timestamp(value: str) -> float:
+    """ISO 8601 date and time in local time, or a time.time timestamp"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _size(value: str) -> int:
+    """Size in bytes with an optional k, M or G suffix"""
+    units = {"k": 2**10, "M": 2**20, "G": 2**30}
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _channel(value: str) -> str:
+    """Name of a numeric property of the amplifier"""
+    from .amplifier import MPBAmplifier
+    from .attributes import BoolProperty, FlagProperty, FloatProperty, IntProperty
+
+    prop = MPBAmplifier.properties.get(value)
+    if not isinstance(prop, (BoolProperty, FlagProperty, FloatProperty, IntProperty)):
+        raise argparse.ArgumentTypeError(f"{value} is not a numeric property")
+    return value
+
+
+def log(args: argparse.Namespace) -> None:
+    from .amplifier import MPBAmplifier
+    from .archive import LOG_CHANNELS, ChunkWriter, TelemetryLogger
+
+    channels = args.channels or LOG_CHANNELS
+    writer = ChunkWriter(
+        args.output,
+        ("timestamp",) + tuple(channels),
+        max_bytes=args.chunk_size,
+        max_duration=args.chunk_duration,
+        max_age=args.retention * 86_400 if args.retention is not None else None,
+    )
+    stop = threading.Event()
+    # stop on Ctrl-C and on termination, e.g. by a service manager
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    with MPBAmplifier(args.resource_name, baud_rate=args.baud_rate) as amp:
+        logging.info(
+            f"Logging {amp.model} {amp.serial} at {args.rate} Hz to {args.output}"
+        )
+        with TelemetryLogger(amp, writer, channels, rate=args.rate) as logger:
+            while not stop.wait(args.status_interval):
+                timing = logger.timing
+                logging.info(
+                    f"{logger.count} samples, {logger.errors} errors, "
+                    f"{timing.overruns} overruns, max jitter "
+                    f"{timing.jitter_max * 1e3:.1f} ms"
+                )
+    logging.info(f"Stopped after {logger.count} samples")
+
+
+def query(args: argparse.Namespace) -> None:
+    from .archive import query as query_archive
+
+    data = query_archive(args.archive, args.start, args.end, args.columns)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(data.dtype.names)
+    for row in data.tolist():
+        writer.writerow(row)
+    logging.info(f"{len(data)} samples")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="mpbc-vyfa-sf",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_log = commands.add_parser(
+        "log",
+        help="log the measurements, alarms and faults of an amplifier to an archive",
+    )
+    parser_log.add_argument(
+        "resource_name", help="serial port or VISA resource name, e.g. COM30"
+    )
+    parser_log.add_argument("--output", default="telemetry", help="archive directory")
+    parser_log.add_argument("--rate", type=float, default=1.0, help="sample rate in Hz")
+    parser_log.add_argument("--baud-rate", type=int, default=9600)
+    parser_log.add_argument(
+        "--channels",
+        nargs="+",
+        type=_channel,
+        help="numeric properties to log, defaults to all measurements",
+    )
+    parser_log.add_argument(
+        "--chunk-size",
+        type=_size,
+        default="64M",
+        help="maximum uncompressed size of a chunk, e.g. 64M",
+    )
+    parser_log.add_argument(
+        "--chunk-duration",
+        type=float,
+        default=3600.0,
+        help="maximum time span of a chunk in s",
+    )
+    parser_log.add_argument(
+        "--retention", type=float, help="remove chunks older than this many days"
+    )
+    parser_log.add_argument(
+        "--status-interval",
+        type=float,
+        default=60.0,
+        help="time in s between status messages",
+    )
+    parser_log.set_defaults(func=log)
+
+    parser_query = commands.add_parser(
+        "query", help="print the samples of an archive in a time range as CSV"
+    )
+    parser_query.add_argument("archive", help="archive directory")
+    parser_query.add_argument(
+        "--start",
+        type=_timestamp,
+        default=-np.inf,
+        help="start, ISO 8601 local time or timestamp",
+    )
+    parser_query.add_argument(
+        "--end",
+        type=_timestamp,
+        default=np.inf,
+        help="end, ISO 8601 local time or timestamp",
+    )
+    parser_query.add_argument("--columns", nargs="+", help="columns, defaults to all")
+    parser_query.set_defaults(func=query)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        stream=sys.stderr,
+    )
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import asciichartpy as acp
+import numpy as np
+import numpy.typing as npt
+from rich.console import Console, ConsoleOptions, Group, RenderResult
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from .downsample import BucketedSeries, lttb_indices
+
+# colors of the channels within a chart
+COLORS = (acp.lightblue, acp.lightmagenta, acp.lightgreen, acp.yellow)
+# columns taken by the panel border and padding of a chart
+BORDER_WIDTH = 4
+
+
+@dataclass
+class Chart:
+    """Chart of one or more channels, e.g. a readback and its setpoint"""
+
+    title: str
+    channels: Sequence[str]
+    height: int = 8
+    format: str = "{:>9.2f}"
+
+
+DEFAULT_CHARTS = (
+    Chart("output power [mW]", ("output_power",)),
+    Chart("SHG temperature [C]", ("shg_temperature", "shg_temperature_setpoint")),
+    Chart("booster current [mA]", ("booster_current",)),
+)
+
+
+class LiveDashboard:
+    """
+    Live console dashboard of amplifier channels. Samples are appended to a
+    BucketedSeries per chart, which downsamples incrementally on the first channel of
+    the chart and keeps the other channels with the kept points, and each chart is drawn
+    from the kept points downsampled to the width of the terminal with lttb. All
+    channels of a chart are taken at the same samples, so their traces line up.
+    Appending is cheap and the cost of a redraw depends on the terminal width only, not
+    on the number of samples, so the dashboard can be fed for a long time.
+
+    The dashboard is a rich renderable and can be combined with other renderables in a
+    Live display, or shown on its own with start/stop or as a context manager.
+    """
+
+    def __init__(
+        self,
+        charts: Sequence[Chart] = DEFAULT_CHARTS,
+        buckets: int = 1024,
+        refresh_per_second: float = 4,
+        console: Optional[Console] = None,
+    ):
+        """
+        Args:
+            charts (Sequence[Chart]): charts to show, each with the channels drawn in it
+            buckets (int): buckets of the downsampled series of each chart
+            refresh_per_second (float): maximum redraw rate when shown with start
+            console (Optional[Console]): console to draw to
+        """
+        self.charts = tuple(charts)
+        channels = (channel for chart in self.charts for channel in chart.channels)
+        self.channels = tuple(dict.fromkeys(channels))
+        self.series = [BucketedSeries(buckets) for _ in self.charts]
+        self.latest: Dict[str, float] = {channel: np.nan for channel in self.channels}
+        self.refresh_per_second = refresh_per_second
+        self.console = console
+        self.count = 0
+        self._lock = threading.Lock()
+        self._live: Optional[Live] = None
+
+    def __enter__(self) -> "LiveDashboard":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def update(
+        self, sample: Union[Mapping[str, Any], Tuple], x: Optional[float] = None
+    ) -> None:
+        """
+        Append a sample, a mapping or named tuple of channel values, e.g. from
+        MPBAmplifier.snapshot or a TelemetryPoller. Channels missing from the sample are
+        drawn as gaps, and charts are skipped if the sample misses their first channel.
+
+        Args:
+            sample (Union[Mapping[str, Any], Tuple]): channel values
+            x (Optional[float]): x coordinate of the sample, defaults to the timestamp
+                of the sample if it has one, otherwise to the sample number
+        """
+        if hasattr(sample, "_asdict"):
+            sample = sample._asdict()
+        if x is None:
+            x = sample.get("timestamp", self.count)
+        values = {
+            channel: float(sample[channel])
+            for channel in self.channels
+            if sample.get(channel) is not None
+        }
+        with self._lock:
+            self.count += 1
+            self.latest.update(values)
+            for chart, series in zip(self.charts, self.series):
+                if chart.channels[0] in values:
+                    series.append(
+                        x, *(values.get(channel, np.nan) for channel in chart.channels)
+                    )
+
+    def start(self) -> None:
+        """Show the dashboard in a Live display that redraws refresh_per_second"""
+        if self._live is None:
+            self._live = Live(
+                self,
+                console=self.console,
+                refresh_per_second=self.refresh_per_second,
+            )
+            self._live.start()
+
+    def stop(self) -> None:
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def chart_data(self, index: int, points: int) -> npt.NDArray[np.float64]:
+        """
+        Points of chart index downsampled to at most points points with lttb on its
+        first channel, a row of x and the value of each channel per point
+        """
+        with self._lock:
+            table = self.series[index].table()
+        return table[lttb_indices(table[:, 0], table[:, 1], points)]
+
+    def _chart(self, index: int, width: int) -> Panel:
+        chart = self.charts[index]
+        # the y axis labels take the width of a formatted value and the axis
+        label_width = len(chart.format.format(0)) + 2
+        points = max(width - label_width - BORDER_WIDTH, 2)
+        data = self.chart_data(index, points)
+        latest = [self.latest[channel] for channel in chart.channels]
+        series = [
+            data[:, 1 + i].tolist()
+            for i in range(len(chart.channels))
+            if not np.isnan(data[:, 1 + i]).all()
+        ]
+        if not series:
+            return Panel(Text("no data"), title=Text(chart.title))
+        plot = acp.plot(
+            series,
+            {"height": chart.height, "format": chart.format, "colors": COLORS},
+        )
+        subtitle = ", ".join(
+            f"{channel} = {chart.format.format(value).strip()}"
+            for channel, value in zip(chart.channels, latest)
+        )
+        return Panel(
+            Text.from_ansi(plot), title=Text(chart.title), subtitle=Text(subtitle)
+        )
+
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> RenderResult:
+        width = options.max_width
+        summary = Table.grid(padding=(0, 2))
+        summary.add_row(
+            f"samples: {self.count}", time.strftime("%H:%M:%S", time.localtime())
+        )
+        charts = (self._chart(index, width) for index in range(len(self.charts)))
+        yield Group(summary, *charts)
+
+    def values(self) -> Dict[str, float]:
+        """Latest value of each channel"""
+        with self._lock:
+            return dict(self.latest)
@@ -0,0 +1,170 @@
+from typing import List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+
+def minmax_indices(y: npt.ArrayLike, buckets: int) -> npt.NDArray[np.int64]:
+    """
+    Indices of the minimum and maximum of y in each of buckets equally sized buckets, in
+    increasing order, such that peaks survive the downsampling. Returns all indices if y
+    has at most 2 * buckets values.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = n // buckets
+    # the values that do not fill a whole bucket are added to the last one below
+    blocks = y[: size * buckets].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    indices = np.concatenate(
+        [
+            offsets + np.nanargmin(blocks, axis=1),
+            offsets + np.nanargmax(blocks, axis=1),
+        ]
+    )
+    tail = y[size * buckets :]
+    if len(tail) > 0:
+        start = size * buckets
+        indices = np.append(
+            indices, [start + np.nanargmin(tail), start + np.nanargmax(tail)]
+        )
+    return np.unique(indices)
+
+
+def minmax(
+    x: npt.ArrayLike, y: npt.ArrayLike, buckets: int
+) -> Tuple[npt.NDArray, npt.NDArray]:
+    """Downsample a trace to the minimum and maximum of y in each bucket"""
+    indices = minmax_indices(y, buckets)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+def lttb_indices(
+    x: npt.ArrayLike, y: npt.ArrayLike, threshold: int
+) -> npt.NDArray[np.int64]:
+    """
+    Indices of the points selected by Largest-Triangle-Three-Buckets downsampling to
+    threshold points, which keeps the visual shape of a trace. The first and last point
+    are always kept, the other points are split into threshold - 2 buckets and the point
+    forming the largest triangle with the previously selected point and the mean of the
+    next bucket is selected from each bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            xc, yc = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            xc, yc = x[-1], y[-1]
+        areas = np.abs(
+            (x[a] - xc) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (yc - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        indices[bucket + 1] = a
+    return indices
+
+
+def lttb(
+    x: npt.ArrayLike, y: npt.ArrayLike, threshold: int
+) -> Tuple[npt.NDArray, npt.NDArray]:
+    """Downsample a trace to threshold points with Largest-Triangle-Three-Buckets"""
+    indices = lttb_indices(x, y, threshold)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+class BucketedSeries:
+    """
+    Series that is downsampled as it grows, for live displays of long runs. Samples are
+    aggregated into at most buckets buckets of equal size, keeping the minimum and the
+    maximum of each bucket; once all buckets are full, neighbouring buckets are merged
+    and the bucket size doubles. Appending is O(1) amortized and memory is bounded by
+    the number of buckets, while peaks are never lost.
+
+    points() returns the at most 2 * buckets kept points, which are downsampled further
+    to the width of the display, e.g. with lttb, at a cost independent of the number of
+    samples appended.
+
+    Further values, e.g. other channels sampled at the same time, can be appended with
+    each sample; they are kept with the point they were appended with, such that all
+    values of a kept point line up in time, see table.
+    """
+
+    def __init__(self, buckets: int = 1024):
+        """
+        Args:
+            buckets (int): maximum number of buckets, should be at least twice the
+                number of points displayed
+        """
+        self.buckets = buckets
+        self.bucket_size = 1
+        self.count = 0
+        self.last: float = np.nan
+        # per bucket the (x, y, *values) of the minimum and the maximum of y
+        self._min: List[Tuple[float, ...]] = []
+        self._max: List[Tuple[float, ...]] = []
+        self._filled = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, x: float, y: float, *values: float) -> None:
+        self.count += 1
+        self.last = y
+        point = (x, y, *values)
+        if self._min and self._filled < self.bucket_size:
+            self._filled += 1
+            if y < self._min[-1][1]:
+                self._min[-1] = point
+            if y > self._max[-1][1]:
+                self._max[-1] = point
+            return
+        if len(self._min) == self.buckets:
+            self._merge()
+        self._min.append(point)
+        self._max.append(point)
+        self._filled = 1
+
+    def _merge(self) -> None:
+        # merge neighbouring buckets, a new bucket is started after merging
+        self._min = [min(pair, key=lambda p: p[1]) for pair in self._pairs(self._min)]
+        self._max = [max(pair, key=lambda p: p[1]) for pair in self._pairs(self._max)]
+        self.bucket_size *= 2
+
+    @staticmethod
+    def _pairs(points: List[Tuple[float, ...]]) -> List[List[Tuple[float, ...]]]:
+        return [points[i : i + 2] for i in range(0, len(points), 2)]
+
+    def table(self) -> npt.NDArray[np.float64]:
+        """Kept points in order of x, a row of x, y and the appended values per point"""
+        if not self._min:
+            return np.empty((0, 2))
+        points = np.array(self._min + self._max, dtype=np.float64)
+        points = points[np.argsort(points[:, 0], kind="stable")]
+        # minimum and maximum coincide in buckets with a single sample
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(points[1:, :2] != points[:-1, :2], axis=1)
+        return points[keep]
+
+    def points(self) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """x and y of the kept points in order of x"""
+        points = self.table()
+        return points[:, 0], points[:, 1]
+
+    def downsample(
+        self, threshold: int
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """The kept points downsampled to threshold points with lttb"""
+        x, y = self.points()
+        return lttb(x, y, threshold)
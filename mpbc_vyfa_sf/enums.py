@@ -1,4 +1,4 @@
-from enum import IntEnum
+from enum import IntEnum, IntFlag
 
 
 class Alarm(IntEnum):
@@ -17,6 +17,22 @@ class Fault(IntEnum):
     CASE_TEMPERATURE = 4
 
 
+class AlarmFlag(IntFlag):
+    SHG_TEMPERATURE = 1 << Alarm.SHG_TEMPERATURE
+    TEC_TEMPERATURE = 1 << Alarm.TEC_TEMPERATURE
+    PUMP_BIAS = 1 << Alarm.PUMP_BIAS
+    LOSS_OF_OUTPUT = 1 << Alarm.LOSS_OF_OUTPUT
+    CASE_TEMPERATURE = 1 << Alarm.CASE_TEMPERATURE
+
+
+class FaultFlag(IntFlag):
+    SHG_TEMPERATURE = 1 << Fault.SHG_TEMPERATURE
+    TEC_TEMPERATURE = 1 << Fault.TEC_TEMPERATURE
+    LASER_DIODE_CURRENT = 1 << Fault.LASER_DIODE_CURRENT
+    WATCHDOG_TIMEOUT = 1 << Fault.WATCHDOG_TIMEOUT
+    CASE_TEMPERATURE = 1 << Fault.CASE_TEMPERATURE
+
+
 class LaserState(IntEnum):
     OFF = 0
     # The keylock only triggers after the interlock is triggered and the key has to be
@@ -6,3 +6,32 @@ class MPBCommandError(Exception):
 class MPBKeyError(Exception):
     def __init__(self, *args, **kwargs):
         super().__init__("Put key into enable position.")
+
+
+class MPBStateError(Exception):
+    def __init__(self, state):
+        self.state = state
+        super().__init__(f"Amplifier is in the {state.name} state.")
+
+
+class MPBGroupError(Exception):
+    def __init__(self, errors, results):
+        self.errors = errors
+        self.results = results
+        failed = ", ".join(f"{name}: {error!r}" for name, error in errors.items())
+        super().__init__(f"Command failed for {failed}")
+
+
+class MPBReplayError(Exception):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+
+class MPBPendingCommandError(TimeoutError):
+    """
+    No reply to a command that was already sent, so it may still be applied by the
+    amplifier
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+
+ArrayLike = Union[float, npt.NDArray[np.float64]]
+
+# full width at half maximum of sinc²(x) = (sin(πx) / (πx))², in units of x
+SINC2_FWHM = 0.8859
+
+
+def sinc2(
+    x: ArrayLike, amplitude: float, center: float, width: float, offset: float
+) -> ArrayLike:
+    """
+    sinc² phase-matching curve, width is the distance from the center to the first
+    zero.
+    """
+    return amplitude * np.sinc((x - center) / width) ** 2 + offset
+
+
+@dataclass
+class Sinc2Fit:
+    amplitude: float
+    center: float
+    width: float
+    offset: float
+    converged: bool
+
+    def __call__(self, x: ArrayLike) -> ArrayLike:
+        return sinc2(x, self.amplitude, self.center, self.width, self.offset)
+
+    @property
+    def fwhm(self) -> float:
+        return SINC2_FWHM * self.width
+
+
+@dataclass
+class Sinc2FitBatch:
+    """
+    sinc² fits of a batch of scans, NaN for scans with too few points to fit and for
+    fits that did not converge or have their peak outside of the scanned range
+    """
+
+    amplitude: npt.NDArray[np.float64]
+    center: npt.NDArray[np.float64]
+    width: npt.NDArray[np.float64]
+    offset: npt.NDArray[np.float64]
+    converged: npt.NDArray[np.bool_]
+
+    def __len__(self) -> int:
+        return len(self.center)
+
+    def __getitem__(self, index: int) -> Sinc2Fit:
+        return Sinc2Fit(
+            float(self.amplitude[index]),
+            float(self.center[index]),
+            float(self.width[index]),
+            float(self.offset[index]),
+            bool(self.converged[index]),
+        )
+
+
+def initial_guess(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    mask: npt.NDArray[np.bool_],
+) -> npt.NDArray[np.float64]:
+    """
+    Estimate amplitude, center, width and offset of sinc² peaks, for a batch of scans
+    with shape (scans, points). Only points where mask is True are used.
+    """
+    low = np.where(mask, y, np.inf).min(axis=1)
+    high = np.where(mask, y, -np.inf).max(axis=1)
+    amplitude = high - low
+    peak = np.argmax(np.where(mask, y, -np.inf), axis=1)
+    center = np.take_along_axis(x, peak[:, None], axis=1)[:, 0]
+
+    def extent(selection: npt.NDArray[np.bool_]) -> npt.NDArray[np.float64]:
+        upper = np.where(selection, x, -np.inf).max(axis=1)
+        lower = np.where(selection, x, np.inf).min(axis=1)
+        return upper - lower
+
+    above = mask & (y >= (low + amplitude / 2)[:, None])
+    fwhm = extent(above)
+    fwhm = np.where(np.isfinite(fwhm) & (fwhm > 0), fwhm, extent(mask) / 4)
+    return np.stack([amplitude, center, fwhm / SINC2_FWHM, low], axis=1)
+
+
+def fit_sinc2_batch(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    max_iterations: int = 100,
+    tolerance: float = 1e-8,
+) -> Sinc2FitBatch:
+    """
+    Least-squares fit of sinc² peaks to a batch of scans with shape (scans, points),
+    with the Levenberg-Marquardt algorithm vectorized over the scans. NaN values mark
+    missing points, e.g. padding of shorter scans. Fits that did not converge or with
+    a non-positive amplitude or the center outside of the scanned range are returned
+    as NaN and not converged.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    mask = np.isfinite(x) & np.isfinite(y)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    valid = mask.sum(axis=1) >= 4
+    scans = len(x)
+
+    with np.errstate(invalid="ignore"):
+        params = initial_guess(x, y, mask)
+    # placeholder parameters for scans that cannot be fitted to keep the math finite
+    params[~valid] = (0.0, 0.0, 1.0, 0.0)
+
+    def model(params: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return sinc2(x, *(params[:, idx, None] for idx in range(4)))
+
+    predicted = model(params)
+    residuals = np.where(mask, y - predicted, 0.0)
+    cost = (residuals**2).sum(axis=1)
+    damping = np.full(scans, 1e-3)
+    active = valid.copy()
+    converged = np.zeros(scans, dtype=bool)
+    identity = np.eye(4)
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+
+        # forward difference jacobian of the model, shape (scans, points, params)
+        steps = 1e-6 * np.maximum(np.abs(params), 1e-3)
+        jacobian = np.empty(x.shape + (4,))
+        for idx in range(4):
+            shifted = params.copy()
+            shifted[:, idx] += steps[:, idx]
+            jacobian[:, :, idx] = (model(shifted) - predicted) / steps[:, idx, None]
+        jacobian *= mask[:, :, None]
+
+        hessian = np.einsum("bni,bnj->bij", jacobian, jacobian)
+        gradient = np.einsum("bni,bn->bi", jacobian, residuals)
+        diagonal = np.einsum("bii->bi", hessian)
+        system = (
+            hessian
+            + (damping[:, None] * diagonal)[:, :, None] * identity
+            + 1e-12 * identity
+        )
+        try:
+            delta = np.linalg.solve(system, gradient[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            break
+        delta[~active] = 0.0
+
+        candidate = params + delta
+        candidate_predicted = model(candidate)
+        candidate_residuals = np.where(mask, y - candidate_predicted, 0.0)
+        candidate_cost = (candidate_residuals**2).sum(axis=1)
+
+        better = active & (candidate_cost < cost)
+        improvement = np.where(better, cost - candidate_cost, 0.0)
+        params[better] = candidate[better]
+        predicted[better] = candidate_predicted[better]
+        residuals[better] = candidate_residuals[better]
+        cost[better] = candidate_cost[better]
+        damping = np.where(better, damping / 10, damping * 10)
+
+        done = active & (
+            (better & (improvement <= tolerance * np.maximum(cost, 1e-12)))
+            | (damping > 1e10)
+        )
+        converged |= done
+        active &= ~done
+
+    # reject fits that did not converge or with a peak outside of the scanned range,
+    # e.g. fits to scans without a peak
+    low = np.where(mask, x, np.inf).min(axis=1)
+    high = np.where(mask, x, -np.inf).max(axis=1)
+    converged &= (params[:, 0] > 0) & (params[:, 1] >= low) & (params[:, 1] <= high)
+    params[~converged] = np.nan
+    return Sinc2FitBatch(
+        params[:, 0], params[:, 1], np.abs(params[:, 2]), params[:, 3], converged
+    )
+
+
+def fit_sinc2(
+    x: npt.NDArray[np.float64],
+    y: npt.NDArray[np.float64],
+    max_iterations: int = 100,
+    tolerance: float = 1e-8,
+) -> Sinc2Fit:
+    """Least-squares fit of a sinc² peak with the Levenberg-Marquardt algorithm"""
+    x = np.asarray(x, dtype=float)[None, :]
+    y = np.asarray(y, dtype=float)[None, :]
+    return fit_sinc2_batch(x, y, max_iterations, tolerance)[0]
@@ -0,0 +1,119 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Mapping, NamedTuple, Optional
+
+from .amplifier import MPBAmplifier
+from .exceptions import MPBGroupError
+
+
+class AmplifierGroup:
+    """
+    Multiple amplifiers, each with its own worker thread and command queue. Group
+    operations run concurrently on all amplifiers, so the latency of a group operation
+    is that of the slowest amplifier instead of the sum over all amplifiers.
+
+    Group operations return a dict with the result per amplifier name. If any of the
+    amplifiers fails an MPBGroupError is raised after all amplifiers finished, with the
+    exceptions in errors and the results of the other amplifiers in results.
+    """
+
+    def __init__(self, amplifiers: Mapping[str, MPBAmplifier]):
+        self.amplifiers = dict(amplifiers)
+        self._workers = {
+            name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"mpb-{name}")
+            for name in self.amplifiers
+        }
+
+    @classmethod
+    def open(cls, resource_names: Iterable[str], **kwargs) -> "AmplifierGroup":
+        """Open an MPBAmplifier per resource name, keyword arguments are passed on"""
+        return cls({name: MPBAmplifier(name, **kwargs) for name in resource_names})
+
+    def __enter__(self) -> "AmplifierGroup":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.amplifiers)
+
+    def __getitem__(self, name: str) -> MPBAmplifier:
+        return self.amplifiers[name]
+
+    def close(self) -> None:
+        """Finish all queued commands, stop the workers and close the amplifiers"""
+        for worker in self._workers.values():
+            worker.shutdown(wait=True)
+        for amplifier in self.amplifiers.values():
+            amplifier.close()
+
+    def submit(
+        self, name: str, func: Callable[..., Any], *args, **kwargs
+    ) -> "Future[Any]":
+        """Queue func(amplifier, *args, **kwargs) on the worker of amplifier name"""
+        return self._workers[name].submit(func, self.amplifiers[name], *args, **kwargs)
+
+    def run(
+        self,
+        func: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Run func(amplifier, *args, **kwargs) concurrently on all amplifiers"""
+        futures = {
+            name: self.submit(name, func, *args, **kwargs) for name in self.amplifiers
+        }
+        return self._gather(futures, timeout)
+
+    def _gather(
+        self, futures: Mapping[str, "Future[Any]"], timeout: Optional[float]
+    ) -> Dict[str, Any]:
+        wait(futures.values(), timeout=timeout)
+        results, errors = {}, {}
+        for name, future in futures.items():
+            if not future.done():
+                errors[name] = TimeoutError(f"{name} did not finish within {timeout} s")
+            elif future.exception() is not None:
+                errors[name] = future.exception()
+            else:
+                results[name] = future.result()
+        if errors:
+            raise MPBGroupError(errors, results)
+        return results
+
+    def snapshot(self, *names: str) -> Dict[str, NamedTuple]:
+        return self.run(MPBAmplifier.snapshot, *names)
+
+    def read_many(self, *names: str) -> Dict[str, Any]:
+        return self.run(MPBAmplifier.read_many, *names)
+
+    def get(self, name: str) -> Dict[str, Any]:
+        return self.run(getattr, name)
+
+    def set(self, name: str, value: Any) -> Dict[str, None]:
+        """Set property name to value on all amplifiers"""
+        return self.set_each(name, {amplifier: value for amplifier in self.amplifiers})
+
+    def set_each(self, name: str, values: Mapping[str, Any]) -> Dict[str, None]:
+        """Set property name per amplifier, values maps amplifier names to values"""
+        futures = {
+            amplifier: self.submit(amplifier, setattr, name, value)
+            for amplifier, value in values.items()
+        }
+        return self._gather(futures, None)
+
+    def enable_laser(self) -> Dict[str, None]:
+        return self.run(MPBAmplifier.enable_laser)
+
+    def disable_laser(self) -> Dict[str, None]:
+        return self.run(MPBAmplifier.disable_laser)
+
+    def power_up(self, **kwargs) -> Dict[str, NamedTuple]:
+        return self.run(MPBAmplifier.power_up, **kwargs)
+
+    def get_faults(self) -> Dict[str, Any]:
+        return self.run(MPBAmplifier.get_faults)
+
+    def get_alarms(self) -> Dict[str, Any]:
+        return self.run(MPBAmplifier.get_alarms)
@@ -0,0 +1,149 @@
+import bisect
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+# length of the prompt that ends every reply
+PROMPT_LENGTH = 3
+
+
+@dataclass(frozen=True)
+class CommandEvent:
+    """
+    Single exchange with the amplifier, passed to the observers of MPBAmplifier.
+    start and end are time.perf_counter timestamps in seconds.
+    """
+
+    operation: str
+    command: Optional[str]
+    bytes_sent: int
+    bytes_received: int
+    start: float
+    end: float
+    error: Optional[Exception] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class CountingInstrument:
+    """Wraps an instrument and counts the bytes written to and read from it"""
+
+    def __init__(self, instrument: Any, termination: str = "\r"):
+        self.instrument = instrument
+        self.termination = termination
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    def write(self, message: str) -> None:
+        self.bytes_written += len(message) + len(self.termination)
+        self.instrument.write(message)
+
+    def write_raw(self, data: bytes) -> None:
+        self.bytes_written += len(data)
+        self.instrument.write_raw(data)
+
+    def read(self) -> str:
+        message = self.instrument.read()
+        self.bytes_read += len(message) + len(self.termination)
+        return message
+
+    def read_frame(self) -> List[str]:
+        lines = self.instrument.read_frame()
+        self.bytes_read += sum(len(line) + len(self.termination) for line in lines)
+        self.bytes_read += PROMPT_LENGTH
+        return lines
+
+    def query(self, message: str) -> str:
+        self.write(message)
+        return self.read()
+
+    def close(self) -> None:
+        self.instrument.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.instrument, name)
+
+
+# latency histogram bucket edges in seconds, logarithmically spaced from 10 us to 10 s
+DEFAULT_BUCKETS = tuple(10 ** (exponent / 4) for exponent in range(-20, 5))
+
+
+@dataclass
+class CommandStatistics:
+    buckets: Sequence[float]
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    minimum: float = float("inf")
+    maximum: float = 0.0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    histogram: List[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        # the last bin holds durations above the last bucket edge
+        self.histogram = [0] * (len(self.buckets) + 1)
+
+    def add(self, event: CommandEvent) -> None:
+        duration = event.duration
+        self.count += 1
+        self.errors += event.error is not None
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+        self.bytes_sent += event.bytes_sent
+        self.bytes_received += event.bytes_received
+        self.histogram[bisect.bisect_left(self.buckets, duration)] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper bucket edge below which a fraction q of the durations fall"""
+        target = q * self.count
+        cumulative = 0
+        for edge, counts in zip(self.buckets, self.histogram):
+            cumulative += counts
+            if cumulative >= target:
+                return edge
+        return self.maximum
+
+
+class LatencyAggregator:
+    """
+    Observer for MPBAmplifier that keeps call counts and latency histograms per
+    command, e.g. `amp.add_observer(aggregator := LatencyAggregator())`.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.statistics: Dict[str, CommandStatistics] = {}
+
+    def __call__(self, event: CommandEvent) -> None:
+        key = event.command if event.command is not None else f"<{event.operation}>"
+        stats = self.statistics.get(key)
+        if stats is None:
+            stats = self.statistics[key] = CommandStatistics(self.buckets)
+        stats.add(event)
+
+    def reset(self) -> None:
+        self.statistics.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            command: {
+                "count": stats.count,
+                "errors": stats.errors,
+                "total": stats.total,
+                "mean": stats.mean,
+                "min": stats.minimum,
+                "max": stats.maximum,
+                "p50": stats.percentile(0.5),
+                "p99": stats.percentile(0.99),
+                "bytes_sent": stats.bytes_sent,
+                "bytes_received": stats.bytes_received,
+            }
+            for command, stats in self.statistics.items()
+        }
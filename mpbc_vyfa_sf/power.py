@@ -0,0 +1,77 @@
+from typing import NamedTuple, Optional
+
+from .enums import LaserState
+from .exceptions import MPBKeyError, MPBStateError
+
+FAILURE_STATES = (LaserState.FAULT, LaserState.INTERLOCK, LaserState.KEYLOCK)
+
+
+class PowerUpMonitor:
+    """
+    Tracks the power-up of the amplifier from samples with the laser_state,
+    booster_current and booster_current_setpoint fields.
+
+    The amplifier is powered up once the laser state equals target and the booster
+    current is within current_tolerance of the setpoint, continuously for hold seconds.
+    The polling interval backs off from min_interval to max_interval while nothing
+    changes and resets when the laser state changes.
+    """
+
+    def __init__(
+        self,
+        target: LaserState = LaserState.BOOSTER_ON,
+        current_tolerance: float = 10.0,
+        hold: float = 2.0,
+        timeout: float = 60.0,
+        min_interval: float = 0.1,
+        max_interval: float = 1.0,
+        backoff: float = 1.5,
+    ):
+        self.target = target
+        self.current_tolerance = current_tolerance
+        self.hold = hold
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._tstart: Optional[float] = None
+        self._reached: Optional[float] = None
+        self._state: Optional[LaserState] = None
+
+    def update(self, sample: NamedTuple, now: float) -> bool:
+        """Returns True once the amplifier is powered up, raises on failure"""
+        if self._tstart is None:
+            self._tstart = now
+        state = sample.laser_state
+        if state == LaserState.KEYLOCK:
+            raise MPBKeyError()
+        elif state in FAILURE_STATES:
+            raise MPBStateError(state)
+
+        if state != self._state:
+            self._state = state
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        current_ok = (
+            abs(sample.booster_current - sample.booster_current_setpoint)
+            <= self.current_tolerance
+        )
+        if state == self.target and current_ok:
+            if self._reached is None:
+                self._reached = now
+            # poll at the minimum interval while holding to not overshoot the hold
+            self.interval = self.min_interval
+            if now - self._reached >= self.hold:
+                return True
+        else:
+            self._reached = None
+
+        if now - self._tstart >= self.timeout:
+            raise TimeoutError(
+                f"amplifier did not reach {self.target.name} within {self.timeout} s,"
+                f" state is {state.name}"
+            )
+        return False
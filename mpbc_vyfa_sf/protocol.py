@@ -0,0 +1,80 @@
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Optional, Tuple
+
+from .exceptions import MPBCommandError
+
+# replies are terminated with CR and followed by a prompt without a termination
+# character, "F >" in the test environment; the prompt marks the end of a reply
+TERMINATION = b"\r"
+PROMPTS = (b"D >", b"F >")
+PROMPT_PATTERN = re.compile(rb"(?:^|\r)(?:D|F) >")
+
+
+def encode_command(command: str) -> bytes:
+    return command.encode("ascii") + TERMINATION
+
+
+class ErrorCode(Enum):
+    MISSING_ARGUMENT = "Missing argument(s)"
+    CAN_ONLY_BE_USED_FOR_TESTS = "Requires test environment"
+    DATA_CANNOT_BE_SET = "Cannot execute command"
+
+
+class Status(Enum):
+    OK = "ok"
+    ERROR = "error"
+
+
+@dataclass(frozen=True)
+class Response:
+    """
+    Reply of the amplifier to a single command: the lines received before the prompt,
+    and the error code if the amplifier rejected the command.
+    """
+
+    command: str
+    lines: Tuple[str, ...]
+    error: Optional[ErrorCode] = None
+
+    @property
+    def status(self) -> Status:
+        return Status.OK if self.error is None else Status.ERROR
+
+    @property
+    def payload(self) -> str:
+        """Last line of the reply, the value for single line replies"""
+        return self.lines[-1] if len(self.lines) > 0 else ""
+
+    def raise_for_error(self) -> "Response":
+        if self.error is not None:
+            raise MPBCommandError(f"{self.error.value}: {self.command}")
+        return self
+
+
+ERROR_PATTERN = re.compile("|".join(code.name for code in ErrorCode))
+
+
+def parse_response(command: str, lines: List[str]) -> Response:
+    for line in lines:
+        match = ERROR_PATTERN.search(line)
+        if match is not None:
+            return Response(command, tuple(lines), ErrorCode[match.group()])
+    return Response(command, tuple(lines))
+
+
+def split_frame(buffer: bytes) -> Optional[Tuple[List[str], int]]:
+    """
+    Split the first reply off buffer.
+
+    Returns:
+        Optional[Tuple[List[str], int]]: lines of the reply and the number of bytes
+            up to and including the prompt, None if the prompt was not received yet
+    """
+    match = PROMPT_PATTERN.search(buffer)
+    if match is None:
+        return None
+    frame = bytes(buffer[: match.start()])
+    lines = frame.split(TERMINATION) if len(frame) > 0 else []
+    return [line.decode("ascii") for line in lines], match.end()
@@ -0,0 +1,212 @@
+import csv
+import datetime
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from .amplifier import MPBAmplifier
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def amplifier_metadata(amplifier: MPBAmplifier) -> Dict[str, Any]:
+    """Model, serial number and booster current of the amplifier"""
+    model, serial, booster_current, setpoint = amplifier.read_many(
+        "model", "serial", "booster_current", "booster_current_setpoint"
+    )
+    return {
+        "model": model,
+        "serial": serial,
+        "booster_current": booster_current,
+        "booster_current_setpoint": setpoint,
+    }
+
+
+def _npy_header_dict(rows: int) -> str:
+    return f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({rows},), }}"
+
+
+def _npy_header_length() -> int:
+    # room for the largest possible number of rows, aligned to 64 bytes like numpy
+    length = len(NPY_MAGIC) + 2 + len(_npy_header_dict(2**63)) + 1
+    return -(-length // 64) * 64
+
+
+def _npy_header(rows: int, length: int) -> bytes:
+    # pad with spaces to a fixed length, such that the header can be rewritten in place
+    # when the number of rows changes
+    header = _npy_header_dict(rows).ljust(length - len(NPY_MAGIC) - 3) + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def column_path(path: Union[str, Path], index: int) -> Path:
+    """Path of the .npy file of the column with index of the scan at path"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.{index}.npy")
+
+
+class ScanRecorder:
+    """
+    Append scan samples to disk as they are acquired, to a CSV file and to a binary
+    .npy file per column, named <name>.<column index>.npy. Metadata (e.g. from
+    amplifier_metadata), the column names and the start time are stored in a .json
+    file next to it.
+
+    Samples are buffered and flushed once buffer_size samples are collected or
+    flush_interval seconds passed. After every flush the files hold all flushed samples,
+    so an interrupted scan only loses the unflushed samples.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        columns: Sequence[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        buffer_size: int = 16,
+        flush_interval: float = 5.0,
+        write_csv: bool = True,
+    ):
+        """
+        Args:
+            path (Union[str, Path]): path of the files, the suffix is replaced with
+                .<column index>.npy, .csv and .json
+            columns (Sequence[str]): names of the columns
+            metadata (Optional[Dict[str, Any]]): metadata stored with the scan
+            buffer_size (int): maximum number of samples buffered before a flush
+            flush_interval (float): maximum time in s between flushes
+            write_csv (bool): also write the samples to a CSV file
+        """
+        path = Path(path)
+        self.columns = tuple(columns)
+        self.flush_interval = flush_interval
+        self.rows = 0
+
+        self._buffer = np.empty((buffer_size, len(self.columns)), dtype=np.float64)
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._header_length = _npy_header_length()
+
+        self.metadata_path = path.with_suffix(".json")
+        self.metadata = {
+            **(metadata or {}),
+            "columns": list(self.columns),
+            "start": datetime.datetime.now().isoformat(),
+        }
+        with open(self.metadata_path, "w") as file:
+            json.dump(self.metadata, file, indent=2)
+
+        self.npy_paths = [column_path(path, i) for i in range(len(self.columns))]
+        self._npy = [open(npy_path, "wb") for npy_path in self.npy_paths]
+        for file in self._npy:
+            file.write(_npy_header(0, self._header_length))
+
+        self.csv_path: Optional[Path] = None
+        self._csv = None
+        if write_csv:
+            self.csv_path = path.with_suffix(".csv")
+            self._csv = open(self.csv_path, "w", newline="")
+            self._csv_writer = csv.writer(self._csv, delimiter=",")
+            self._csv_writer.writerow(self.columns)
+        self._sync()
+
+    def __enter__(self) -> "ScanRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def append(self, sample: Sequence[float]) -> None:
+        """Append a sample with one value per column, e.g. a ScanSample"""
+        self._buffer[self._buffered] = tuple(sample)
+        self._buffered += 1
+        if (
+            self._buffered == len(self._buffer)
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if self._buffered == 0:
+            return
+        data = self._buffer[: self._buffered]
+        for index, file in enumerate(self._npy):
+            file.write(data[:, index].tobytes())
+        if self._csv is not None:
+            self._csv_writer.writerows(data.tolist())
+        self.rows += self._buffered
+        self._buffered = 0
+        self._sync()
+
+    def _sync(self) -> None:
+        # write the data before updating the number of rows in the headers
+        for file in (*self._npy, self._csv):
+            if file is not None:
+                file.flush()
+                os.fsync(file.fileno())
+        for file in self._npy:
+            position = file.tell()
+            file.seek(0)
+            file.write(_npy_header(self.rows, self._header_length))
+            file.seek(position)
+            file.flush()
+
+    def close(self) -> None:
+        if self._npy[0].closed:
+            return
+        self.flush()
+        for file in self._npy:
+            file.close()
+        if self._csv is not None:
+            self._csv.close()
+        self.metadata.update(end=datetime.datetime.now().isoformat(), rows=self.rows)
+        with open(self.metadata_path, "w") as file:
+            json.dump(self.metadata, file, indent=2)
+
+
+@dataclass
+class RecordedScan:
+    columns: Dict[str, np.ndarray]
+    metadata: Dict[str, Any]
+
+    def __len__(self) -> int:
+        return min((len(column) for column in self.columns.values()), default=0)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+
+def _map_column(path: Path) -> np.ndarray:
+    with open(path, "rb") as file:
+        np.lib.format.read_magic(file)
+        _, _, dtype = np.lib.format.read_array_header_1_0(file)
+        offset = file.tell()
+    rows = (path.stat().st_size - offset) // dtype.itemsize
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=rows)
+
+
+def load_scan(path: Union[str, Path]) -> RecordedScan:
+    """
+    Memory-map the columns of a scan written by ScanRecorder. The number of rows is
+    derived from the file sizes, so samples of a recording that is still in progress or
+    was interrupted are readable as well; columns are truncated to the shortest one, in
+    case a flush was interrupted between the column files.
+    """
+    path = Path(path)
+    with open(path.with_suffix(".json")) as file:
+        metadata = json.load(file)
+    columns = {
+        name: _map_column(column_path(path, index))
+        for index, name in enumerate(metadata["columns"])
+    }
+    rows = min((len(column) for column in columns.values()), default=0)
+    columns = {name: column[:rows] for name, column in columns.items()}
+    return RecordedScan(columns, metadata)
@@ -0,0 +1,253 @@
+import datetime
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from .exceptions import MPBReplayError
+from .transport import BufferedTransport
+
+TRANSCRIPT_FORMAT = "mpbc-vyfa-sf transcript"
+TRANSCRIPT_VERSION = 1
+
+WRITE = "w"
+READ = "r"
+
+
+def _open_text(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="ascii")
+    return open(path, mode, encoding="ascii")
+
+
+@dataclass
+class Transcript:
+    """
+    Bytes written to and read from an amplifier, as (time, direction, data) events with
+    the time in s since the start of the recording and direction WRITE or READ. Reads
+    are the chunks as they arrived, so the transcript also holds the inter-arrival
+    timing of the replies.
+    """
+
+    header: Dict[str, Any] = field(default_factory=dict)
+    events: List[Tuple[float, str, bytes]] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.events[-1][0] if self.events else 0.0
+
+    @property
+    def commands(self) -> List[str]:
+        """Commands written during the recording"""
+        data = b"".join(
+            data for _, direction, data in self.events if direction == WRITE
+        )
+        return [command.decode("ascii") for command in data.split(b"\r") if command]
+
+
+def load_transcript(path: Union[str, Path]) -> Transcript:
+    """
+    Load a transcript written by TranscriptWriter, gzip compressed if the file name ends
+    with .gz
+    """
+    path = Path(path)
+    with _open_text(path, "r") as file:
+        header = json.loads(file.readline())
+        if header.get("format") != TRANSCRIPT_FORMAT:
+            raise MPBReplayError(f"{path} is not a transcript")
+        events = []
+        for line in file:
+            elapsed, direction, data = json.loads(line)
+            events.append((elapsed, direction, data.encode("latin-1")))
+    return Transcript(header, events)
+
+
+class TranscriptWriter:
+    """
+    Write transcript events to a file as they happen, one JSON array per line after a
+    JSON header line, gzip compressed if the file name ends with .gz. The bytes are
+    stored as latin-1 strings, so the ASCII protocol of the amplifier stays readable.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        metadata: Optional[Dict[str, Any]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            path (Union[str, Path]): transcript file
+            metadata (Optional[Dict[str, Any]]): stored in the header of the transcript
+            clock (Callable[[], float]): monotonic clock in s
+        """
+        self.path = Path(path)
+        self._clock = clock
+        self._start = clock()
+        self._lock = threading.Lock()
+        self._file = _open_text(self.path, "w")
+        header = {
+            "format": TRANSCRIPT_FORMAT,
+            "version": TRANSCRIPT_VERSION,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            **(metadata or {}),
+        }
+        self._file.write(json.dumps(header) + "\n")
+
+    def __enter__(self) -> "TranscriptWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def record(self, direction: str, data: bytes) -> None:
+        elapsed = round(self._clock() - self._start, 6)
+        line = json.dumps([elapsed, direction, data.decode("latin-1")])
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class RecordingTransport(BufferedTransport):
+    """Transport that records all bytes written to and read from another transport"""
+
+    def __init__(self, transport: BufferedTransport, transcript: TranscriptWriter):
+        """
+        Args:
+            transport (BufferedTransport): transport to the amplifier
+            transcript (TranscriptWriter): transcript the traffic is recorded to
+        """
+        super().__init__()
+        self.transport = transport
+        self.transcript = transcript
+        self.timeout = transport.timeout
+
+    def _read_chunk(self) -> bytes:
+        chunk = self.transport._read_chunk()
+        if chunk:
+            self.transcript.record(READ, chunk)
+        return chunk
+
+    def _in_waiting(self) -> int:
+        return self.transport._in_waiting()
+
+    def _write_bytes(self, data: bytes) -> None:
+        self.transcript.record(WRITE, data)
+        self.transport._write_bytes(data)
+
+    def close(self) -> None:
+        super().close()
+        self.transcript.flush()
+        self.transport.close()
+
+
+class ReplayTransport(BufferedTransport):
+    """
+    Replays a transcript as the amplifier. Every write has to match the bytes written
+    in the recording, a write may span several recorded writes or only part of one.
+    The chunks read after a recorded write are replayed after the matching write,
+    either as fast as possible or with their recorded delay to the write divided by
+    speed.
+    """
+
+    def __init__(
+        self,
+        transcript: Union[Transcript, str, Path],
+        speed: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            transcript (Union[Transcript, str, Path]): transcript or transcript file
+            speed (Optional[float]): replay speed compared to the recording, e.g. 1.0
+                for the recorded timing; None replays as fast as possible
+            clock (Callable[[], float]): monotonic clock in s
+            sleep (Callable[[float], None]): function used to wait for replies
+        """
+        super().__init__()
+        if not isinstance(transcript, Transcript):
+            transcript = load_transcript(transcript)
+        self.transcript = transcript
+        self.speed = speed
+        self._clock = clock
+        self._sleep = sleep
+
+        self._index = 0
+        # unmatched remainder of the current recorded write
+        self._expected = b""
+        # recorded time of the last write and the time its replay finished
+        self._recorded_write = 0.0
+        self._replayed_write = clock()
+        # replies released by the writes so far, with the time they arrive
+        self._replies: Deque[Tuple[float, bytes]] = deque()
+
+    @property
+    def finished(self) -> bool:
+        """Whether all events of the transcript were replayed"""
+        return (
+            self._index >= len(self.transcript.events)
+            and not self._expected
+            and not self._replies
+        )
+
+    def _arrival(self, elapsed: float) -> float:
+        if self.speed is None:
+            return 0.0
+        return self._replayed_write + (elapsed - self._recorded_write) / self.speed
+
+    def _release_replies(self) -> None:
+        # the replies recorded after a write are only due once the write is complete
+        if self._expected:
+            return
+        events = self.transcript.events
+        while self._index < len(events) and events[self._index][1] == READ:
+            elapsed, _, data = events[self._index]
+            self._replies.append((self._arrival(elapsed), data))
+            self._index += 1
+
+    def _write_bytes(self, data: bytes) -> None:
+        events = self.transcript.events
+        while data:
+            if not self._expected:
+                self._release_replies()
+                if self._index >= len(events):
+                    raise MPBReplayError(f"Transcript ended, {data!r} was not recorded")
+                self._recorded_write, _, self._expected = events[self._index]
+                self._index += 1
+            length = min(len(data), len(self._expected))
+            if data[:length] != self._expected[:length]:
+                raise MPBReplayError(
+                    f"Wrote {data!r}, recorded {self._expected!r} at "
+                    f"{self._recorded_write:.6f} s"
+                )
+            data, self._expected = data[length:], self._expected[length:]
+        self._replayed_write = self._clock()
+
+    def _read_chunk(self) -> bytes:
+        self._release_replies()
+        if not self._replies:
+            # nothing was received in the recording either
+            return b""
+        arrival, chunk = self._replies.popleft()
+        delay = arrival - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+        return chunk
+
+    def _in_waiting(self) -> int:
+        self._release_replies()
+        now = self._clock()
+        return sum(len(chunk) for arrival, chunk in self._replies if arrival <= now)
@@ -0,0 +1,218 @@
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from .amplifier import MPBAmplifier
+from .fitting import Sinc2Fit, fit_sinc2
+from .timing import DeadlineScheduler, TimingStatistics
+
+INVERSE_GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+
+class ScanSample(NamedTuple):
+    timestamp: float
+    setpoint: float
+    temperature: float
+    power: float
+
+
+@dataclass
+class ScanResult:
+    samples: List[ScanSample] = field(default_factory=list)
+    fit: Optional[Sinc2Fit] = None
+    duration: float = 0.0
+    # timing of the dwell deadlines, None if the scan waited for the temperature to
+    # settle instead
+    timing: Optional[TimingStatistics] = None
+
+    @property
+    def planned_duration(self) -> Optional[float]:
+        return None if self.timing is None else self.timing.planned_duration
+
+    @property
+    def setpoints(self) -> npt.NDArray[np.float64]:
+        return np.array([sample.setpoint for sample in self.samples])
+
+    @property
+    def temperatures(self) -> npt.NDArray[np.float64]:
+        return np.array([sample.temperature for sample in self.samples])
+
+    @property
+    def powers(self) -> npt.NDArray[np.float64]:
+        return np.array([sample.power for sample in self.samples])
+
+    @property
+    def best_sample(self) -> ScanSample:
+        return max(self.samples, key=lambda sample: sample.power)
+
+    @property
+    def optimum(self) -> float:
+        """
+        Temperature of maximum SHG power; the center of the sinc² fit if it converged
+        within the scanned range, otherwise the temperature of the best sample.
+        """
+        temperatures = self.temperatures
+        if (
+            self.fit is not None
+            and self.fit.converged
+            and temperatures.min() <= self.fit.center <= temperatures.max()
+        ):
+            return self.fit.center
+        return self.best_sample.temperature
+
+    def curve(
+        self, points: int = 201
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Fitted phase-matching curve evaluated over the scanned range"""
+        temperatures = self.temperatures
+        x = np.linspace(temperatures.min(), temperatures.max(), points)
+        if self.fit is None:
+            return x, np.full_like(x, np.nan)
+        return x, self.fit(x)
+
+
+class _Scanner:
+    def __init__(
+        self,
+        amplifier: MPBAmplifier,
+        dwell: float,
+        settle: bool,
+        on_sample: Optional[Callable[[ScanSample], None]],
+    ):
+        self.amplifier = amplifier
+        self.dwell = dwell
+        self.settle = settle
+        self.on_sample = on_sample
+        self.result = ScanResult()
+        # dwell on deadlines, such that the time spent setting and reading does not add
+        # up over the points of the scan
+        self.schedule = DeadlineScheduler(dwell)
+        self.tstart = self.schedule.start()
+
+    def measure(self, setpoint: float) -> float:
+        self.amplifier.shg_temperature_setpoint = setpoint
+        if self.settle:
+            self.amplifier.wait_until_settled(target=setpoint)
+        else:
+            self.schedule.wait()
+        timestamp = time.time()
+        values = self.amplifier.read_many(
+            "shg_temperature", "output_power", use_cache=False
+        )
+        sample = ScanSample(timestamp, setpoint, *values)
+        self.result.samples.append(sample)
+        if self.on_sample is not None:
+            self.on_sample(sample)
+        return sample.power
+
+    def finish(self, fit: bool) -> ScanResult:
+        self.result.duration = time.monotonic() - self.tstart
+        if not self.settle:
+            self.result.timing = self.schedule.stats
+        if fit and len(self.result.samples) >= 4:
+            self.result.fit = fit_sinc2(self.result.temperatures, self.result.powers)
+        return self.result
+
+
+def linear_scan(
+    amplifier: MPBAmplifier,
+    center: float,
+    scan_range: float,
+    points: int = 201,
+    dwell: float = 2.0,
+    settle: bool = False,
+    fit: bool = True,
+    on_sample: Optional[Callable[[ScanSample], None]] = None,
+) -> ScanResult:
+    """
+    Step the SHG temperature setpoint through evenly spaced points around center.
+    Requires the test environment of the amplifier.
+
+    Args:
+        amplifier (MPBAmplifier): amplifier
+        center (float): center of the scan in C
+        scan_range (float): full range of the scan in C
+        points (int): number of points
+        dwell (float): time to wait after each setpoint in s
+        settle (bool): wait until the SHG temperature settled after each setpoint
+            with MPBAmplifier.wait_until_settled instead of a fixed dwell
+        fit (bool): fit a sinc² phase-matching curve to the samples
+        on_sample (Optional[Callable[[ScanSample], None]]): called with each sample
+
+    Returns:
+        ScanResult: samples and fitted phase-matching curve
+    """
+    scanner = _Scanner(amplifier, dwell, settle, on_sample)
+    for setpoint in np.linspace(
+        center - scan_range / 2, center + scan_range / 2, points
+    ):
+        scanner.measure(float(setpoint))
+    return scanner.finish(fit)
+
+
+def adaptive_scan(
+    amplifier: MPBAmplifier,
+    center: float,
+    scan_range: float,
+    coarse_points: int = 21,
+    tolerance: float = 0.05,
+    max_points: int = 60,
+    dwell: float = 2.0,
+    settle: bool = False,
+    on_sample: Optional[Callable[[ScanSample], None]] = None,
+) -> ScanResult:
+    """
+    Find the SHG phase-matching temperature with a coarse sweep, followed by a
+    golden-section search around the best coarse point and a sinc² fit to all samples.
+    Requires the test environment of the amplifier.
+
+    Args:
+        amplifier (MPBAmplifier): amplifier
+        center (float): center of the coarse sweep in C
+        scan_range (float): full range of the coarse sweep in C
+        coarse_points (int): number of points of the coarse sweep, at least 3
+        tolerance (float): width in C of the final golden-section interval
+        max_points (int): maximum number of points including the coarse sweep
+        dwell (float): time to wait after each setpoint in s
+        settle (bool): wait until the SHG temperature settled after each setpoint
+            with MPBAmplifier.wait_until_settled instead of a fixed dwell
+        on_sample (Optional[Callable[[ScanSample], None]]): called with each sample
+
+    Returns:
+        ScanResult: samples and fitted phase-matching curve
+    """
+    if coarse_points < 3:
+        raise ValueError("the coarse sweep needs at least 3 points")
+    scanner = _Scanner(amplifier, dwell, settle, on_sample)
+    setpoints = np.linspace(
+        center - scan_range / 2, center + scan_range / 2, coarse_points
+    )
+    powers = [scanner.measure(float(setpoint)) for setpoint in setpoints]
+
+    peak = int(np.argmax(powers))
+    if powers[peak] <= 0:
+        logging.warning("No SHG power found in the coarse sweep")
+        return scanner.finish(fit=False)
+
+    # golden-section search in the interval around the best coarse point
+    step = scan_range / (coarse_points - 1)
+    a, b = float(setpoints[peak]) - step, float(setpoints[peak]) + step
+    c = b - INVERSE_GOLDEN_RATIO * (b - a)
+    d = a + INVERSE_GOLDEN_RATIO * (b - a)
+    fc, fd = scanner.measure(c), scanner.measure(d)
+    while (b - a) > tolerance and len(scanner.result.samples) < max_points:
+        if fc > fd:
+            b, d, fd = d, c, fc
+            c = b - INVERSE_GOLDEN_RATIO * (b - a)
+            fc = scanner.measure(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + INVERSE_GOLDEN_RATIO * (b - a)
+            fd = scanner.measure(d)
+
+    return scanner.finish(fit=True)
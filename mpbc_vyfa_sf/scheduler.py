@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .protocol import Response, encode_command
+
+
+class Priority(IntEnum):
+    """Priority of queued exchanges, lower values are sent first"""
+
+    SAFETY = 0
+    CONTROL = 1
+    TELEMETRY = 2
+
+
+# commands that jump ahead of everything else: disabling emission and reading the
+# laser state, faults and alarms
+SAFETY_COMMANDS = ("SETLDENABLE 0", "GETLASERSTATE", "GETFLT", "GETALR")
+
+
+def command_priority(command: str, read: bool) -> Priority:
+    if command.upper().startswith(SAFETY_COMMANDS):
+        return Priority.SAFETY
+    return Priority.TELEMETRY if read else Priority.CONTROL
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    sequence: int
+    commands: Sequence[str] = field(compare=False)
+    data: bytes = field(compare=False)
+    future: "Future[List[Response]]" = field(compare=False)
+    key: Optional[Hashable] = field(compare=False, default=None)
+
+
+class CommandScheduler:
+    """
+    Queue exchanges with an amplifier from any thread and send them from a single I/O
+    thread that owns the connection, in order of priority. Exchanges queued while the
+    link is busy are sent together in a single write, up to max_batch exchanges, to keep
+    the link busy. If coalesce is True, identical reads that are still queued share a
+    single exchange, and a queued exchange with the same key as a new one is replaced by
+    it, e.g. writes to the same property.
+    """
+
+    def __init__(
+        self,
+        exchange: Callable[[Sequence[str], bytes], List[Response]],
+        coalesce: bool = True,
+        max_batch: int = 8,
+        name: str = "CommandScheduler",
+    ):
+        """
+        Args:
+            exchange (Callable[[Sequence[str], bytes], List[Response]]): sends the
+                encoded commands and returns a response per command, called from the
+                I/O thread only
+            coalesce (bool): share queued identical reads and replace queued exchanges
+                with the same key
+            max_batch (int): maximum number of queued exchanges sent in a single write
+            name (str): name of the I/O thread
+        """
+        self.exchange = exchange
+        self.coalesce = coalesce
+        self.max_batch = max_batch
+
+        self._queue: List[_Job] = []
+        self._pending: Dict[Hashable, _Job] = {}
+        self._sending = 0
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def in_io_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    @property
+    def backlog(self) -> int:
+        """Number of commands queued or being sent"""
+        with self._condition:
+            return self._sending + sum(len(job.commands) for job in self._queue)
+
+    def submit(
+        self,
+        commands: Sequence[str],
+        data: Optional[bytes] = None,
+        read: bool = False,
+        priority: Optional[Priority] = None,
+        key: Optional[Hashable] = None,
+    ) -> "Future[List[Response]]":
+        """
+        Queue commands to be sent back-to-back, the future resolves to a response per
+        command.
+
+        Args:
+            commands (Sequence[str]): commands
+            data (Optional[bytes]): encoded commands, encoded from commands if None
+            read (bool): the commands only read, so identical queued reads can share
+                an exchange
+            priority (Optional[Priority]): defaults to the highest priority of the
+                commands, see command_priority
+            key (Optional[Hashable]): a queued exchange with the same key is replaced
+                by this one and shares its future
+
+        Returns:
+            Future[List[Response]]: responses of the commands
+        """
+        if data is None:
+            data = b"".join(encode_command(command) for command in commands)
+        if priority is None:
+            priority = min(command_priority(command, read) for command in commands)
+        replace = key is not None
+        if read and key is None:
+            key = data
+        if not self.coalesce:
+            key = None
+
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("CommandScheduler is stopped")
+            if key is not None:
+                job = self._pending.get(key)
+                if job is not None:
+                    if replace:
+                        job.commands, job.data = commands, data
+                    if priority < job.priority:
+                        # reprioritize the shared job, heap invariant is restored below
+                        job.priority = priority
+                        heapq.heapify(self._queue)
+                    return job.future
+            job = _Job(priority, next(self._sequence), commands, data, Future(), key)
+            heapq.heappush(self._queue, job)
+            if key is not None:
+                self._pending[key] = job
+            self._condition.notify()
+        return job.future
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Send the queued exchanges and stop the I/O thread. If the I/O thread does not
+        finish within timeout, the exchanges still queued fail with a RuntimeError.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if not self.in_io_thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self._fail_queued()
+
+    def _fail_queued(self) -> None:
+        with self._condition:
+            jobs, self._queue = self._queue, []
+            self._pending.clear()
+        for job in jobs:
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(RuntimeError("CommandScheduler is stopped"))
+
+    def _next_batch(self) -> Optional[List[_Job]]:
+        with self._condition:
+            self._sending = 0
+            while self._running and not self._queue:
+                self._condition.wait()
+            if not self._queue:
+                return None
+            batch = []
+            while self._queue and len(batch) < self.max_batch:
+                job = heapq.heappop(self._queue)
+                if job.key is not None:
+                    del self._pending[job.key]
+                batch.append(job)
+            self._sending = sum(len(job.commands) for job in batch)
+            return batch
+
+    def _run(self) -> None:
+        try:
+            self._send_batches()
+        finally:
+            # fail the exchanges queued when the thread stops, e.g. after an error that
+            # is not an Exception, instead of leaving their futures pending forever
+            with self._condition:
+                self._running = False
+                self._sending = 0
+            self._fail_queued()
+
+    def _send_batches(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            commands: Tuple[str, ...] = tuple(
+                command for job in batch for command in job.commands
+            )
+            try:
+                responses = self.exchange(commands, b"".join(job.data for job in batch))
+            except BaseException as error:
+                for job in batch:
+                    job.future.set_exception(error)
+                if not isinstance(error, Exception):
+                    raise
+                logging.debug(f"Exchange {commands} failed: {error!r}")
+                continue
+            start = 0
+            for job in batch:
+                job.future.set_result(responses[start : start + len(job.commands)])
+                start += len(job.commands)
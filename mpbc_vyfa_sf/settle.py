@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+
+@dataclass
+class SettleResult:
+    """
+    Result of MPBAmplifier.wait_until_settled. duration is the time in seconds until
+    the settle criteria were met, or until the timeout if settled is False.
+    """
+
+    settled: bool
+    duration: float
+    target: float
+    temperature: float
+    slope: float
+    power: Optional[float] = None
+    power_slope: Optional[float] = None
+    samples: int = 0
+
+
+def slope(times: Sequence[float], values: Sequence[float]) -> float:
+    """Least-squares slope of values versus times"""
+    n = len(times)
+    if n < 2:
+        return float("inf")
+    mean_t = sum(times) / n
+    mean_v = sum(values) / n
+    covariance = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values))
+    variance = sum((t - mean_t) ** 2 for t in times)
+    return covariance / variance if variance > 0 else float("inf")
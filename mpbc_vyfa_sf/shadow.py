@@ -0,0 +1,95 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional
+
+from .cache import MISSING
+
+
+class ShadowState:
+    """
+    Last confirmed value of each writable property, by attribute name. A value is
+    confirmed by a successful write or a read of the property.
+
+    Writes of a value within the tolerance of the confirmed value are skipped, unless
+    another write to the property is still queued.
+    """
+
+    def __init__(self, tolerances: Mapping[str, float]):
+        """
+        Args:
+            tolerances (Mapping[str, float]): maximum difference between a written and
+                the confirmed value for the write to be skipped, by attribute name;
+                properties without a tolerance have to match exactly
+        """
+        self.tolerances = dict(tolerances)
+        self.skipped = 0
+        self.written = 0
+        self._values: Dict[str, Any] = {}
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        """Confirmed value of property name, or MISSING if unknown"""
+        return self._values.get(name, MISSING)
+
+    def _matches(self, name: str, value: Any) -> bool:
+        if self._pending[name] > 0:
+            return False
+        confirmed = self._values.get(name, MISSING)
+        if confirmed is MISSING:
+            return False
+        if isinstance(value, (int, float)) and isinstance(confirmed, (int, float)):
+            return abs(confirmed - value) <= self.tolerances.get(name, 0)
+        return confirmed == value
+
+    def matches(self, name: str, value: Any) -> bool:
+        """Whether writing value to property name can be skipped"""
+        with self._lock:
+            return self._matches(name, value)
+
+    def confirm(self, name: str, value: Any) -> None:
+        self._values[name] = value
+
+    def pending(self, name: str) -> bool:
+        """Whether a write to property name is queued"""
+        with self._lock:
+            return self._pending[name] > 0
+
+    def begin(self, name: str, value: Any) -> bool:
+        """
+        Mark a write of value to property name as queued, unless it can be skipped.
+        Checking and marking is a single step, so of concurrent writes of the same
+        value either all or none are skipped.
+
+        Returns:
+            bool: True if the write has to be sent, False if it was skipped
+        """
+        with self._lock:
+            if self._matches(name, value):
+                self.skipped += 1
+                return False
+            self._pending[name] += 1
+            return True
+
+    def end(self, name: str, value: Any = MISSING, writes: int = 1) -> None:
+        """
+        Mark queued writes to property name as done, which were sent in a single
+        exchange, e.g. coalesced writes. Confirms value and counts a single write if the
+        exchange succeeded, forgets the confirmed value otherwise.
+        """
+        with self._lock:
+            self._pending[name] -= writes
+            if self._pending[name] <= 0:
+                del self._pending[name]
+            if value is MISSING:
+                self._values.pop(name, None)
+            else:
+                self._values[name] = value
+                self.written += 1
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Forget the confirmed value of property name, or of all properties"""
+        if name is None:
+            self._values.clear()
+        else:
+            self._values.pop(name, None)
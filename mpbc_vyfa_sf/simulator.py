@@ -0,0 +1,364 @@
+import math
+import time
+from typing import Callable, Dict, List, Optional
+
+from .enums import Alarm, Fault, LaserState
+from .protocol import TERMINATION
+from .transport import BufferedTransport
+
+# laser states the amplifier steps through after enabling emission, with the time in
+# seconds spent in each state
+STARTUP_SEQUENCE = (
+    (LaserState.STARTUP, 0.5),
+    (LaserState.SEED_ON, 0.5),
+    (LaserState.SEED_OK, 0.5),
+    (LaserState.PREAMP_TURN_ON, 0.5),
+    (LaserState.PREAMP_ON, 0.5),
+    (LaserState.PREAMP_OK, 0.5),
+    (LaserState.BOOSTER_TURN_ON, 2.0),
+)
+
+
+class _CommandError(Exception):
+    pass
+
+
+class SimulatedAmplifier(BufferedTransport):
+    """
+    In-process simulation of a VYFA-SF amplifier, with the same transport interface as
+    the serial connections used by MPBAmplifier. Replies are produced as a byte stream
+    with the same termination and prompts as the amplifier.
+
+    Models the laser state startup sequence, the booster current ramp, a first-order
+    thermal lag of the SHG crystal temperature and a sinc² shaped SHG phase-matching
+    curve. Link timing is modeled with a round trip latency per write and a transmission
+    time of 10 bits per byte at baud_rate; without latency and baud_rate the simulator
+    replies instantly. Simulated time runs time_scale times faster than clock, which
+    speeds up the thermal and startup dynamics.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        baud_rate: Optional[int] = None,
+        time_scale: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        key_enabled: bool = True,
+        shg_peak_temperature: float = 50.0,
+        shg_bandwidth: float = 1.5,
+        shg_time_constant: float = 5.0,
+        peak_power: float = 100.0,
+    ):
+        """
+        Args:
+            latency (float): round trip latency in seconds of every write
+            baud_rate (Optional[int]): baud rate used to compute the transmission time
+            time_scale (float): speedup of the simulated time compared to clock
+            clock (Callable[[], float]): monotonic clock in seconds
+            sleep (Callable[[float], None]): function used to wait for the link
+            key_enabled (bool): key in the enable position, required to start emission
+            shg_peak_temperature (float): phase-matching temperature in C
+            shg_bandwidth (float): distance from the peak to the first zero of the
+                phase-matching curve in C
+            shg_time_constant (float): time constant of the SHG temperature in s
+            peak_power (float): phase-matched output power in mW at the nominal
+                booster current
+        """
+        super().__init__()
+        self.latency = latency
+        self.baud_rate = baud_rate
+        self.time_scale = time_scale
+        self._clock = clock
+        self._sleep = sleep
+        self._clock_start = clock()
+
+        self.model = "VYFA-SF-SIM"
+        self.serial = "SIM00001"
+        self.key_enabled = key_enabled
+        self.interlock = False
+        self.faults = [False] * len(Fault)
+        self.mode = 0
+        self.test_environment = False
+
+        self.shg_peak_temperature = shg_peak_temperature
+        self.shg_bandwidth = shg_bandwidth
+        self.shg_time_constant = shg_time_constant
+        self.peak_power = peak_power
+        self.nominal_booster_current = 1500.0
+        self.max_booster_current = 2000.0
+
+        self.seed_current = 150.0
+        self.preamp_current_setpoint = 600.0
+        self.booster_current_setpoint = self.nominal_booster_current
+        self.shg_temperature_setpoint = shg_peak_temperature - 2.0
+        self.output_power_setpoint = 50.0
+        self.power_stabilization = False
+
+        self.emission = False
+        self._emission_time = 0.0
+        self._shg_temperature = self.shg_temperature_setpoint
+        self._thermal_time = self.now()
+
+        self._output = bytearray()
+        self._ready_at = 0.0
+        self._handlers: Dict[str, Callable[[List[str]], str]] = {
+            "GETMODEL": lambda args: self.model,
+            "GETSN": lambda args: self.serial,
+            "GETLDENABLE": lambda args: str(int(self.emission)),
+            "GETSTATE": lambda args: str(int(self.emission)),
+            "GETLASERSTATE": lambda args: str(self.laser_state.value),
+            "GETMODE": lambda args: str(self.mode),
+            "SETMODE": self._set_mode,
+            "LDCURRENT": self._get_current,
+            "GETLDCUR": self._get_current_setpoint,
+            "LDCUR": self._set_current_setpoint,
+            "TECTEMP": self._get_temperature,
+            "GETTECSETPT": self._get_temperature_setpoint,
+            "SETTECSETPT": self._set_temperature_setpoint,
+            "POWER": self._get_power,
+            "GETPOWER": self._get_power_setpoint,
+            "SETPOWER": self._set_power_setpoint,
+            "GETPOWERENABLE": lambda args: str(int(self.power_stabilization)),
+            "POWERENABLE": self._set_power_stabilization,
+            "GETALR": lambda args: self._flags(self.alarms),
+            "GETFLT": lambda args: self._flags(self.faults),
+            "SETLDENABLE": self._set_enable,
+            "SAVEALL": lambda args: "",
+        }
+
+    def now(self) -> float:
+        """Simulated time in seconds"""
+        return (self._clock() - self._clock_start) * self.time_scale
+
+    @property
+    def prompt(self) -> str:
+        return "F >" if self.test_environment else "D >"
+
+    @property
+    def laser_state(self) -> LaserState:
+        if any(self.faults):
+            return LaserState.FAULT
+        if self.interlock:
+            return LaserState.INTERLOCK
+        if not self.emission:
+            return LaserState.OFF
+        elapsed = self.now() - self._emission_time
+        for state, duration in STARTUP_SEQUENCE:
+            if elapsed < duration:
+                return state
+            elapsed -= duration
+        return LaserState.BOOSTER_ON
+
+    @property
+    def booster_current(self) -> float:
+        state = self.laser_state
+        if state == LaserState.BOOSTER_ON:
+            return self.booster_current_setpoint
+        elif state == LaserState.BOOSTER_TURN_ON:
+            ramp_start = self._emission_time + sum(d for _, d in STARTUP_SEQUENCE[:-1])
+            fraction = (self.now() - ramp_start) / STARTUP_SEQUENCE[-1][1]
+            return self.booster_current_setpoint * min(max(fraction, 0.0), 1.0)
+        return 0.0
+
+    @property
+    def shg_temperature(self) -> float:
+        # first-order lag towards the setpoint, integrated exactly between updates
+        now = self.now()
+        decay = math.exp(-(now - self._thermal_time) / self.shg_time_constant)
+        self._shg_temperature = self.shg_temperature_setpoint + decay * (
+            self._shg_temperature - self.shg_temperature_setpoint
+        )
+        self._thermal_time = now
+        return self._shg_temperature
+
+    def phase_matching(self, temperature: float) -> float:
+        """sinc² phase-matching efficiency at temperature, 1 at the peak"""
+        x = math.pi * (temperature - self.shg_peak_temperature) / self.shg_bandwidth
+        if x == 0:
+            return 1.0
+        return (math.sin(x) / x) ** 2
+
+    @property
+    def seed_power(self) -> float:
+        return 20.0 if self.laser_state >= LaserState.SEED_ON else 0.0
+
+    @property
+    def output_power(self) -> float:
+        if self.laser_state < LaserState.BOOSTER_TURN_ON:
+            return 0.0
+        fundamental = self.booster_current / self.nominal_booster_current
+        power = (
+            self.peak_power * fundamental**2 * self.phase_matching(self.shg_temperature)
+        )
+        if self.power_stabilization:
+            power = min(power, self.output_power_setpoint)
+        return round(power, 2)
+
+    @property
+    def alarms(self) -> List[bool]:
+        alarms = [False] * len(Alarm)
+        if self.emission:
+            alarms[Alarm.SHG_TEMPERATURE] = (
+                abs(self.shg_temperature - self.shg_temperature_setpoint) > 2.0
+            )
+            alarms[Alarm.LOSS_OF_OUTPUT] = (
+                self.laser_state == LaserState.BOOSTER_ON and self.output_power <= 0
+            )
+        return alarms
+
+    def inject_fault(self, fault: Fault) -> None:
+        """Trigger a fault, which disables emission"""
+        self.faults[fault] = True
+        self.emission = False
+
+    def clear_faults(self) -> None:
+        self.faults = [False] * len(Fault)
+
+    def open_interlock(self) -> None:
+        """Open the interlock, which disables emission and locks the key"""
+        self.interlock = True
+        self.key_enabled = False
+        self.emission = False
+
+    def close_interlock(self) -> None:
+        self.interlock = False
+
+    @staticmethod
+    def _flags(flags: List[bool]) -> str:
+        return " ".join(str(int(flag)) for flag in flags)
+
+    @staticmethod
+    def _argument(args: List[str], index: int) -> str:
+        if len(args) <= index:
+            raise _CommandError("MISSING_ARGUMENT")
+        return args[index]
+
+    def _set_mode(self, args: List[str]) -> str:
+        self.mode = int(self._argument(args, 0))
+        return str(self.mode)
+
+    def _get_current(self, args: List[str]) -> str:
+        channel = self._argument(args, 0)
+        state = self.laser_state
+        if channel == "1":
+            current = self.seed_current if state >= LaserState.SEED_ON else 0.0
+        elif channel == "2":
+            on = state >= LaserState.PREAMP_TURN_ON
+            current = self.preamp_current_setpoint if on else 0.0
+        else:
+            current = self.booster_current
+        return f"{current:.1f}"
+
+    def _get_current_setpoint(self, args: List[str]) -> str:
+        if self._argument(args, 0) == "2":
+            return f"{self.preamp_current_setpoint:.1f}"
+        return f"{self.booster_current_setpoint:.1f}"
+
+    def _set_current_setpoint(self, args: List[str]) -> str:
+        self._argument(args, 0)
+        current = float(self._argument(args, 1))
+        if not 0 <= current <= self.max_booster_current:
+            raise _CommandError("DATA_CANNOT_BE_SET")
+        self.booster_current_setpoint = current
+        return f"{current:.1f}"
+
+    def _get_temperature(self, args: List[str]) -> str:
+        self._argument(args, 0)
+        return f"{self.shg_temperature:.4f}"
+
+    def _get_temperature_setpoint(self, args: List[str]) -> str:
+        self._argument(args, 0)
+        return f"{self.shg_temperature_setpoint:.2f}"
+
+    def _set_temperature_setpoint(self, args: List[str]) -> str:
+        self._argument(args, 0)
+        temperature = float(self._argument(args, 1))
+        if not self.test_environment:
+            raise _CommandError("CAN_ONLY_BE_USED_FOR_TESTS")
+        # settle the thermal model up to now before changing the setpoint
+        self.shg_temperature
+        self.shg_temperature_setpoint = temperature
+        return f"{temperature:.2f}"
+
+    def _get_power(self, args: List[str]) -> str:
+        if self._argument(args, 0) == "3":
+            return f"{self.seed_power:.2f}"
+        return f"{self.output_power:.2f}"
+
+    def _get_power_setpoint(self, args: List[str]) -> str:
+        self._argument(args, 0)
+        return f"{self.output_power_setpoint:.2f}"
+
+    def _set_power_setpoint(self, args: List[str]) -> str:
+        self._argument(args, 0)
+        self.output_power_setpoint = float(self._argument(args, 1))
+        return f"{self.output_power_setpoint:.2f}"
+
+    def _set_power_stabilization(self, args: List[str]) -> str:
+        value = bool(int(self._argument(args, 0)))
+        if self.emission:
+            raise _CommandError("DATA_CANNOT_BE_SET")
+        self.power_stabilization = value
+        return str(int(value))
+
+    def _set_enable(self, args: List[str]) -> str:
+        enable = bool(int(self._argument(args, 0)))
+        if enable and not self.emission:
+            if not self.key_enabled or self.interlock or any(self.faults):
+                raise _CommandError("DATA_CANNOT_BE_SET")
+            self.emission = True
+            self._emission_time = self.now()
+        elif not enable:
+            self.emission = False
+        return str(int(self.emission))
+
+    def _execute(self, command: str) -> List[str]:
+        tokens = command.split()
+        if len(tokens) == 0:
+            return [""]
+        head, args = tokens[0].upper(), tokens[1:]
+        if head == "TESTEOA":
+            self.test_environment = True
+            return ["TEST ENVIRONMENT", "EOA TEST MODE ENABLED", ""]
+        handler = self._handlers.get(head)
+        if handler is None:
+            return ["UNKNOWN_COMMAND"]
+        try:
+            return [handler(args)]
+        except _CommandError as error:
+            return [str(error)]
+        except ValueError:
+            return ["DATA_CANNOT_BE_SET"]
+
+    def _transmission_time(self, n_bytes: int) -> float:
+        if self.baud_rate is None:
+            return 0.0
+        return 10 * n_bytes / self.baud_rate
+
+    def _write_bytes(self, data: bytes) -> None:
+        output = bytearray()
+        for command in data.decode("ascii").rstrip("\r").split("\r"):
+            for line in self._execute(command):
+                output += line.encode("ascii") + TERMINATION
+            # the prompt is sent after the reply without a termination character
+            output += self.prompt.encode("ascii")
+        self._output += output
+        n_bytes = len(data) + len(output)
+        start = max(self._clock(), self._ready_at)
+        self._ready_at = start + self.latency + self._transmission_time(n_bytes)
+
+    def _read_chunk(self) -> bytes:
+        delay = self._ready_at - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+        chunk = bytes(self._output)
+        self._output.clear()
+        return chunk
+
+    def _in_waiting(self) -> int:
+        return len(self._output) if self._clock() >= self._ready_at else 0
+
+    def close(self) -> None:
+        super().close()
+        self._output.clear()
@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from .amplifier import MPBAmplifier
+from .attributes import FloatProperty, IntProperty
+from .timing import DeadlineScheduler, TimingStatistics
+
+DEFAULT_CHANNELS = (
+    "seed_current",
+    "preamp_current",
+    "booster_current",
+    "shg_temperature",
+    "seed_power",
+    "output_power",
+)
+
+
+class TelemetryPoller:
+    """
+    Sample numeric properties of an amplifier at a fixed rate on a background thread.
+
+    Samples are stored in a preallocated ring buffer with a timestamp column followed by
+    one column per channel, so memory usage is constant. Every sample is written twice,
+    at index i and i + capacity, such that any window of up to capacity samples is a
+    contiguous slice of the buffer and can be returned as a view without copying.
+    Reading from the poller never communicates with the amplifier.
+
+    Samples are acquired on monotonic deadlines, timestamps are the time.time at which
+    the read was started, and the jitter and overruns of the polling loop are kept in
+    timing.
+    """
+
+    def __init__(
+        self,
+        amplifier: MPBAmplifier,
+        channels: Sequence[str] = DEFAULT_CHANNELS,
+        rate: float = 1.0,
+        capacity: int = 86_400,
+    ):
+        """
+        Args:
+            amplifier (MPBAmplifier): amplifier to poll
+            channels (Sequence[str]): names of FloatProperty/IntProperty properties to
+                sample
+            rate (float): sample rate in Hz
+            capacity (int): number of samples kept in the ring buffer
+        """
+        for channel in channels:
+            prop = amplifier._get_property(channel)
+            if not isinstance(prop, (FloatProperty, IntProperty)):
+                raise ValueError(f"{channel} is not a numeric property")
+
+        self.amplifier = amplifier
+        self.channels = tuple(channels)
+        self.rate = rate
+        self.capacity = capacity
+        self.columns = ("timestamp",) + self.channels
+        self.sample_type = namedtuple("Sample", self.columns)
+
+        self._buffer = np.full((2 * capacity, len(self.columns)), np.nan)
+        self._count = 0
+        self._latest: Optional[NamedTuple] = None
+        self.timing = TimingStatistics(1 / rate)
+        self._subscribers: List[Callable[[NamedTuple], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "TelemetryPoller":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def count(self) -> int:
+        """Total number of samples acquired"""
+        return self._count
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="TelemetryPoller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def subscribe(self, callback: Callable[[NamedTuple], None]) -> None:
+        """Call callback with every new sample, called from the polling thread"""
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: Callable[[NamedTuple], None]) -> None:
+        self._subscribers = [cb for cb in self._subscribers if cb != callback]
+
+    def _run(self) -> None:
+        # skip missed samples instead of trying to catch up
+        schedule = DeadlineScheduler(
+            1 / self.rate, skip_missed=True, sleep=self._stop.wait
+        )
+        schedule.start()
+        self.timing = schedule.stats
+        while not self._stop.is_set():
+            timestamp = time.time()
+            try:
+                values = self.amplifier.read_many(*self.channels, use_cache=False)
+            except Exception:
+                logging.exception("TelemetryPoller failed to read the amplifier")
+            else:
+                self._append(self.sample_type(timestamp, *values))
+            schedule.wait()
+
+    def _append(self, sample: NamedTuple) -> None:
+        idx = self._count % self.capacity
+        self._buffer[idx] = sample
+        self._buffer[idx + self.capacity] = sample
+        # publish the sample after it is written; a single reference assignment, so
+        # readers never see a partially written sample
+        self._count += 1
+        self._latest = sample
+        for callback in self._subscribers:
+            try:
+                callback(sample)
+            except Exception:
+                logging.exception("TelemetryPoller subscriber failed")
+
+    def latest(self) -> Optional[NamedTuple]:
+        """Most recent sample, or None if no samples were acquired yet"""
+        return self._latest
+
+    def window(self, n: Optional[int] = None) -> npt.NDArray[np.float64]:
+        """
+        View of the most recent n samples (all stored samples if None), with columns
+        `columns`. The view is overwritten by the poller once capacity - n new samples
+        arrive; copy it to keep the data.
+        """
+        count = self._count
+        stored = min(count, self.capacity)
+        n = stored if n is None else min(n, stored)
+        end = (count - 1) % self.capacity + self.capacity + 1 if count > 0 else 0
+        return self._buffer[end - n : end]
+
+    def channel(self, name: str, n: Optional[int] = None) -> npt.NDArray[np.float64]:
+        """View of the most recent n values of a single column"""
+        return self.window(n)[:, self.columns.index(name)]
@@ -0,0 +1,136 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class TimingStatistics:
+    """
+    Timing of a periodic loop. Jitter is the time between a deadline and the moment the
+    loop actually woke up; an overrun is an iteration that took longer than the period,
+    such that the next deadline had already passed.
+    """
+
+    period: float
+    count: int = 0
+    overruns: int = 0
+    skipped: int = 0
+    jitter_total: float = 0.0
+    jitter_squared: float = 0.0
+    jitter_max: float = 0.0
+    overrun_max: float = 0.0
+    start: Optional[float] = None
+    last: Optional[float] = None
+
+    def add(self, deadline: float, actual: float) -> None:
+        jitter = actual - deadline
+        self.count += 1
+        self.jitter_total += jitter
+        self.jitter_squared += jitter**2
+        self.jitter_max = max(self.jitter_max, jitter)
+        self.last = actual
+
+    @property
+    def jitter_mean(self) -> float:
+        return self.jitter_total / self.count if self.count > 0 else 0.0
+
+    @property
+    def jitter_std(self) -> float:
+        if self.count == 0:
+            return 0.0
+        variance = self.jitter_squared / self.count - self.jitter_mean**2
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def planned_duration(self) -> float:
+        return (self.count + self.skipped) * self.period
+
+    @property
+    def duration(self) -> float:
+        """Time from the start to the last deadline that was waited for"""
+        if self.start is None or self.last is None:
+            return 0.0
+        return self.last - self.start
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "period": self.period,
+            "count": self.count,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_mean": self.jitter_mean,
+            "jitter_std": self.jitter_std,
+            "jitter_max": self.jitter_max,
+            "overrun_max": self.overrun_max,
+            "planned_duration": self.planned_duration,
+            "duration": self.duration,
+        }
+
+
+class DeadlineScheduler:
+    """
+    Paces a loop on absolute deadlines start + n * period of a monotonic clock, instead
+    of sleeping a fixed time per iteration. Time spent in I/O and rendering between two
+    waits is absorbed by the sleep, so the loop does not drift and the planned and
+    actual durations match as long as an iteration fits in the period.
+
+    Iterations that overrun the period continue immediately; with skip_missed the
+    deadlines that passed are skipped instead, e.g. for telemetry where catching up
+    makes no sense.
+    """
+
+    def __init__(
+        self,
+        period: float,
+        skip_missed: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ):
+        """
+        Args:
+            period (float): period of the loop in s
+            skip_missed (bool): skip deadlines that passed during an overrun
+            clock (Callable[[], float]): monotonic clock in s
+            sleep (Callable[[float], Any]): function used to wait, e.g. the wait method
+                of a threading.Event to make the wait interruptible
+        """
+        self.period = period
+        self.skip_missed = skip_missed
+        self._clock = clock
+        self._sleep = sleep
+        self._index = 0
+        self._start: Optional[float] = None
+        self.stats = TimingStatistics(period)
+
+    def start(self, at: Optional[float] = None) -> float:
+        """Start the schedule now or at clock time at, returns the start time"""
+        self._start = self._clock() if at is None else at
+        self._index = 0
+        self.stats = TimingStatistics(self.period, start=self._start)
+        return self._start
+
+    @property
+    def next_deadline(self) -> float:
+        if self._start is None:
+            self.start()
+        return self._start + (self._index + 1) * self.period
+
+    def wait(self) -> float:
+        """Sleep until the next deadline, returns the deadline in clock time"""
+        deadline = self.next_deadline
+        self._index += 1
+        now = self._clock()
+        if now > deadline:
+            self.stats.overruns += 1
+            self.stats.overrun_max = max(self.stats.overrun_max, now - deadline)
+            if self.skip_missed:
+                missed = int((now - deadline) // self.period) + 1
+                self._index += missed
+                self.stats.skipped += missed
+                deadline += missed * self.period
+        delay = deadline - now
+        if delay > 0:
+            self._sleep(delay)
+        self.stats.add(deadline, self._clock())
+        return deadline
@@ -0,0 +1,219 @@
+import abc
+import logging
+import threading
+from typing import Any, List, Optional, Protocol
+
+from .protocol import PROMPTS, TERMINATION, encode_command, split_frame
+
+
+class Transport(Protocol):
+    """
+    Connection to the amplifier used by MPBAmplifier, shared by the pyserial and pyvisa
+    transports and the SimulatedAmplifier.
+    """
+
+    def write(self, message: str) -> None:
+        ...
+
+    def write_raw(self, data: bytes) -> None:
+        ...
+
+    def read_frame(self) -> List[str]:
+        ...
+
+    def flush_input(self) -> bytes:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class BufferedTransport(abc.ABC):
+    """
+    Base class of byte stream transports, which frames replies on the prompt the
+    amplifier sends after each reply. A reply is complete as soon as the prompt arrives,
+    so reads never wait for a timeout. Subclasses implement _read_chunk and
+    _write_bytes, and _in_waiting and close where needed.
+    """
+
+    timeout: Optional[float] = 2.0
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    @abc.abstractmethod
+    def _read_chunk(self) -> bytes:
+        """Wait up to timeout for at least one byte, return all bytes available"""
+
+    def _in_waiting(self) -> int:
+        return 0
+
+    @abc.abstractmethod
+    def _write_bytes(self, data: bytes) -> None:
+        ...
+
+    def _fill(self) -> None:
+        chunk = self._read_chunk()
+        if not chunk:
+            raise TimeoutError(f"No reply within {self.timeout} s")
+        self._buffer += chunk
+
+    def write(self, message: str) -> None:
+        self._write_bytes(encode_command(message))
+
+    def write_raw(self, data: bytes) -> None:
+        """Write encoded commands, including their termination"""
+        self._write_bytes(data)
+
+    def read_frame(self) -> List[str]:
+        """Lines of the next reply, read up to and including the prompt"""
+        while True:
+            frame = split_frame(self._buffer)
+            if frame is not None:
+                lines, length = frame
+                del self._buffer[:length]
+                return lines
+            self._fill()
+
+    def read(self) -> str:
+        """Next line, without the prompt in front of it"""
+        while True:
+            index = self._buffer.find(TERMINATION)
+            if index >= 0:
+                line = bytes(self._buffer[:index])
+                del self._buffer[: index + len(TERMINATION)]
+                for prompt in PROMPTS:
+                    if line.startswith(prompt):
+                        line = line[len(prompt) :]
+                        break
+                return line.decode("ascii")
+            self._fill()
+
+    def query(self, message: str) -> str:
+        self.write(message)
+        return self.read()
+
+    def flush_input(self) -> bytes:
+        """Discard and return unread input, e.g. stray lines or a pending prompt"""
+        while self._in_waiting() > 0:
+            self._buffer += self._read_chunk()
+        stray = bytes(self._buffer)
+        self._buffer.clear()
+        if stray:
+            logging.debug(f"Discarded unread input {stray!r}")
+        return stray
+
+    def close(self) -> None:
+        self._buffer.clear()
+
+
+class SerialTransport(BufferedTransport):
+    """Direct pyserial connection, reads everything the port has buffered at once"""
+
+    def __init__(self, port: str, baud_rate: int = 9600, timeout: float = 2.0):
+        """
+        Args:
+            port (str): serial port, e.g. COM30 or /dev/ttyACM0, or a pyserial URL
+                such as loop://
+            baud_rate (int): baud rate of the serial connection
+            timeout (float): time in s to wait for a reply
+        """
+        import serial
+
+        super().__init__()
+        self.port = port
+        self.timeout = timeout
+        self._serial = serial.serial_for_url(port, baudrate=baud_rate, timeout=timeout)
+
+    def _read_chunk(self) -> bytes:
+        # block for the first byte, then take whatever else already arrived
+        return self._serial.read(self._serial.in_waiting or 1)
+
+    def _in_waiting(self) -> int:
+        return self._serial.in_waiting
+
+    def _write_bytes(self, data: bytes) -> None:
+        self._serial.write(data)
+
+    def close(self) -> None:
+        super().close()
+        self._serial.close()
+
+
+class VisaTransport(BufferedTransport):
+    """pyvisa serial resource read as a byte stream"""
+
+    def __init__(self, resource: Any):
+        super().__init__()
+        self.resource = resource
+        # pyvisa uses None for an infinite timeout
+        timeout = resource.timeout
+        self.timeout = timeout / 1e3 if timeout is not None else None
+
+    def _read_chunk(self) -> bytes:
+        import pyvisa
+
+        try:
+            return self.resource.read_bytes(max(self.resource.bytes_in_buffer, 1))
+        except pyvisa.errors.VisaIOError as error:
+            if error.error_code == pyvisa.constants.StatusCode.error_timeout:
+                return b""
+            raise
+
+    def _in_waiting(self) -> int:
+        return self.resource.bytes_in_buffer
+
+    def _write_bytes(self, data: bytes) -> None:
+        self.resource.write_raw(data)
+
+    def close(self) -> None:
+        super().close()
+        self.resource.close()
+
+
+_resource_manager = None
+_resource_manager_lock = threading.Lock()
+
+
+def resource_manager():
+    """
+    pyvisa ResourceManager shared by all amplifiers in the process, created on first use
+    """
+    global _resource_manager
+    with _resource_manager_lock:
+        if _resource_manager is None:
+            try:
+                import pyvisa
+            except ImportError as error:
+                raise ImportError(
+                    "VISA resources require pyvisa, install with "
+                    "`pip install mpbc-vyfa-sf[visa]`"
+                ) from error
+
+            _resource_manager = pyvisa.ResourceManager()
+    return _resource_manager
+
+
+def open_visa(resource_name: str, baud_rate: int = 9600) -> VisaTransport:
+    """Open a pyvisa serial resource"""
+    return VisaTransport(
+        resource_manager().open_resource(resource_name, baud_rate=baud_rate)
+    )
+
+
+def open_transport(resource_name: str, baud_rate: int = 9600) -> BufferedTransport:
+    """
+    Open the transport for a resource name; VISA resource names (e.g. ASRL30::INSTR)
+    use pyvisa, serial ports (e.g. COM30 or /dev/ttyACM0) and pyserial URLs use
+    SerialTransport.
+    """
+    if "::" in resource_name:
+        return open_visa(resource_name, baud_rate)
+    return SerialTransport(resource_name, baud_rate)
+
+
+def list_resources() -> List[str]:
+    """Serial ports of the system"""
+    from serial.tools import list_ports
+
+    return [port.device for port in list_ports.comports()]
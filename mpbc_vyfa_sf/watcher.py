@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Type, Union
+
+from .amplifier import MPBAmplifier
+from .enums import Alarm, Fault
+from .timing import DeadlineScheduler
+
+
+@dataclass(frozen=True)
+class AlarmEvent:
+    """Alarm or fault that was raised or cleared, timestamp from time.time"""
+
+    condition: Union[Alarm, Fault]
+    raised: bool
+    timestamp: float
+
+    @property
+    def cleared(self) -> bool:
+        return not self.raised
+
+    def __str__(self) -> str:
+        condition = f"{type(self.condition).__name__}.{self.condition.name}"
+        return f"{condition} {'raised' if self.raised else 'cleared'}"
+
+
+def _edges(
+    kind: Type[Union[Alarm, Fault]], previous: int, current: int, timestamp: float
+) -> List[AlarmEvent]:
+    changed = (previous ^ current) & sum(1 << member for member in kind)
+    events = []
+    while changed:
+        bit = changed & -changed
+        condition = kind(bit.bit_length() - 1)
+        events.append(AlarmEvent(condition, bool(current & bit), timestamp))
+        changed ^= bit
+    return events
+
+
+class AlarmWatcher:
+    """
+    Poll the alarms and faults of an amplifier in a single exchange and emit an
+    AlarmEvent to the subscribers for every alarm or fault that was raised or cleared.
+    Only the bitmasks of the previous poll are compared, so a poll without changes does
+    no further work.
+
+    Faults in disable_on disable the laser as soon as they are raised. If disabling
+    fails, e.g. because the connection dropped, the events are still emitted and the
+    laser is disabled at the next poll at which the fault is still raised.
+    """
+
+    def __init__(
+        self,
+        amplifier: MPBAmplifier,
+        rate: float = 1.0,
+        disable_on: Iterable[Fault] = (),
+    ):
+        """
+        Args:
+            amplifier (MPBAmplifier): amplifier to watch
+            rate (float): polling rate in Hz
+            disable_on (Iterable[Fault]): faults that disable the laser when raised
+        """
+        self.amplifier = amplifier
+        self.rate = rate
+        self.disable_on = frozenset(disable_on)
+        self._disable_mask = sum(1 << fault for fault in self.disable_on)
+
+        self.alarms = 0
+        self.faults = 0
+        # raised faults in disable_on for which the laser was disabled
+        self._disabled = 0
+        self._subscribers: List[Callable[[AlarmEvent], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "AlarmWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def active(self) -> List[Union[Alarm, Fault]]:
+        """Alarms and faults raised at the last poll"""
+        return [alarm for alarm in Alarm if self.alarms & (1 << alarm)] + [
+            fault for fault in Fault if self.faults & (1 << fault)
+        ]
+
+    def subscribe(self, callback: Callable[[AlarmEvent], None]) -> None:
+        """Call callback with every event, called from the polling thread"""
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: Callable[[AlarmEvent], None]) -> None:
+        self._subscribers = [cb for cb in self._subscribers if cb != callback]
+
+    def poll(self) -> List[AlarmEvent]:
+        """Read the alarms and faults once and emit the events of the changes"""
+        alarms, faults = self.amplifier.read_many("alarms", "faults", use_cache=False)
+        alarms, faults = int(alarms), int(faults)
+        self._disable(faults)
+        if alarms == self.alarms and faults == self.faults:
+            return []
+
+        timestamp = time.time()
+        events = _edges(Alarm, self.alarms, alarms, timestamp) + _edges(
+            Fault, self.faults, faults, timestamp
+        )
+        self.alarms, self.faults = alarms, faults
+
+        for event in events:
+            for callback in self._subscribers:
+                try:
+                    callback(event)
+                except Exception:
+                    logging.exception("AlarmWatcher subscriber failed")
+        return events
+
+    def _disable(self, faults: int) -> None:
+        # a fault that cleared disables the laser again when it is raised again
+        self._disabled &= faults
+        triggered = faults & self._disable_mask & ~self._disabled
+        if not triggered:
+            return
+        names = ", ".join(f.name for f in Fault if triggered & (1 << f))
+        logging.warning(f"Disabling the laser after fault {names}")
+        try:
+            self.amplifier.disable_laser()
+        except Exception:
+            logging.exception("AlarmWatcher failed to disable the laser, retrying")
+            return
+        self._disabled |= triggered
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="AlarmWatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        # skip missed polls instead of trying to catch up
+        schedule = DeadlineScheduler(
+            1 / self.rate, skip_missed=True, sleep=self._stop.wait
+        )
+        schedule.start()
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logging.exception("AlarmWatcher failed to read the amplifier")
+            schedule.wait()
@@ -0,0 +1,14 @@
+import pytest
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier
+
+
+@pytest.fixture
+def simulator() -> SimulatedAmplifier:
+    return SimulatedAmplifier()
+
+
+@pytest.fixture
+def amp(simulator: SimulatedAmplifier):
+    with MPBAmplifier("SIM", instrument=simulator) as amp:
+        yield amp
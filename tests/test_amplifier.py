@@ -0,0 +1,88 @@
+import pytest
+
+from mpbc_vyfa_sf import LaserState, MPBAmplifier, SimulatedAmplifier
+from mpbc_vyfa_sf.enums import Fault, FaultFlag
+from mpbc_vyfa_sf.exceptions import MPBCommandError, MPBKeyError
+from mpbc_vyfa_sf.protocol import ErrorCode, Status
+
+
+class SlowSimulator(SimulatedAmplifier):
+    """Simulator whose replies arrive only after the next write while hold is set"""
+
+    hold = False
+
+    def _in_waiting(self) -> int:
+        return 0
+
+    def _read_chunk(self) -> bytes:
+        return b"" if self.hold else super()._read_chunk()
+
+
+def test_get(amp):
+    assert amp.model == "VYFA-SF-SIM"
+    assert amp.serial == "SIM00001"
+    assert amp.laser_state == LaserState.OFF
+    assert amp.output_power == 0.0
+    assert amp.booster_current_setpoint == 1500.0
+
+
+def test_read_many(amp):
+    laser_state, setpoint = amp.read_many("laser_state", "booster_current_setpoint")
+    assert laser_state == LaserState.OFF
+    assert setpoint == 1500.0
+
+
+def test_set(amp, simulator):
+    amp.booster_current_setpoint = 1200
+    assert simulator.booster_current_setpoint == 1200.0
+    assert amp.booster_current_setpoint == 1200.0
+
+    amp.power_stabilization = True
+    assert amp.power_stabilization is True
+
+
+def test_set_requires_test_environment(amp, simulator):
+    with pytest.raises(MPBCommandError):
+        amp.shg_temperature_setpoint = 45.0
+
+    amp.enter_test_environment()
+    amp.shg_temperature_setpoint = 45.0
+    assert simulator.shg_temperature_setpoint == 45.0
+
+
+def test_request_error(amp):
+    response = amp.request("LDCur 3 5000")
+    assert response.status == Status.ERROR
+    assert response.error == ErrorCode.DATA_CANNOT_BE_SET
+    with pytest.raises(MPBCommandError):
+        response.raise_for_error()
+
+    # the link stays in sync after a rejected command
+    assert amp.booster_current_setpoint == 1500.0
+
+
+def test_fault(amp, simulator):
+    assert amp.get_faults() == []
+    simulator.inject_fault(Fault.WATCHDOG_TIMEOUT)
+
+    assert amp.faults == FaultFlag.WATCHDOG_TIMEOUT
+    assert amp.get_faults() == [Fault.WATCHDOG_TIMEOUT]
+    assert amp.laser_state == LaserState.FAULT
+    with pytest.raises(MPBKeyError):
+        amp.enable_laser()
+
+    simulator.clear_faults()
+    amp.enable_laser()
+    assert amp.laser_state != LaserState.FAULT
+
+
+def test_late_reply_discarded():
+    simulator = SlowSimulator()
+    with MPBAmplifier("SIM", instrument=simulator) as amp:
+        simulator.hold = True
+        with pytest.raises(TimeoutError):
+            amp.read_many("output_power_setpoint", use_cache=False)
+        simulator.hold = False
+        # the late reply arrives ahead of the reply to the next command
+        assert amp.read_many("booster_current_setpoint", use_cache=False) == [1500.0]
+        assert amp.read_many("output_power_setpoint", use_cache=False) == [50.0]
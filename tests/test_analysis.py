@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mpbc_vyfa_sf.analysis import fit_scans, load_scans  # noqa: E402
+
+EXAMPLES = Path(__file__).parents[1] / "examples"
+
+
+def test_load_short_rows():
+    scans = load_scans(EXAMPLES, "2024_06_01T*_shg_scan.csv")
+    assert len(scans) == 5
+    # the rows of the first four scans hold the setpoint and the power only
+    assert np.isnan(scans.temperature[:4]).all()
+    assert not np.isnan(scans.temperature[4]).any()
+    assert scans.setpoint[0, :2].tolist() == [70.0, 71.0]
+    assert scans.power[0, :2].tolist() == [0.5761435131661554, 0.3153585788906489]
+    assert np.array_equal(scans.x[:4], scans.setpoint[:4], equal_nan=True)
+
+
+def test_fit_short_rows(tmp_path):
+    # a scan with a phase-matching peak written as setpoint and power rows
+    setpoints = np.arange(45.0, 55.0, 0.25)
+    powers = 80 * np.sinc((setpoints - 50.3) / 1.5) ** 2 + 0.5
+    path = tmp_path / "2024_06_02T10_00_00_shg_scan.csv"
+    rows = [f"{setpoint},{power}" for setpoint, power in zip(setpoints, powers)]
+    header = "shg temperature setpoint [C],shg temperature [C],power [mW]"
+    path.write_text("\n".join([header] + rows) + "\n")
+
+    fits = fit_scans(load_scans([path]))
+    assert fits.converged.all()
+    assert fits.center == pytest.approx([50.3], abs=1e-3)
+    assert fits.width == pytest.approx([1.5], rel=1e-3)
+
+
+def test_fit_scans_without_peak():
+    scans = load_scans(EXAMPLES, "2024_06_01T*_shg_scan.csv")
+    fits = fit_scans(scans)
+    # the example scans are noise, fits that diverge are rejected instead of
+    # returning a center far outside of the scan
+    converged = fits.converged
+    assert np.isnan(fits.center[~converged]).all()
+    low, high = np.nanmin(scans.x, axis=1), np.nanmax(scans.x, axis=1)
+    assert ((low <= fits.center) & (fits.center <= high))[converged].all()
+
+
+def test_fit_scan():
+    scans = load_scans(EXAMPLES.parent / "Examples" / "shg_temperature_scan.csv")
+    fits = fit_scans(scans)
+    assert fits.converged.all()
+    assert 49.5 < fits.center[0] < 50.5
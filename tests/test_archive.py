@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from mpbc_vyfa_sf.archive import (  # noqa: E402
+    ChunkWriter,
+    TelemetryLogger,
+    list_chunks,
+    query,
+)
+from mpbc_vyfa_sf.cli import main  # noqa: E402
+
+COLUMNS = ("timestamp", "setpoint", "power")
+
+
+def test_archive(tmp_path):
+    start = 1_717_200_000.0
+    with ChunkWriter(tmp_path, COLUMNS, max_duration=10.0) as writer:
+        for i in range(25):
+            writer.append((start + i, i, 2 * i))
+        writer.flush()
+        active = [chunk for chunk in list_chunks(tmp_path) if not chunk.sealed]
+        assert len(active) == 1
+        assert len(query(tmp_path, start + 20, start + 30)) == 5
+    chunks = list_chunks(tmp_path)
+    assert len(chunks) == 3
+    assert all(chunk.sealed for chunk in chunks)
+    data = query(tmp_path, start + 5, start + 14.5, ["power"])
+    assert data.dtype.names == ("timestamp", "power")
+    assert data["power"].tolist() == [2 * i for i in range(5, 15)]
+    assert sorted(path.suffix for path in tmp_path.rglob("*")) == [""] + [".npz"] * 3
+
+
+def test_logger_stop_timeout(amp, tmp_path, monkeypatch):
+    channels = ("output_power", "alarms")
+    writer = ChunkWriter(tmp_path, ("timestamp",) + channels)
+    release = threading.Event()
+    read_many = amp.read_many
+
+    def hanging_read(*names, **kwargs):
+        release.wait()
+        return read_many(*names, **kwargs)
+
+    monkeypatch.setattr(amp, "read_many", hanging_read)
+    logger = TelemetryLogger(amp, writer, channels, rate=100.0)
+    logger.start()
+    with pytest.raises(RuntimeError):
+        logger.stop(timeout=0.01)
+    assert logger.running
+    release.set()
+    logger.stop(timeout=1)
+    assert logger.count == 1
+    chunks = list_chunks(tmp_path)
+    assert len(chunks) == 1 and chunks[0].sealed
+
+
+@pytest.mark.parametrize("channel", ["model", "power"])
+def test_cli_rejects_channels(channel, capsys):
+    with pytest.raises(SystemExit):
+        main(["log", "SIM", "--channels", "output_power", channel])
+    assert f"{channel} is not a numeric property" in capsys.readouterr().err
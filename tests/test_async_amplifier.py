@@ -0,0 +1,89 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from mpbc_vyfa_sf import SimulatedAmplifier
+from mpbc_vyfa_sf.async_amplifier import AsyncMPBAmplifier, _serial_port
+
+
+class SimulatedWriter:
+    """StreamWriter that executes commands on a simulator and feeds the reply to a
+    StreamReader, or holds the replies back while hold is set"""
+
+    def __init__(self, simulator: SimulatedAmplifier, reader: asyncio.StreamReader):
+        self.simulator = simulator
+        self.reader = reader
+        self.hold = False
+        self.held: List[bytes] = []
+
+    def write(self, data: bytes) -> None:
+        self.simulator._write_bytes(data)
+        reply = self.simulator._read_chunk()
+        if self.hold:
+            self.held.append(reply)
+        else:
+            self.reader.feed_data(reply)
+
+    def release(self) -> None:
+        for reply in self.held:
+            self.reader.feed_data(reply)
+        self.held.clear()
+
+    async def drain(self) -> None:
+        pass
+
+
+def connect(simulator: SimulatedAmplifier):
+    reader = asyncio.StreamReader()
+    writer = SimulatedWriter(simulator, reader)
+    return AsyncMPBAmplifier(reader, writer, timeout=0.05), writer
+
+
+def test_get():
+    async def run():
+        amp, _ = connect(SimulatedAmplifier())
+        assert await amp.get("model") == "VYFA-SF-SIM"
+        assert await amp.read_many("booster_current_setpoint", "output_power") == [
+            1500.0,
+            0.0,
+        ]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("lost", [False, True])
+def test_reply_after_timeout(lost):
+    """The reply to a timed out command is not returned for the next command"""
+
+    async def run():
+        simulator = SimulatedAmplifier()
+        amp, writer = connect(simulator)
+        writer.hold = True
+        with pytest.raises(asyncio.TimeoutError):
+            await amp.get("output_power_setpoint")
+        writer.hold = False
+        if lost:
+            writer.held.clear()
+        else:
+            # the late reply arrives before the next command is sent
+            writer.release()
+
+        simulator.output_power_setpoint = 80.0
+        assert await amp.get("output_power_setpoint") == 80.0
+        assert await amp.get("booster_current_setpoint") == 1500.0
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize(
+    "resource_name, port",
+    [
+        ("ASRL30::INSTR", "COM30"),
+        ("ASRL/dev/ttyUSB0::INSTR", "/dev/ttyUSB0"),
+        ("COM4", "COM4"),
+        ("/dev/ttyUSB0", "/dev/ttyUSB0"),
+    ],
+)
+def test_serial_port(resource_name, port):
+    assert _serial_port(resource_name) == port
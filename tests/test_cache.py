@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier
+from mpbc_vyfa_sf.cache import MISSING, ReadCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def simulator(clock):
+    return SimulatedAmplifier(clock=clock)
+
+
+@pytest.fixture
+def amp(simulator, clock):
+    with MPBAmplifier("SIM", cache_ttl=0.5, instrument=simulator) as amp:
+        amp._cache = ReadCache(0.5, clock=clock)
+        yield amp
+
+
+def test_ttl(amp, simulator, clock):
+    command = MPBAmplifier.shg_temperature.read_command
+    temperature = amp.shg_temperature
+    simulator.shg_temperature_setpoint += 10.0
+    clock.now += 0.5
+    assert amp.shg_temperature == temperature
+    clock.now += 0.1
+    assert amp.shg_temperature > temperature
+    assert amp.cache.hits[command] == 1
+    assert amp.cache.misses[command] == 2
+
+    # properties with an infinite time-to-live never expire
+    assert amp.model == "VYFA-SF-SIM"
+    clock.now += 1e6
+    simulator.model = "VYFA-SF-OTHER"
+    assert amp.model == "VYFA-SF-SIM"
+
+
+def test_invalidate_on_set(amp, simulator):
+    assert amp.booster_current_setpoint == 1500.0
+    amp.booster_current_setpoint = 1000.0
+    assert simulator.booster_current_setpoint == 1000.0
+    assert amp.booster_current_setpoint == 1000.0
+    command = MPBAmplifier.booster_current_setpoint.read_command
+    assert amp.cache.hits[command] == 0
+    assert amp.cache.misses[command] == 2
+
+
+@pytest.mark.parametrize("method", ["enable_laser", "disable_laser", "save_all"])
+def test_invalidate_on_command(amp, simulator, method):
+    assert amp.power_stabilization is False
+    simulator.power_stabilization = True
+    assert amp.power_stabilization is False
+    getattr(amp, method)()
+    assert amp.power_stabilization is True
+
+
+def test_counters(clock):
+    cache = ReadCache(1.0, clock=clock)
+    assert cache.get("GETPOWER 0") is MISSING
+    cache.set("GETPOWER 0", 50.0)
+    assert cache.get("GETPOWER 0") == 50.0
+    assert cache.get("GETPOWER 0", ttl=math.inf) == 50.0
+    clock.now = 2.0
+    assert cache.get("GETPOWER 0") is MISSING
+    assert cache.get("GETPOWER 0", ttl=math.inf) == 50.0
+    assert (cache.hit_count, cache.miss_count) == (3, 2)
+    assert cache.hit_rate == 0.6
+    cache.reset_counters()
+    assert (cache.hit_count, cache.miss_count, cache.hit_rate) == (0, 0, 0.0)
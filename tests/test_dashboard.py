@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("rich")
+pytest.importorskip("asciichartpy")
+
+from rich.console import Console  # noqa: E402
+
+from mpbc_vyfa_sf.dashboard import Chart, LiveDashboard  # noqa: E402
+from mpbc_vyfa_sf.downsample import BucketedSeries  # noqa: E402
+
+
+def test_bucketed_series_values():
+    series = BucketedSeries(buckets=8)
+    for i in range(100):
+        series.append(i, np.sin(i / 5), 2 * i)
+    table = series.table()
+    assert len(table) <= 16
+    # the values are kept with the point they were appended with
+    assert table[:, 2].tolist() == (2 * table[:, 0]).tolist()
+    assert table[:, 1].tolist() == np.sin(table[:, 0] / 5).tolist()
+
+
+def test_channels_line_up():
+    rng = np.random.default_rng(0)
+    chart = Chart("SHG temperature [C]", ("shg_temperature", "setpoint"))
+    dashboard = LiveDashboard([chart], buckets=64)
+    for i in range(5000):
+        setpoint = 40.0 + i // 500
+        dashboard.update(
+            {"shg_temperature": setpoint + rng.normal(0, 0.1), "setpoint": setpoint},
+            x=i,
+        )
+    data = dashboard.chart_data(0, 60)
+    assert data.shape == (60, 3)
+    # both channels are taken at the same samples
+    assert np.array_equal(data[:, 2], 40.0 + data[:, 0] // 500)
+    assert dashboard.values()["setpoint"] == 49.0
+
+    console = Console(file=io.StringIO(), width=80)
+    console.print(dashboard)
+    assert "setpoint = 49.00" in console.file.getvalue()
+
+
+def test_missing_channels():
+    chart = Chart("power", ("output_power", "output_power_setpoint"))
+    dashboard = LiveDashboard([chart])
+    dashboard.update({"output_power_setpoint": 10.0})
+    assert len(dashboard.chart_data(0, 10)) == 0
+    dashboard.update({"output_power": 1.0})
+    data = dashboard.chart_data(0, 10)
+    assert data[0, 1] == 1.0 and np.isnan(data[0, 2])
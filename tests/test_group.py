@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier
+from mpbc_vyfa_sf.exceptions import MPBGroupError, MPBKeyError
+from mpbc_vyfa_sf.group import AmplifierGroup
+
+
+@pytest.fixture
+def simulators():
+    # the key of the last amplifier is not in the enable position
+    return {
+        "A": SimulatedAmplifier(),
+        "B": SimulatedAmplifier(),
+        "C": SimulatedAmplifier(key_enabled=False),
+    }
+
+
+@pytest.fixture
+def group(simulators):
+    amplifiers = {
+        name: MPBAmplifier(name, instrument=simulator)
+        for name, simulator in simulators.items()
+    }
+    with AmplifierGroup(amplifiers) as group:
+        yield group
+
+
+def test_run(group, simulators):
+    assert group.get("booster_current_setpoint") == dict.fromkeys(simulators, 1500.0)
+    assert group.set_each("booster_current_setpoint", {"A": 1000.0, "B": 1200.0}) == {
+        "A": None,
+        "B": None,
+    }
+    assert [sim.booster_current_setpoint for sim in simulators.values()] == [
+        1000.0,
+        1200.0,
+        1500.0,
+    ]
+    snapshots = group.snapshot("booster_current_setpoint", "output_power_setpoint")
+    assert snapshots["B"].booster_current_setpoint == 1200.0
+
+
+def test_group_error(group, simulators):
+    with pytest.raises(MPBGroupError) as error:
+        group.enable_laser()
+    assert list(error.value.errors) == ["C"]
+    assert isinstance(error.value.errors["C"], MPBKeyError)
+    assert error.value.results == {"A": None, "B": None}
+    assert "C: MPBKeyError" in str(error.value)
+    assert [sim.emission for sim in simulators.values()] == [True, True, False]
+
+    # the failed amplifier keeps working
+    assert group.get("enabled") == {"A": True, "B": True, "C": False}
+
+
+def test_group_timeout(group):
+    release = threading.Event()
+
+    def read(amplifier):
+        if amplifier is group["B"]:
+            release.wait()
+        return amplifier.booster_current_setpoint
+
+    with pytest.raises(MPBGroupError) as error:
+        group.run(read, timeout=0.05)
+    release.set()
+    assert isinstance(error.value.errors["B"], TimeoutError)
+    assert error.value.results == {"A": 1500.0, "C": 1500.0}
@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mpbc_vyfa_sf.recorder import ScanRecorder, column_path, load_scan  # noqa: E402
+
+COLUMNS = ("timestamp", "setpoint", "power")
+
+
+def test_recorder(tmp_path):
+    path = tmp_path / "scan"
+    samples = [(float(i), 40 + i / 10, i**2) for i in range(40)]
+    with ScanRecorder(path, COLUMNS, metadata={"serial": "SIM"}, buffer_size=8) as rec:
+        for sample in samples[:20]:
+            rec.append(sample)
+        # flushed samples are readable while the recording is in progress
+        assert len(load_scan(path)) == 16
+        for sample in samples[20:]:
+            rec.append(sample)
+
+    for index in range(len(COLUMNS)):
+        column = np.load(column_path(path, index))
+        assert column.dtype == np.float64
+        assert column.tolist() == [sample[index] for sample in samples]
+
+    scan = load_scan(path)
+    assert len(scan) == len(samples)
+    assert scan.metadata["serial"] == "SIM"
+    assert scan.metadata["rows"] == len(samples)
+    assert isinstance(scan["power"], np.memmap)
+    assert scan["power"].tolist() == [sample[2] for sample in samples]
+    assert path.with_suffix(".csv").read_text().splitlines()[0] == ",".join(COLUMNS)
+
+
+def test_interrupted_flush(tmp_path):
+    path = tmp_path / "scan"
+    with ScanRecorder(path, COLUMNS, buffer_size=4) as recorder:
+        for i in range(8):
+            recorder.append((i, i, i))
+    # a flush interrupted after writing the first column
+    with open(column_path(path, 0), "ab") as file:
+        file.write(np.arange(4, dtype=np.float64).tobytes())
+    scan = load_scan(path)
+    assert len(scan) == 8
+    assert all(len(column) == 8 for column in scan.columns.values())
+
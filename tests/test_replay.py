@@ -0,0 +1,53 @@
+import pytest
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier
+from mpbc_vyfa_sf.exceptions import MPBReplayError
+from mpbc_vyfa_sf.replay import ReplayTransport, load_transcript
+
+
+def session(amp: MPBAmplifier) -> list:
+    values = [amp.model, amp.laser_state, amp.output_power]
+    amp.enter_test_environment()
+    amp.shg_temperature_setpoint = 48.0
+    values.append(amp.snapshot("shg_temperature", "output_power"))
+    values.append(amp.get_faults())
+    return values
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    path = tmp_path / "session.jsonl.gz"
+    simulator = SimulatedAmplifier(latency=0.002)
+    with MPBAmplifier("SIM", instrument=simulator, record=str(path)) as amp:
+        recorded = session(amp)
+    return path, recorded
+
+
+def test_transcript(transcript):
+    path, _ = transcript
+    loaded = load_transcript(path)
+    assert loaded.header["resource_name"] == "SIM"
+    assert loaded.commands[:2] == ["GETMODEL", "GETLASERSTATE"]
+    assert "testeoa" in loaded.commands
+
+
+@pytest.mark.parametrize("speed", [None, 1.0])
+def test_replay(transcript, speed):
+    path, recorded = transcript
+    replay = ReplayTransport(path, speed=speed)
+    with MPBAmplifier("REPLAY", instrument=replay) as amp:
+        assert session(amp) == recorded
+    assert replay.finished
+
+
+def test_replay_resource_name(transcript):
+    path, recorded = transcript
+    with MPBAmplifier(f"REPLAY:{path}") as amp:
+        assert session(amp) == recorded
+
+
+def test_replay_mismatch(transcript):
+    path, _ = transcript
+    with MPBAmplifier(f"REPLAY:{path}") as amp:
+        with pytest.raises(MPBReplayError):
+            amp.serial
@@ -0,0 +1,11 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from mpbc_vyfa_sf.scan import adaptive_scan  # noqa: E402
+
+
+@pytest.mark.parametrize("coarse_points", [0, 1, 2])
+def test_adaptive_scan_coarse_points(amp, coarse_points):
+    with pytest.raises(ValueError):
+        adaptive_scan(amp, 45.0, 4.0, coarse_points=coarse_points)
@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier, amplifier
+from mpbc_vyfa_sf.exceptions import MPBPendingCommandError
+from mpbc_vyfa_sf.protocol import Response
+from mpbc_vyfa_sf.scheduler import CommandScheduler
+
+
+class BlockingExchange:
+    """Exchange that blocks until released, then raises error if given"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, commands, data):
+        self.started.set()
+        self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return [Response(command, ("OK",), None) for command in commands]
+
+
+class GatedSend:
+    """Wrap the send of an amplifier and block the exchanges containing command"""
+
+    def __init__(self, amp, command):
+        self.send = amp._send
+        self.command = command
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, commands, data):
+        if self.command in commands:
+            self.started.set()
+            self.release.wait()
+        return self.send(commands, data)
+
+
+@pytest.fixture
+def gated(amp, simulator):
+    simulator.timeout = 0.01
+    amp.model
+    send = GatedSend(amp, "GETPOWER 0")
+    amp._send = send
+    amp.start_scheduler()
+    yield send
+    send.release.set()
+    amp.stop_scheduler()
+
+
+def test_send_queued_on_stop():
+    exchange = BlockingExchange()
+    scheduler = CommandScheduler(exchange)
+    first = scheduler.submit(["GETPOWER 0"], read=True)
+    exchange.started.wait(1)
+    second = scheduler.submit(["GETLDCUR 3"], read=True)
+    assert scheduler.backlog == 2
+    exchange.release.set()
+    scheduler.stop(timeout=1)
+    assert first.result(0)[0].payload == "OK"
+    assert second.result(0)[0].payload == "OK"
+    with pytest.raises(RuntimeError):
+        scheduler.submit(["GETPOWER 0"])
+
+
+def test_fail_queued_on_stop_timeout():
+    exchange = BlockingExchange()
+    scheduler = CommandScheduler(exchange)
+    first = scheduler.submit(["GETPOWER 0"], read=True)
+    exchange.started.wait(1)
+    second = scheduler.submit(["GETLDCUR 3"], read=True)
+    scheduler.stop(timeout=0.01)
+    with pytest.raises(RuntimeError):
+        second.result(1)
+    exchange.release.set()
+    assert first.result(1)[0].payload == "OK"
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_fail_queued_when_thread_dies():
+    exchange = BlockingExchange(error=SystemExit())
+    scheduler = CommandScheduler(exchange)
+    first = scheduler.submit(["GETPOWER 0"], read=True)
+    exchange.started.wait(1)
+    second = scheduler.submit(["GETLDCUR 3"], read=True)
+    exchange.release.set()
+    scheduler.stop(timeout=1)
+    done, _ = wait([first, second], timeout=1)
+    assert len(done) == 2
+    with pytest.raises(SystemExit):
+        first.result()
+    with pytest.raises(RuntimeError):
+        second.result()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(["GETPOWER 0"])
+
+
+def test_exchange_timeout():
+    simulator = SimulatedAmplifier(latency=0.5)
+    simulator.timeout = 0.01
+    with MPBAmplifier("SIM", instrument=simulator) as amp:
+        amp.model
+        amp.start_scheduler()
+        with pytest.raises(TimeoutError):
+            amp.output_power
+
+
+def test_queued_write_timeout_not_sent(amp, simulator, gated):
+    amp._scheduler.submit(["GETPOWER 0"], read=True)
+    assert gated.started.wait(1)
+    with pytest.raises(TimeoutError) as error:
+        amp.output_power_setpoint = 20
+    assert not isinstance(error.value, MPBPendingCommandError)
+    gated.release.set()
+    amp.stop_scheduler()
+    assert simulator.output_power_setpoint == 50
+
+
+def test_sent_write_timeout_pending(amp, simulator, gated):
+    gated.command = "SETPOWER 0 20"
+    with pytest.raises(MPBPendingCommandError):
+        amp.output_power_setpoint = 20
+    gated.release.set()
+    amp.stop_scheduler()
+    assert simulator.output_power_setpoint == 20
+
+
+def test_queue_wait_capped(amp, gated, monkeypatch):
+    monkeypatch.setattr(amplifier, "MAX_QUEUE_WAIT", 0.05)
+    for _ in range(10):
+        amp._scheduler.submit(["GETPOWER 0"])
+    assert gated.started.wait(1)
+    with pytest.raises(TimeoutError, match="within 0.05 s"):
+        amp.booster_current
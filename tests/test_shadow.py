@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from mpbc_vyfa_sf import MPBAmplifier, SimulatedAmplifier
+
+
+@pytest.fixture
+def amp():
+    simulator = SimulatedAmplifier()
+    with MPBAmplifier("SIM", instrument=simulator, shadow=True) as amp:
+        amp.start_scheduler()
+        yield amp
+
+
+def test_skip_matching_write(amp):
+    assert amp.booster_current_setpoint == 1500.0
+    amp.submit_write("booster_current_setpoint", 1500).result(1)
+    assert amp.shadow.skipped == 1
+    amp.submit_write("booster_current_setpoint", 1200).result(1)
+    assert amp.shadow.get("booster_current_setpoint") == 1200
+    assert amp.verify_shadow() == {}
+
+
+def test_failed_submit(amp):
+    amp._scheduler.stop()
+    with pytest.raises(RuntimeError):
+        amp.submit_write("booster_current_setpoint", 1200)
+    assert not amp.shadow.pending("booster_current_setpoint")
+
+
+def test_verify_skips_pending(amp):
+    assert amp.booster_current_setpoint == 1500.0
+    amp.instr.latency = 0.2
+    write = amp.submit_write("booster_current_setpoint", 1200)
+    assert amp.shadow.pending("booster_current_setpoint")
+    # the readback of the queued write is not a mismatch
+    assert amp.verify_shadow() == {}
+    write.result(1)
+    assert amp.shadow.get("booster_current_setpoint") == 1200
+
+
+def test_begin(amp):
+    shadow = amp.shadow
+    shadow.confirm("booster_current_setpoint", 1500.0)
+    assert not shadow.begin("booster_current_setpoint", 1500)
+    assert shadow.skipped == 1
+    assert shadow.begin("booster_current_setpoint", 1200)
+    # not skipped while another write is queued
+    assert shadow.begin("booster_current_setpoint", 1500)
+    shadow.end("booster_current_setpoint", 1500, writes=2)
+    assert not shadow.pending("booster_current_setpoint")
+    assert shadow.written == 1
+
+
+def test_coalesced_writes_counted_once(amp):
+    amp.instr.latency = 0.2
+    # the first write is sent right away, the others are queued behind it and
+    # coalesced into a single exchange
+    first = amp.submit_write("booster_current_setpoint", 1000)
+    while amp._scheduler.backlog == 0 or amp._scheduler.queued > 0:
+        time.sleep(0.001)
+    writes = [amp.submit_write("booster_current_setpoint", v) for v in (1100, 1200)]
+    last = amp.submit_write("booster_current_setpoint", 1300)
+    for future in [first, *writes, last]:
+        future.result(2)
+    assert amp.shadow.written == 2
+    assert amp.shadow.get("booster_current_setpoint") == 1300
+    assert not amp.shadow.pending("booster_current_setpoint")
+    assert amp.instr.booster_current_setpoint == 1300.0
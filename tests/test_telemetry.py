@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mpbc_vyfa_sf.telemetry import TelemetryPoller  # noqa: E402
+
+CHANNELS = ("booster_current_setpoint", "output_power_setpoint")
+
+
+@pytest.fixture
+def poller(amp):
+    return TelemetryPoller(amp, CHANNELS, rate=100.0, capacity=4)
+
+
+def append(poller, start, stop):
+    for i in range(start, stop):
+        poller._append(poller.sample_type(float(i), 10.0 * i, 100.0 * i))
+
+
+def test_non_numeric_channel(amp):
+    with pytest.raises(ValueError):
+        TelemetryPoller(amp, ("output_power", "model"))
+
+
+def test_wraparound(poller):
+    assert poller.latest() is None
+    assert poller.window().shape == (0, 3)
+    append(poller, 0, 3)
+    assert poller.window()[:, 0].tolist() == [0.0, 1.0, 2.0]
+    append(poller, 3, 10)
+    assert poller.count == 10
+    assert poller.latest().timestamp == 9.0
+    assert poller.window()[:, 0].tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert poller.window(2)[:, 0].tolist() == [8.0, 9.0]
+    assert poller.window(10).shape == (4, 3)
+    assert poller.channel("output_power_setpoint", 2).tolist() == [800.0, 900.0]
+
+
+def test_window_is_view(poller):
+    append(poller, 0, 10)
+    window = poller.window(2)
+    channel = poller.channel("booster_current_setpoint", 2)
+    assert np.shares_memory(window, poller._buffer)
+    assert np.shares_memory(channel, poller._buffer)
+    # valid until capacity - n new samples arrived
+    append(poller, 10, 12)
+    assert window[:, 0].tolist() == [8.0, 9.0]
+    append(poller, 12, 13)
+    assert window[0, 0] == 12.0
+    assert channel[0] == 120.0
+
+
+def test_subscribers(poller, simulator):
+    samples = []
+    received = threading.Event()
+
+    def failing(sample):
+        raise RuntimeError("subscriber failed")
+
+    def collect(sample):
+        samples.append(sample)
+        if len(samples) == 3:
+            received.set()
+
+    poller.subscribe(failing)
+    poller.subscribe(collect)
+    with poller:
+        assert received.wait(1)
+    assert samples[0].booster_current_setpoint == simulator.booster_current_setpoint
+    assert samples[0].output_power_setpoint == simulator.output_power_setpoint
+    assert poller.latest() == samples[-1]
+
+    poller.unsubscribe(collect)
+    count = len(samples)
+    append(poller, 0, 1)
+    assert len(samples) == count
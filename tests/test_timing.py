@@ -0,0 +1,75 @@
+import pytest
+
+from mpbc_vyfa_sf.timing import DeadlineScheduler
+
+
+class FakeClock:
+    """Clock that advances when sleeping, by the delay plus oversleep"""
+
+    def __init__(self, oversleep=0.0):
+        self.now = 0.0
+        self.oversleep = oversleep
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, delay: float) -> None:
+        self.now += delay + self.oversleep
+
+
+def scheduler(clock, skip_missed=False):
+    return DeadlineScheduler(
+        1.0, skip_missed=skip_missed, clock=clock, sleep=clock.sleep
+    )
+
+
+def test_no_drift():
+    clock = FakeClock(oversleep=0.25)
+    schedule = scheduler(clock)
+    assert schedule.start() == 0.0
+    deadlines = []
+    for _ in range(10):
+        # work and the late wake up of the previous iteration are absorbed by the sleep
+        clock.now += 0.5
+        deadlines.append(schedule.wait())
+    assert deadlines == [float(i) for i in range(1, 11)]
+    assert clock.now == 10.25
+    stats = schedule.stats
+    assert (stats.count, stats.overruns, stats.skipped) == (10, 0, 0)
+    assert stats.jitter_mean == stats.jitter_max == 0.25
+    assert stats.jitter_std == pytest.approx(0.0)
+    assert stats.planned_duration == 10.0
+    assert stats.duration == 10.25
+
+
+def test_overrun_catches_up():
+    clock = FakeClock()
+    schedule = scheduler(clock)
+    schedule.start()
+    clock.now += 2.5
+    # the missed deadlines follow immediately without sleeping
+    assert schedule.wait() == 1.0
+    assert schedule.wait() == 2.0
+    assert clock.now == 2.5
+    assert schedule.wait() == 3.0
+    assert clock.now == 3.0
+    stats = schedule.stats
+    assert (stats.count, stats.overruns, stats.skipped) == (3, 2, 0)
+    assert stats.overrun_max == 1.5
+    assert stats.jitter_max == 1.5
+
+
+def test_skip_missed():
+    clock = FakeClock()
+    schedule = scheduler(clock, skip_missed=True)
+    schedule.start()
+    clock.now += 2.5
+    assert schedule.wait() == 3.0
+    assert clock.now == 3.0
+    assert schedule.wait() == 4.0
+    stats = schedule.stats
+    assert (stats.count, stats.overruns, stats.skipped) == (2, 1, 2)
+    assert stats.overrun_max == 1.5
+    assert stats.jitter_max == 0.0
+    assert stats.planned_duration == stats.duration == 4.0
+    assert stats.summary()["skipped"] == 2
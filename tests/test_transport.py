@@ -0,0 +1,22 @@
+import pytest
+
+from mpbc_vyfa_sf.transport import BufferedTransport, VisaTransport
+
+
+def test_incomplete_transport():
+    class ReadOnlyTransport(BufferedTransport):
+        def _read_chunk(self) -> bytes:
+            return b""
+
+    with pytest.raises(TypeError):
+        ReadOnlyTransport()
+
+
+class Resource:
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+
+@pytest.mark.parametrize("timeout, expected", [(2000, 2.0), (None, None)])
+def test_visa_timeout(timeout, expected):
+    assert VisaTransport(Resource(timeout)).timeout == expected
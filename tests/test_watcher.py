@@ -0,0 +1,106 @@
+import pytest
+
+from mpbc_vyfa_sf.enums import Alarm, Fault
+from mpbc_vyfa_sf.watcher import AlarmWatcher
+
+
+@pytest.fixture
+def disables(amp, monkeypatch):
+    """Calls of disable_laser, which raises the errors put in the list first"""
+    calls = []
+    errors = []
+    disable_laser = amp.disable_laser
+
+    def disable():
+        calls.append(True)
+        if errors:
+            raise errors.pop(0)
+        disable_laser()
+
+    monkeypatch.setattr(amp, "disable_laser", disable)
+    return calls, errors
+
+
+def test_events(amp, simulator):
+    watcher = AlarmWatcher(amp)
+    events = []
+    watcher.subscribe(events.append)
+    assert watcher.poll() == []
+
+    simulator.inject_fault(Fault.TEC_TEMPERATURE)
+    simulator.inject_fault(Fault.CASE_TEMPERATURE)
+    watcher.poll()
+    assert [(event.condition, event.raised) for event in events] == [
+        (Fault.TEC_TEMPERATURE, True),
+        (Fault.CASE_TEMPERATURE, True),
+    ]
+    assert watcher.active() == [Fault.TEC_TEMPERATURE, Fault.CASE_TEMPERATURE]
+    # no events without changes
+    assert watcher.poll() == []
+
+    simulator.clear_faults()
+    assert [str(event) for event in watcher.poll()] == [
+        "Fault.TEC_TEMPERATURE cleared",
+        "Fault.CASE_TEMPERATURE cleared",
+    ]
+    assert len(events) == 4
+    assert watcher.active() == []
+
+
+def test_unknown_bits_masked(amp, simulator):
+    watcher = AlarmWatcher(amp)
+    # a fault bit without a Fault member
+    simulator.faults.append(True)
+    assert watcher.poll() == []
+    simulator.inject_fault(Fault.SHG_TEMPERATURE)
+    (event,) = watcher.poll()
+    assert event.condition == Fault.SHG_TEMPERATURE
+    assert watcher.active() == [Fault.SHG_TEMPERATURE]
+
+
+def test_alarm_events(amp, simulator):
+    watcher = AlarmWatcher(amp)
+    amp.enable_laser()
+    simulator.shg_temperature_setpoint = simulator.shg_temperature + 10
+    events = watcher.poll()
+    assert Alarm.SHG_TEMPERATURE in [event.condition for event in events]
+
+
+def test_disable_on_fault(amp, simulator, disables):
+    calls, _ = disables
+    watcher = AlarmWatcher(amp, disable_on=[Fault.WATCHDOG_TIMEOUT])
+    simulator.inject_fault(Fault.TEC_TEMPERATURE)
+    watcher.poll()
+    assert calls == []
+
+    simulator.inject_fault(Fault.WATCHDOG_TIMEOUT)
+    watcher.poll()
+    assert len(calls) == 1
+    # the laser is disabled once per raised fault
+    watcher.poll()
+    assert len(calls) == 1
+
+    simulator.clear_faults()
+    watcher.poll()
+    simulator.inject_fault(Fault.WATCHDOG_TIMEOUT)
+    watcher.poll()
+    assert len(calls) == 2
+
+
+def test_disable_retried(amp, simulator, disables):
+    calls, errors = disables
+    errors.append(TimeoutError("No reply"))
+    watcher = AlarmWatcher(amp, disable_on=[Fault.WATCHDOG_TIMEOUT])
+    events = []
+    watcher.subscribe(events.append)
+
+    simulator.inject_fault(Fault.WATCHDOG_TIMEOUT)
+    watcher.poll()
+    # the event is emitted although disabling failed
+    assert [event.condition for event in events] == [Fault.WATCHDOG_TIMEOUT]
+    assert len(calls) == 1
+
+    assert watcher.poll() == []
+    assert len(calls) == 2
+    watcher.poll()
+    assert len(calls) == 2